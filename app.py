@@ -4,20 +4,30 @@ Main Streamlit application
 """
 
 import streamlit as st
-import pandas as pd
-import matplotlib.pyplot as plt
-import tempfile
 import os
-from pathlib import Path
-from typing import Optional, List, Dict, Any
-import io
-import base64
+from typing import List, Dict, Any, Optional
+
+# pandas and matplotlib are imported on first use (see plot_results), so the
+# app starts serving before any result has been produced
 
 from core.netlist_examples import EXAMPLES, get_example_netlist, generate_parametric_netlist
 from core.sanitizer import sanitize_netlist
-from core.runner import run_ngspice
+from core.singleflight import coalesced_simulate
+from core.session import SESSIONS, incremental_simulate
+from core.scheduler import SCHEDULER, BATCH
 from core.raw_parser import parse_ascii_raw
+from core.raw_index import read_window
+from core.log_pipeline import summarize_log
 from core.utils import dataframe_to_csv, format_unit
+from core.op_cache import OP_CACHE
+from core.archive import ResultArchive, DEFAULT_ARCHIVE_DIR
+from core.library import ModelLibrary, DEFAULT_LIBRARY_DIR
+from core.pyramid import ResultPyramid
+from core.table import ResultTable
+from core.spectrum import SPECTRUM_CACHE, WINDOWS, harmonic_table, amplitude_frame
+from core.sensitivity import sensitivity_analysis, sensitivity_elements, METRIC_STATS
+from core.optimizer import optimize, element_builder, parse_targets, METHODS as OPTIMIZER_METHODS
+from core.session_store import SESSION_STORE
 
 
 st.set_page_config(
@@ -28,10 +38,116 @@ st.set_page_config(
 )
 
 
+# Partial waveform snapshots shown while a transient is running
+PARTIAL_CHUNKS = 4
+
+# Horizontal resolution of the interactive plot
+PLOT_PIXELS = 1200
+
+# Rows per page offered by the data table
+TABLE_PAGE_SIZES = [50, 100, 500, 1000]
+
+
+@st.cache_resource
+def get_archive():
+    """Shared result archive, or None when OPENSPICE_ARCHIVE_DIR is not set"""
+    return ResultArchive(DEFAULT_ARCHIVE_DIR) if DEFAULT_ARCHIVE_DIR else None
+
+
+@st.cache_resource
+def get_library():
+    """Shared model library, or None when OPENSPICE_LIBRARY_DIR is not set"""
+    return ModelLibrary(DEFAULT_LIBRARY_DIR) if DEFAULT_LIBRARY_DIR else None
+
+
+def plot_results(df, x_var: str, metadata: Dict[str, Any], traces: List[str]) -> None:
+    """Draw the selected traces with matplotlib"""
+    import matplotlib.pyplot as plt
+    
+    fig, ax = plt.subplots(figsize=(10, 6))
+    
+    for trace in traces:
+        if trace in df.columns:
+            ax.plot(df.index, df[trace], label=trace, linewidth=2)
+    
+    ax.set_xlabel(format_unit(x_var, metadata))
+    ax.set_ylabel("Value")
+    ax.set_title("Simulation Results")
+    ax.grid(True, alpha=0.3)
+    ax.legend()
+    
+
+    if x_var.lower() == 'frequency':
+        ax.set_xscale('log')
+    
+    st.pyplot(fig)
+    plt.close(fig)
+
+
+def keep_with_result(key: str, value: Any) -> Any:
+    """Attach a derived view to the selected result; the session store re-checks its budget"""
+    return SESSION_STORE.attach(get_session_id(), st.session_state.result_id, key, value)
+
+
+def get_pyramid(results: Dict[str, Any]) -> ResultPyramid:
+    """Min/max pyramid of a result, built once and kept with the result"""
+    if 'pyramid' not in results:
+        archive = get_archive()
+        if 'archived' in results:
+            pyramid = ResultPyramid.from_archive(results['archived'])
+        elif archive is not None and 'run_id' in results:
+            # Archived columns are memory-mapped, so only visible windows are read
+            pyramid = ResultPyramid.from_archive(archive.open(results['run_id']))
+        else:
+            pyramid = ResultPyramid.from_dataframe(results['dataframe'])
+        return keep_with_result('pyramid', pyramid)
+    return results['pyramid']
+
+
+def get_table(results: Dict[str, Any]) -> ResultTable:
+    """Paged table view of a result, built once and kept with the result"""
+    if 'table' not in results:
+        archive = get_archive()
+        if 'archived' in results:
+            table = ResultTable.from_archive(results['archived'])
+        elif archive is not None and 'run_id' in results:
+            table = ResultTable.from_archive(archive.open(results['run_id']))
+        else:
+            table = ResultTable.from_dataframe(results['dataframe'])
+        return keep_with_result('table', table)
+    return results['table']
+
+
+def result_frame(results: Dict[str, Any], columns: Optional[List[str]] = None):
+    """
+    DataFrame of a result holding at least the given columns
+
+    Spilled results read only those columns from the archive instead of
+    decoding (and keeping) the whole DataFrame.
+    """
+    if 'archived' in results:
+        return results['archived'].to_dataframe(columns)
+    return results['dataframe']
+
+
+def get_session_id() -> str:
+    """Random identifier of this browser session"""
+    if 'session_id' not in st.session_state:
+        st.session_state.session_id = os.urandom(8).hex()
+    return st.session_state.session_id
+
+
+def current_results() -> Optional[Dict[str, Any]]:
+    """Selected result of this session from the session store (None if none or expired)"""
+    if st.session_state.result_id is None:
+        return None
+    return SESSION_STORE.get(get_session_id(), st.session_state.result_id)
+
+
 if 'netlist' not in st.session_state:
     st.session_state.netlist = ""
-if 'results' not in st.session_state:
-    st.session_state.results = None
+if 'result_id' not in st.session_state:
+    st.session_state.result_id = None
 if 'log' not in st.session_state:
     st.session_state.log = ""
 
@@ -77,6 +193,69 @@ def main():
                     "rc_lowpass", R=R, C=C*1e-6, Vin=Vin, freq=freq
                 )
                 st.rerun()
+        
+
+        st.subheader("⚙️ Simulation Options")
+        warm_start = st.checkbox(
+            "Warm-start operating point",
+            value=False,
+            help="Reuse the converged DC operating point of a previous transient or .op run "
+                 "with the same circuit topology as .nodeset initial guesses"
+        )
+        save_selected = st.checkbox(
+            "Save only plotted traces",
+            value=False,
+            help="Have ngspice write only the traces selected for plotting in the previous "
+                 "run, which keeps RAW files small for large circuits"
+        )
+        resident_session = st.checkbox(
+            "Incremental re-runs",
+            value=False,
+            help="Keep the circuit loaded in a resident ngspice session and apply value-only "
+                 "edits with alter/alterparam instead of reloading the whole netlist"
+        )
+        
+        with st.expander("📊 Scheduler", expanded=False):
+            for priority, stats in SCHEDULER.metrics().items():
+                st.caption(
+                    f"**{priority}**: {stats['running']} running, {stats['queued']} queued, "
+                    f"{stats['completed']} done, {stats['preemptions']} preemptions · "
+                    f"wait p95 {stats['queue_wait']['p95']:.2f}s · run mean {stats['run_time']['mean']:.2f}s"
+                )
+
+        session_results = SESSION_STORE.results(get_session_id())
+        if session_results:
+            st.subheader("🧠 Session Results")
+            result_ids = [r['result_id'] for r in session_results]
+            selected_result = st.selectbox(
+                "Results of this session:",
+                result_ids,
+                index=result_ids.index(st.session_state.result_id) if st.session_state.result_id in result_ids else 0,
+                format_func=lambda result_id: next(
+                    f"{r['title'] or r['plotname']} · {r['points']} points" + (" · on disk" if r['spilled'] else "")
+                    for r in session_results if r['result_id'] == result_id
+                )
+            )
+            if selected_result != st.session_state.result_id and st.button("Show Result"):
+                st.session_state.result_id = selected_result
+                st.rerun()
+            st.caption(f"In memory: {SESSION_STORE.memory_usage(get_session_id()) / 2**20:.1f} MB")
+
+        archive = get_archive()
+        if archive is not None:
+            st.subheader("🗄️ Run History")
+            past_runs = archive.list_runs()[:50]
+            selected_run = st.selectbox(
+                "Archived runs:",
+                [""] + [r['run_id'] for r in past_runs],
+                format_func=lambda run_id: run_id and next(
+                    f"{r['run_id']} - {r['title']} ({r['plotname']})" for r in past_runs if r['run_id'] == run_id
+                )
+            )
+            if selected_run and st.button("Load Run"):
+                df, metadata = archive.load(selected_run)
+                st.session_state.result_id = SESSION_STORE.put(get_session_id(), df, metadata, run_id=selected_run)
+                st.rerun()
     
 
     col1, col2 = st.columns([1, 1])
@@ -118,42 +297,84 @@ C1 out 0 1u
         st.header("Results")
         
         if clear_button:
-            st.session_state.results = None
+            st.session_state.result_id = None
             st.session_state.log = ""
             st.rerun()
         
         if run_button and netlist_input.strip():
+            progress_bar = st.progress(0, text="Running ngspice simulation...")
+            partial_chart = st.empty()
+            
+            def show_progress(event):
+                if event['fraction'] is not None:
+                    progress_bar.progress(
+                        int(event['fraction'] * 100),
+                        text=f"Simulating... {event['fraction']:.0%}"
+                    )
+                if event['partial_raw']:
+                    partial_df, _ = parse_ascii_raw(event['partial_raw'])
+                    if not partial_df.empty:
+                        partial_chart.line_chart(partial_df.iloc[:, :3])
+            
             with st.spinner("Running ngspice simulation..."):
                 try:
 
-                    sanitized_netlist = sanitize_netlist(netlist_input)
+                    save_vectors = st.session_state.get('plot_traces') if save_selected else None
+                    sanitized_netlist = sanitize_netlist(netlist_input, save_vectors=save_vectors)
+                    
+                    library = get_library()
+                    if library is not None:
+                        sanitized_netlist = library.inject(sanitized_netlist)
+                    
+                    if warm_start:
+                        # OPs come from earlier runs themselves (.op plots, first transient point)
+                        sanitized_netlist = OP_CACHE.warm_start(sanitized_netlist)
                     
 
-                    success, log, raw_path = run_ngspice(sanitized_netlist)
+                    if resident_session:
+                        success, log, df, metadata, raw_path = incremental_simulate(
+                            sanitized_netlist,
+                            SESSIONS.get(get_session_id()),
+                            progress_callback=show_progress,
+                            partial_chunks=PARTIAL_CHUNKS
+                        )
+                    else:
+                        # Runs the cost estimator rates low priority are scheduled as batch work
+                        success, log, df, metadata, raw_path = coalesced_simulate(
+                            sanitized_netlist,
+                            runner=SCHEDULER.runner(),
+                            progress_callback=show_progress,
+                            partial_chunks=PARTIAL_CHUNKS
+                        )
                     
                     st.session_state.log = log
                     
-                    if success and raw_path and os.path.exists(raw_path):
-
-                        df, metadata = parse_ascii_raw(raw_path)
-                        st.session_state.results = {
-                            'dataframe': df,
-                            'metadata': metadata,
-                            'raw_path': raw_path
-                        }
+                    if success and df is not None:
+
+                        if warm_start:
+                            OP_CACHE.store_result(sanitized_netlist, df, metadata)
+                        extra = {}
+                        if raw_path:
+                            extra['raw_path'] = raw_path
+                        if archive is not None:
+                            extra['run_id'] = archive.save(df, metadata)
+                        # Earlier results of this session are spilled to disk by the store
+                        st.session_state.result_id = SESSION_STORE.put(get_session_id(), df, metadata, **extra)
                         st.success("✅ Simulation completed successfully!")
                     else:
                         st.error(f"❌ Simulation failed. Check the log below.")
-                        st.session_state.results = None
+                        st.session_state.result_id = None
                         
                 except Exception as e:
                     st.error(f"❌ Error: {str(e)}")
-                    st.session_state.results = None
+                    st.session_state.result_id = None
+            
+            progress_bar.empty()
+            partial_chart.empty()
         
 
-        if st.session_state.results:
-            results = st.session_state.results
-            df = results['dataframe']
+        results = current_results()
+        if results:
             metadata = results['metadata']
             
 
@@ -172,57 +393,243 @@ C1 out 0 1u
                 selected_traces = st.multiselect(
                     "Choose variables to plot:",
                     options=y_vars,
-                    default=y_vars[:min(3, len(y_vars))]
+                    default=y_vars[:min(3, len(y_vars))],
+                    key='plot_traces'
                 )
                 
+                interactive = st.checkbox(
+                    "🔍 Interactive zoom/pan",
+                    value=False,
+                    help="Fetch only the visible window at screen resolution; "
+                         "suited to long transients"
+                )
+                
+                if selected_traces and interactive:
+                    pyramid = get_pyramid(results)
+                    x_lo, x_hi = pyramid.x_range
+                    if x_hi > x_lo:
+                        visible = st.slider(
+                            f"Visible {x_var} range",
+                            min_value=x_lo,
+                            max_value=x_hi,
+                            value=(x_lo, x_hi),
+                            step=(x_hi - x_lo) / 1e6,
+                            format="%.4g"
+                        )
+                    else:
+                        visible = (x_lo, x_hi)
+                    st.line_chart(pyramid.fetch(visible[0], visible[1], PLOT_PIXELS, selected_traces))
+                    if 'raw_path' in results and os.path.exists(results['raw_path']) and visible != (x_lo, x_hi):
+                        # The window CSV is built on request and kept until the window changes
+                        window_csv = results.get('window_csv') if results.get('window_csv_range') == visible else None
+                        if window_csv is None and st.button("Prepare visible window (CSV)"):
+                            # Only the indexed region of the RAW file around the window is parsed
+                            window_df, _ = read_window(results['raw_path'], visible[0], visible[1])
+                            keep_with_result('window_csv_range', visible)
+                            window_csv = keep_with_result('window_csv', dataframe_to_csv(window_df))
+                        if window_csv is not None:
+                            st.download_button(
+                                "📥 Download visible window (CSV)",
+                                data=window_csv,
+                                file_name="simulation_window.csv",
+                                mime="text/csv"
+                            )
+                elif selected_traces:
+                    plot_results(result_frame(results, selected_traces), x_var, metadata, selected_traces)
+                
+                if selected_traces and x_var.lower() == 'time':
+                    with st.expander("📈 Spectrum", expanded=False):
+                        spec_col1, spec_col2, spec_col3 = st.columns(3)
+                        with spec_col1:
+                            fft_window = st.selectbox("Window:", WINDOWS)
+                        with spec_col2:
+                            n_harmonics = st.number_input("Harmonics:", value=9, min_value=2, max_value=50)
+                        with spec_col3:
+                            skip_until = st.number_input(
+                                "Start time (s):",
+                                value=0.0,
+                                min_value=0.0,
+                                format="%.4g",
+                                help="Skip the start-up transient"
+                            )
+                        
+                        try:
+                            # Cached per trace data and settings, so reruns are free
+                            spectrum = SPECTRUM_CACHE.spectrum(
+                                result_frame(results, selected_traces), selected_traces, window=fft_window,
+                                x_start=skip_until or None
+                            )
+                            st.line_chart(amplitude_frame(spectrum, db=True))
+                            harmonics, thd = harmonic_table(spectrum, harmonics=int(n_harmonics))
+                            for trace, value in thd.items():
+                                st.metric(f"THD {trace}", f"{value:.3f} %")
+                            st.dataframe(harmonics, use_container_width=True, hide_index=True)
+                        except ValueError as e:
+                            st.warning(f"Spectrum unavailable: {e}")
+                
                 if selected_traces:
+                    with st.expander("🎯 Sensitivity", expanded=False):
+                        # cutoff needs a frequency sweep, overshoot a time axis
+                        skipped_stats = {'at', 'overshoot' if x_var.lower() == 'frequency' else 'cutoff'}
+                        if x_var.lower() not in ('frequency', 'time'):
+                            skipped_stats.update({'cutoff', 'overshoot'})
+                        metric_options = [f"{stat}({trace})" for trace in selected_traces
+                                          for stat in METRIC_STATS if stat not in skipped_stats]
+                        chosen_metrics = st.multiselect(
+                            "Metrics:",
+                            options=metric_options,
+                            default=metric_options[1:2]
+                        )
+                        extra_metric = st.text_input(
+                            "Additional metric:",
+                            placeholder="at(v(out), 1k)",
+                            help="Value of a trace at an x position, e.g. gain at one frequency"
+                        )
+                        sens_step = st.number_input("Relative step:", value=0.01, min_value=1e-6,
+                                                    max_value=0.5, format="%.4g")
+                        
+                        if st.button("Run sensitivity analysis"):
+                            metrics = chosen_metrics + ([extra_metric.strip()] if extra_metric.strip() else [])
+                            with st.spinner("Simulating perturbed variants..."):
+                                try:
+                                    st.session_state.sensitivity = sensitivity_analysis(
+                                        netlist_input, metrics, step=sens_step, central=True,
+                                        runner=SCHEDULER.runner(BATCH)
+                                    )
+                                except (ValueError, RuntimeError) as e:
+                                    st.session_state.sensitivity = None
+                                    st.error(f"❌ Sensitivity analysis failed: {e}")
+                        
+                        sensitivity = st.session_state.get('sensitivity')
+                        if sensitivity:
+                            st.caption(f"{sensitivity['variants']} variants evaluated ({sensitivity['engine']})")
+                            ranked = sensitivity['table']
+                            for metric, rows in ranked.groupby('metric', sort=False):
+                                st.markdown(f"**{metric}** (nominal {rows['nominal'].iloc[0]:.4g})")
+                                st.bar_chart(rows.set_index('element')['sensitivity'])
+                            st.dataframe(ranked, use_container_width=True, hide_index=True)
 
-                    fig, ax = plt.subplots(figsize=(10, 6))
-                    
-                    for trace in selected_traces:
-                        if trace in df.columns:
-                            ax.plot(df.index, df[trace], label=trace, linewidth=2)
-                    
-                    ax.set_xlabel(format_unit(x_var, metadata))
-                    ax.set_ylabel("Value")
-                    ax.set_title("Simulation Results")
-                    ax.grid(True, alpha=0.3)
-                    ax.legend()
-                    
+                    with st.expander("🎛️ Optimizer", expanded=False):
+                        tunable = {e['name']: e['value'] for e in sensitivity_elements(netlist_input)}
+                        opt_elements = st.multiselect("Elements to tune:", options=list(tunable))
+                        bounds = {}
+                        for name in opt_elements:
+                            low_col, high_col = st.columns(2)
+                            # Negative values (e.g. inverting E/G gains) keep their sign
+                            decade = sorted([tunable[name] / 10, tunable[name] * 10])
+                            with low_col:
+                                low = st.number_input(f"{name} min:", value=decade[0], format="%.4g")
+                            with high_col:
+                                high = st.number_input(f"{name} max:", value=decade[1], format="%.4g")
+                            bounds[name] = (low, high, tunable[name])
+                        target_text = st.text_area(
+                            "Targets:",
+                            placeholder="cutoff(v(out)) = 1k\nat(v(out), 10k) <= 0.2",
+                            help="One metric per line with =, <= or >= and a value"
+                        )
+                        opt_col1, opt_col2 = st.columns(2)
+                        with opt_col1:
+                            opt_method = st.selectbox("Method:", OPTIMIZER_METHODS)
+                        with opt_col2:
+                            opt_budget = st.number_input("Max evaluations:", value=200, min_value=10, max_value=5000)
 
-                    if x_var.lower() == 'frequency':
-                        ax.set_xscale('log')
-                    
-                    st.pyplot(fig)
-                    plt.close()
+                        if st.button("Run optimizer", disabled=not bounds):
+                            with st.spinner("Optimizing component values..."):
+                                try:
+                                    st.session_state.optimization = optimize(
+                                        element_builder(netlist_input), bounds, parse_targets(target_text),
+                                        method=opt_method, max_evaluations=int(opt_budget),
+                                        runner=SCHEDULER.runner(BATCH)
+                                    )
+                                except (ValueError, RuntimeError) as e:
+                                    st.session_state.optimization = None
+                                    st.error(f"❌ Optimization failed: {e}")
+
+                        optimization = st.session_state.get('optimization')
+                        if optimization:
+                            st.caption(
+                                f"{optimization['evaluations']} candidates in {optimization['generations']} "
+                                f"generations, {optimization['simulations']} simulated, "
+                                f"{optimization['cache_hits']} cached ({', '.join(optimization['engines'])})"
+                            )
+                            opt_cols = st.columns(len(optimization['best']))
+                            for col, (name, value) in zip(opt_cols, optimization['best'].items()):
+                                col.metric(name, f"{value:.4g}")
+                            for metric, value in optimization['metrics'].items():
+                                st.write(f"**{metric}**: {value:.4g}")
+                            history = optimization['history']
+                            st.line_chart(history.groupby('generation')['objective'].min().cummin())
+                            st.code(optimization['netlist'], language='text')
     
 
-    if st.session_state.results:
+    if results:
         st.header("📋 Data Table & Downloads")
         
         col3, col4 = st.columns([2, 1])
         
         with col3:
 
-            df_display = st.session_state.results['dataframe']
-            st.dataframe(df_display, use_container_width=True, height=300)
+            table = get_table(results)
+            
+            # Only the visible page of rows is sent to the browser
+            ctrl1, ctrl2, ctrl3 = st.columns([2, 1, 1])
+            with ctrl1:
+                table_columns = st.multiselect(
+                    "Columns:",
+                    options=list(table.columns),
+                    default=[],
+                    placeholder="All columns"
+                )
+            with ctrl2:
+                page_size = st.selectbox("Rows per page:", TABLE_PAGE_SIZES, index=1)
+            with ctrl3:
+                jump_to = st.number_input(
+                    f"Go to {table.x_name or 'row'}:",
+                    value=None,
+                    format="%.6g",
+                    help="Binary search for the nearest row"
+                )
+            
+            page_count = table.page_count(page_size)
+            if jump_to is not None:
+                st.session_state.table_page = table.page_of(jump_to, page_size) + 1
+            else:
+                st.session_state.table_page = min(st.session_state.get('table_page', 1), page_count)
+            page = st.number_input(
+                f"Page (of {page_count}):",
+                min_value=1,
+                max_value=page_count,
+                key='table_page'
+            )
+            
+            st.dataframe(
+                table.page(page - 1, page_size, table_columns or None),
+                use_container_width=True,
+                height=300
+            )
+            window = table.describe_window(page - 1, page_size)
+            st.caption(f"Rows {window['start'] + 1}-{window['stop']} of {window['rows']}")
         
         with col4:
             st.subheader("📥 Downloads")
             
 
-            csv_data = dataframe_to_csv(df_display)
-            st.download_button(
-                "📊 Download CSV",
-                data=csv_data,
-                file_name="simulation_results.csv",
-                mime="text/csv",
-                use_container_width=True
-            )
+            # Serialized on request and kept with the result (within its budget)
+            csv_data = results.get('csv')
+            if csv_data is None and st.button("📊 Prepare CSV", use_container_width=True):
+                csv_data = keep_with_result('csv', dataframe_to_csv(result_frame(results)))
+            if csv_data is not None:
+                st.download_button(
+                    "📊 Download CSV",
+                    data=csv_data,
+                    file_name="simulation_results.csv",
+                    mime="text/csv",
+                    use_container_width=True
+                )
             
 
-            if 'raw_path' in st.session_state.results:
-                raw_path = st.session_state.results['raw_path']
+            if 'raw_path' in results:
+                raw_path = results['raw_path']
                 if os.path.exists(raw_path):
                     with open(raw_path, 'rb') as f:
                         raw_data = f.read()
@@ -236,7 +643,18 @@ C1 out 0 1u
     
 
     if st.session_state.log:
+        # Logs arrive bounded (head and tail); show the extracted issues first
+        log_summary = summarize_log(st.session_state.log)
+        for issue in log_summary['issues']:
+            subjects = f" ({', '.join(issue['subjects'])})" if issue['subjects'] else ""
+            text = f"**{issue['label']}**{subjects} × {issue['count']} — first at log line {issue['first_line']}: `{issue['message']}`"
+            if issue['severity'] == 'error':
+                st.error(text)
+            else:
+                st.warning(text)
         with st.expander("📜 Simulation Log", expanded=False):
+            if log_summary['omitted']:
+                st.caption(f"{log_summary['omitted']} lines from the middle of the log are omitted")
             st.text(st.session_state.log)
     
 
@@ -0,0 +1,83 @@
+"""
+Cold-start import benchmark
+Times importing each entry point in a fresh interpreter and reports which
+heavy libraries it pulls in
+
+Usage: python benchmarks/cold_start.py [--repeat N] [module ...]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, Any, List
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Entry points used by CLI/service users and by the app
+DEFAULT_MODULES = [
+    'core.runner',
+    'core.sanitizer',
+    'core.singleflight',
+    'core.estimator',
+    'core.library',
+    'core.mna',
+    'core.archive',
+    'core.compare',
+    'core.batch',
+]
+
+HEAVY_MODULES = ('numpy', 'pandas', 'matplotlib', 'streamlit')
+
+_PROBE = (
+    "import sys, time, json\n"
+    "start = time.perf_counter()\n"
+    "import {module}\n"
+    "elapsed = time.perf_counter() - start\n"
+    "print(json.dumps({{'seconds': elapsed, 'loaded': [m for m in {heavy!r} if m in sys.modules]}}))\n"
+)
+
+
+def measure_import(module: str, repeat: int = 5) -> Dict[str, Any]:
+    """
+    Import a module in fresh interpreters
+
+    Returns:
+        {'module', 'median_ms', 'min_ms', 'loaded'} where 'loaded' lists the
+        heavy libraries the import pulled in
+    """
+    timings = []
+    loaded: List[str] = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, '-c', _PROBE.format(module=module, heavy=HEAVY_MODULES)],
+            cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        timings.append(result['seconds'] * 1000)
+        loaded = result['loaded']
+    return {
+        'module': module,
+        'median_ms': statistics.median(timings),
+        'min_ms': min(timings),
+        'loaded': loaded,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure cold import time of core modules")
+    parser.add_argument('modules', nargs='*', default=DEFAULT_MODULES)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'module':<22} {'median ms':>10} {'min ms':>8}  heavy imports")
+    for module in args.modules:
+        result = measure_import(module, args.repeat)
+        print(f"{module:<22} {result['median_ms']:>10.1f} {result['min_ms']:>8.1f}  "
+              f"{', '.join(result['loaded']) or '-'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,353 @@
+"""
+On-disk result archive
+Stores each simulation result as memory-mappable .npy column arrays plus
+a small JSON metadata file, with an append-only catalog for queries
+"""
+
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+import warnings
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Sequence, Tuple, Union, TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+CATALOG_FILE = 'catalog.jsonl'
+RUNS_DIR = 'runs'
+META_FILE = 'meta.json'
+X_FILE = 'x.npy'
+WAVE_FILE = 'data.wfz'
+
+# Default archive location (can be overridden by environment variable)
+DEFAULT_ARCHIVE_DIR = os.environ.get('OPENSPICE_ARCHIVE_DIR', '')
+
+# Compressed storage for new runs: '' (memory-mappable .npy columns), 'zlib' or 'lzma'
+DEFAULT_ARCHIVE_CODEC = os.environ.get('OPENSPICE_ARCHIVE_CODEC', '')
+
+# Largest error allowed when compressing traces, relative to each trace's peak magnitude ('' = lossless)
+DEFAULT_ARCHIVE_TOLERANCE = float(os.environ['OPENSPICE_ARCHIVE_TOLERANCE']) \
+    if os.environ.get('OPENSPICE_ARCHIVE_TOLERANCE') else None
+
+
+def _column_array(series: 'pd.Series') -> np.ndarray:
+    """Convert a result column to a fixed-width dtype that can be memory-mapped"""
+    values = series.to_numpy()
+    if values.dtype == object:
+        is_complex = any(isinstance(v, complex) for v in values)
+        return values.astype(complex if is_complex else float)
+    return np.ascontiguousarray(values)
+
+
+class _CodecColumn:
+    """
+    Trace of a codec run that decodes on access
+
+    Slicing decodes only the chunks the rows span; converting to an array
+    (np.asarray) decodes the whole trace without keeping it.
+    """
+
+    def __init__(self, waveforms: Any, name: str):
+        self._waveforms = waveforms
+        self._name = name
+
+    def __len__(self) -> int:
+        return len(self._waveforms)
+
+    def __getitem__(self, rows: Any) -> np.ndarray:
+        if isinstance(rows, slice) and rows.step in (None, 1):
+            return self._waveforms.column(self._name, rows)
+        return self._waveforms.column(self._name)[rows]
+
+    def __array__(self, dtype: Any = None, copy: Any = None) -> np.ndarray:
+        values = self._waveforms.column(self._name)
+        return values if dtype is None else values.astype(dtype)
+
+
+class ArchivedResult:
+    """
+    Lazily loaded archived result
+
+    Column arrays are memory-mapped on first access, so only the columns
+    and windows that are actually read are paged in from disk. Runs stored
+    with a codec are decoded instead; column(name)[rows] and window reads
+    decompress only the chunks they span.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with open(self.path / META_FILE, 'r') as f:
+            self.meta = json.load(f)
+        self._arrays: Dict[str, np.ndarray] = {}
+        self._waveforms = None
+        if self.meta.get('codec'):
+            from core.codec import WaveformFile
+            self._waveforms = WaveformFile(str(self.path / WAVE_FILE))
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        return self.meta['metadata']
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self.meta['columns'])
+
+    def __len__(self) -> int:
+        return self.meta['points']
+
+    def _array(self, filename: str) -> np.ndarray:
+        if filename not in self._arrays:
+            if self._waveforms is not None:
+                # Only the x axis of a codec run is kept decoded (binary searches need all of it)
+                self._arrays[filename] = self._waveforms.x()
+            else:
+                self._arrays[filename] = np.load(self.path / filename, mmap_mode='r')
+        return self._arrays[filename]
+
+    def x(self) -> np.ndarray:
+        return self._array(X_FILE)
+
+    def column(self, name: str) -> Union[np.ndarray, _CodecColumn]:
+        """Memory-mapped column array, or a sliceable decoder for codec runs"""
+        if self._waveforms is not None:
+            if name not in self.meta['columns']:
+                raise KeyError(name)
+            return _CodecColumn(self._waveforms, name)
+        return self._array(self.meta['columns'][name])
+
+    def window_slice(self, x_min: Optional[float] = None, x_max: Optional[float] = None) -> slice:
+        """Row slice covering x_min <= x <= x_max (binary search on the x array)"""
+        if self.meta['x_name'] is None:
+            return slice(0, len(self))
+        if self._waveforms is not None and X_FILE not in self._arrays:
+            return self._waveforms.window_slice(x_min, x_max)
+        x = self.x()
+        start = 0 if x_min is None else int(np.searchsorted(x, x_min, side='left'))
+        stop = len(x) if x_max is None else int(np.searchsorted(x, x_max, side='right'))
+        return slice(start, stop)
+
+    def to_dataframe(self, columns: Optional[Sequence[str]] = None,
+                     x_min: Optional[float] = None,
+                     x_max: Optional[float] = None) -> 'pd.DataFrame':
+        """Materialize the selected columns and x window as a DataFrame"""
+        import pandas as pd
+
+        if self._waveforms is not None:
+            return self._waveforms.to_dataframe(columns, x_min, x_max)
+        columns = self.columns if columns is None else [c for c in columns if c in self.meta['columns']]
+        rows = self.window_slice(x_min, x_max)
+        data = {name: np.array(self.column(name)[rows]) for name in columns}
+        if self.meta['x_name'] is None:
+            return pd.DataFrame(data, columns=columns)
+        index = pd.Index(np.array(self.x()[rows]), name=self.meta['x_name'])
+        return pd.DataFrame(data, index=index, columns=columns)
+
+
+def _parse_record(line: str) -> Optional[Dict[str, Any]]:
+    """
+    Catalog record of one line, or None if it cannot be read
+
+    A run killed mid-append leaves a partial line that the next record is
+    appended to; that record is recovered from its '{"run_id"' start.
+    """
+    for start in (0, line.rfind('{"run_id"')):
+        if start < 0:
+            continue
+        try:
+            record = json.loads(line[start:])
+        except ValueError:
+            continue
+        if isinstance(record, dict) and 'run_id' in record:
+            return record
+    return None
+
+
+class ResultArchive:
+    """
+    Directory of archived results with a JSON-lines catalog
+
+    With a codec ('zlib' or 'lzma') new runs are stored in the compact
+    waveform format of core.codec, losslessly or, given a tolerance, with
+    each trace quantized to within tolerance times its own peak magnitude,
+    so microamp currents and volt-level voltages keep the same relative
+    precision. Runs in either format are read the same way.
+    """
+
+    def __init__(self, root: str, codec: str = DEFAULT_ARCHIVE_CODEC,
+                 tolerance: Optional[float] = DEFAULT_ARCHIVE_TOLERANCE):
+        self.root = Path(root)
+        self.codec = codec or None
+        self.tolerance = tolerance
+        (self.root / RUNS_DIR).mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._catalog: Dict[str, Dict[str, Any]] = {}
+        self._catalog_version: Optional[Tuple[int, int]] = None
+
+    @property
+    def catalog_path(self) -> Path:
+        return self.root / CATALOG_FILE
+
+    def _append_catalog(self, record: Dict[str, Any]) -> None:
+        """Append one record with a single O_APPEND write, so concurrent processes never interleave"""
+        data = (json.dumps(record) + '\n').encode()
+        with self._lock:
+            fd = os.open(self.catalog_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, data)
+            finally:
+                os.close(fd)
+
+    def _read_catalog(self) -> Dict[str, Dict[str, Any]]:
+        """Load the catalog, re-reading only when the file has changed"""
+        if not self.catalog_path.exists():
+            return {}
+        stat = self.catalog_path.stat()
+        version = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            if version != self._catalog_version:
+                entries: Dict[str, Dict[str, Any]] = {}
+                skipped = 0
+                with open(self.catalog_path, 'r', errors='replace') as f:
+                    for line in f:
+                        line = line.strip()
+                        if not line:
+                            continue
+                        record = _parse_record(line)
+                        if record is None:
+                            skipped += 1
+                            continue
+                        if record.get('deleted'):
+                            entries.pop(record['run_id'], None)
+                        else:
+                            entries[record['run_id']] = record
+                if skipped:
+                    warnings.warn(f"Skipped {skipped} unreadable line(s) in {self.catalog_path}", RuntimeWarning)
+                self._catalog = entries
+                self._catalog_version = version
+            return self._catalog
+
+    def save(self, df: 'pd.DataFrame', metadata: Dict[str, Any],
+             tags: Optional[Sequence[str]] = None,
+             key: Optional[str] = None,
+             extra: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Archive a parsed result
+
+        Args:
+            df: DataFrame from parse_ascii_raw
+            metadata: Metadata dictionary from parse_ascii_raw
+            tags: Optional labels for catalog queries
+            key: Optional lookup key (e.g. a netlist hash)
+            extra: Additional JSON-serializable catalog fields
+
+        Returns:
+            run_id of the archived result
+        """
+        run_id = time.strftime('%Y%m%d-%H%M%S') + '-' + uuid.uuid4().hex[:8]
+        final_dir = self.root / RUNS_DIR / run_id
+        staging_dir = self.root / RUNS_DIR / f".{run_id}.tmp"
+        staging_dir.mkdir(parents=True)
+
+        try:
+            x_name = df.index.name if df.index.name else None
+            column_files = {}
+            storage = {}
+            if self.codec:
+                from core.codec import write_waveforms, relative_tolerances
+
+                tolerance = relative_tolerances(df, self.tolerance) if self.tolerance else None
+                stats = write_waveforms(str(staging_dir / WAVE_FILE), df, metadata,
+                                        tolerance=tolerance, codec=self.codec)
+                # Codec columns are addressed by name inside the waveform file
+                column_files = {str(name): str(name) for name in df.columns}
+                storage = {'codec': self.codec, 'stored_bytes': stats['stored_bytes'],
+                           'lossy_columns': stats['lossy_columns']}
+            else:
+                if x_name is not None:
+                    np.save(staging_dir / X_FILE, np.real(np.asarray(df.index.values)).astype(float))
+                for i, name in enumerate(df.columns):
+                    filename = f"c{i:04d}.npy"
+                    np.save(staging_dir / filename, _column_array(df[name]))
+                    column_files[str(name)] = filename
+
+            meta = {
+                'run_id': run_id,
+                'x_name': x_name,
+                'points': int(len(df)),
+                'columns': column_files,
+                'metadata': metadata,
+                **storage,
+            }
+            with open(staging_dir / META_FILE, 'w') as f:
+                json.dump(meta, f)
+            os.replace(staging_dir, final_dir)
+        except Exception:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            raise
+
+        record = {
+            'run_id': run_id,
+            'created': time.time(),
+            'title': metadata.get('title', ''),
+            'plotname': metadata.get('plotname', ''),
+            'points': int(len(df)),
+            'columns': [str(c) for c in df.columns],
+            'tags': list(tags or []),
+            'key': key,
+            **storage,
+        }
+        if extra:
+            record.update(extra)
+        self._append_catalog(record)
+        return run_id
+
+    def open(self, run_id: str) -> ArchivedResult:
+        """Open an archived result without reading its column data"""
+        path = self.root / RUNS_DIR / run_id
+        if not (path / META_FILE).exists():
+            raise KeyError(f"Unknown run: {run_id}")
+        return ArchivedResult(path)
+
+    def load(self, run_id: str, columns: Optional[Sequence[str]] = None,
+             x_min: Optional[float] = None,
+             x_max: Optional[float] = None) -> Tuple['pd.DataFrame', Dict[str, Any]]:
+        """Load a result (or a column/x window of it) as (DataFrame, metadata)"""
+        result = self.open(run_id)
+        return result.to_dataframe(columns, x_min, x_max), result.metadata
+
+    def list_runs(self, tag: Optional[str] = None, since: Optional[float] = None,
+                  **filters: Any) -> List[Dict[str, Any]]:
+        """
+        List catalog entries, newest first
+
+        Args:
+            tag: Only runs carrying this tag
+            since: Only runs created at or after this UNIX time
+            **filters: Exact matches on catalog fields (e.g. plotname=...)
+        """
+        runs = []
+        for record in self._read_catalog().values():
+            if tag is not None and tag not in record.get('tags', []):
+                continue
+            if since is not None and record['created'] < since:
+                continue
+            if any(record.get(k) != v for k, v in filters.items()):
+                continue
+            runs.append(record)
+        return sorted(runs, key=lambda r: r['created'], reverse=True)
+
+    def find(self, key: str) -> Optional[str]:
+        """run_id of the newest run stored with the given key, if any"""
+        matches = self.list_runs(key=key)
+        return matches[0]['run_id'] if matches else None
+
+    def delete(self, run_id: str) -> None:
+        """Remove a run's data and mark it deleted in the catalog"""
+        shutil.rmtree(self.root / RUNS_DIR / run_id, ignore_errors=True)
+        self._append_catalog({'run_id': run_id, 'deleted': True})
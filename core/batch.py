@@ -0,0 +1,225 @@
+"""
+Batched evaluation of parametric circuit variants
+Evaluates many value-only variants of one topology either with a single
+batched in-process MNA solve or with a single ngspice run that steps
+through the variants with 'alter' commands
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Callable, List, Optional, Sequence, Tuple, Union, TYPE_CHECKING
+
+import numpy as np
+
+from core.compare import resample_columns
+from core.mna import (
+    build_mna_system, solve_mna, ac_frequencies, output_names, UnsupportedCircuitError
+)
+from core.netlist_examples import generate_parametric_netlist
+from core.netlist_parser import parse_netlist, diff_netlists, ALTERABLE_TYPES
+from core.raw_parser import parse_ascii_raw_plots
+from core.runner import run_ngspice, simulate, DEFAULT_TIMEOUT
+from core.sanitizer import sanitize_netlist
+from core.utils import parse_spice_value
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+ParamMatrix = Union[Dict[str, Sequence[float]], np.ndarray]
+
+
+def _variant_params(param_names: Sequence[str], param_matrix: ParamMatrix) -> Tuple[List[str], np.ndarray]:
+    """Normalize a {name: values} mapping or (variants x params) array"""
+    if isinstance(param_matrix, dict):
+        names = list(param_matrix)
+        matrix = np.column_stack([np.asarray(param_matrix[n], dtype=float) for n in names])
+        return names, matrix
+    matrix = np.atleast_2d(np.asarray(param_matrix, dtype=float))
+    if matrix.shape[1] != len(param_names):
+        raise ValueError(f"Parameter matrix has {matrix.shape[1]} columns, expected {len(param_names)}")
+    return list(param_names), matrix
+
+
+def variant_netlists(circuit_type: str, param_names: Sequence[str], matrix: np.ndarray,
+                     base_params: Optional[Dict[str, Any]] = None) -> List[str]:
+    """Generate one netlist per parameter row"""
+    base_params = dict(base_params or {})
+    return [
+        generate_parametric_netlist(circuit_type, **{**base_params, **dict(zip(param_names, row.tolist()))})
+        for row in matrix
+    ]
+
+
+def build_alter_script(netlists: Sequence[str]) -> Optional[str]:
+    """
+    Combine value-only variants into one netlist with an 'alter' control loop
+
+    The first netlist is simulated as-is; each further variant is reached
+    by altering the changed R/L/C values and repeating the control
+    commands from the first 'run' on, which append the result to
+    output.raw. Returns None if the variants differ in anything other
+    than R/L/C values.
+    """
+    base = sanitize_netlist(netlists[0])
+    steps: List[Dict[str, str]] = []
+    for netlist in netlists[1:]:
+        diff = diff_netlists(netlists[0], netlist)
+        if (not diff['same_topology'] or diff['analyses_changed'] or diff['models_changed']
+                or diff['directives_changed'] or diff['changed_params']):
+            return None
+        values = {}
+        for name, change in diff['changed_elements'].items():
+            if change['type'] not in ALTERABLE_TYPES or len(change['new']) != 1:
+                return None
+            try:
+                parse_spice_value(change['new'][0])
+            except ValueError:
+                return None
+            values[name.lower()] = change['new'][0]
+        steps.append(values)
+
+    # Every step sets all elements that vary anywhere in the batch, so each
+    # variant is independent of the previous one
+    base_values = {e['name'].lower(): e['args'][0] for e in parse_netlist(netlists[0])['elements'] if e['args']}
+    touched = sorted({name for step in steps for name in step})
+
+    # The sanitized control block is kept: commands before its first 'run'
+    # execute once, the rest (run, measurements, the output.raw write and
+    # its vector selection) is repeated after each step's alters
+    lines = base.split('\n')
+    start = next(i for i, line in enumerate(lines) if line.strip().lower().startswith('.control'))
+    end = next(i for i, line in enumerate(lines) if line.strip().lower().startswith('.endc'))
+    commands = [line for line in lines[start + 1:end] if line.strip().lower() not in ('quit', 'exit')]
+    first_run = next((i for i, line in enumerate(commands) if line.strip().lower().split()[:1] == ['run']), None)
+    if first_run is None:
+        return None
+    setup, analysis = commands[:first_run], commands[first_run:]
+
+    control = ['.control', *setup, 'set appendwrite', *analysis]
+    for step in steps:
+        control.extend(f"alter {name} = {step.get(name, base_values[name])}" for name in touched)
+        control.extend(analysis)
+    control.extend(['quit', '.endc'])
+
+    return '\n'.join(lines[:start] + control + lines[end + 1:])
+
+
+def _stack_results(results: Sequence[Tuple['pd.DataFrame', Dict[str, Any]]]) -> Tuple[np.ndarray, str, List[str], np.ndarray]:
+    """Stack per-variant DataFrames into one (variant x point x variable) array"""
+    base_df = results[0][0]
+    x = np.real(np.asarray(base_df.index.values)).astype(float)
+    columns = list(base_df.columns)
+    is_complex = any(np.iscomplexobj(df[c].to_numpy()) or df[c].dtype == object
+                     for df, _ in results for c in columns)
+    dtype = complex if is_complex else float
+
+    data = np.empty((len(results), len(x), len(columns)), dtype=dtype)
+    for i, (df, _) in enumerate(results):
+        values = np.column_stack([df[c].to_numpy().astype(dtype) for c in columns])
+        df_x = np.real(np.asarray(df.index.values)).astype(float)
+        if len(df_x) == len(x) and np.allclose(df_x, x):
+            data[i] = values
+        else:
+            # Adaptive transient steps differ per variant: align on the first variant's axis
+            data[i] = resample_columns(df_x, values, x)
+    return x, str(base_df.index.name), columns, data
+
+
+def _evaluate_mna(netlists: Sequence[str]) -> Tuple[np.ndarray, str, List[str], np.ndarray]:
+    parsed = [parse_netlist(n) for n in netlists]
+    if any([a['type'] for a in p['analyses']] != ['ac'] for p in parsed):
+        raise UnsupportedCircuitError("Batched MNA needs a single .ac analysis")
+    analyses = {tuple(p['analyses'][0]['args']) for p in parsed}
+    if len(analyses) != 1:
+        raise UnsupportedCircuitError("Variants use different .ac sweeps")
+
+    systems = [build_mna_system(p) for p in parsed]
+    names = output_names(systems[0])
+    if any(output_names(s) != names for s in systems[1:]):
+        raise UnsupportedCircuitError("Variants have different topologies")
+
+    frequencies = ac_frequencies(parsed[0]['analyses'][0]['args'])
+    G = np.stack([s['G'] for s in systems])
+    C = np.stack([s['C'] for s in systems])
+    b = np.stack([s['b'] for s in systems])
+    return frequencies, 'frequency', [name for name, _ in names], solve_mna(G, C, b, frequencies)
+
+
+def evaluate_variants(netlists: Sequence[str], timeout: Optional[int] = None,
+                      fast_path: bool = True, workers: Optional[int] = None,
+                      runner: Optional[Callable[..., Tuple[bool, str, Optional[str]]]] = None) -> Dict[str, Any]:
+    """
+    Evaluate value-only variants of one circuit
+
+    Tries, in order: one batched in-process MNA solve (linear AC), one
+    ngspice run with an 'alter' loop (R/L/C value changes), and finally
+    separate runs spread over a thread pool. ngspice runs go through
+    runner (default run_ngspice), e.g. a scheduler's batch-class runner.
+
+    Returns:
+        {'x', 'x_name', 'variables', 'data' (variant x point x variable),
+        'engine' ('mna', 'ngspice-alter' or 'ngspice'), 'log'}
+    """
+    if not netlists:
+        raise ValueError("No variants to evaluate")
+
+    if fast_path:
+        try:
+            x, x_name, variables, data = _evaluate_mna(netlists)
+            return {'x': x, 'x_name': x_name, 'variables': variables, 'data': data,
+                    'engine': 'mna', 'log': f"Batched MNA solve of {len(netlists)} variants"}
+        except UnsupportedCircuitError:
+            pass
+
+    run_timeout = timeout or DEFAULT_TIMEOUT * len(netlists)
+    script = build_alter_script(netlists) if len(netlists) > 1 else None
+    if script is not None:
+        success, log, raw_path = (runner or run_ngspice)(script, timeout=run_timeout, check_cost=False)
+        if success and raw_path:
+            try:
+                plots = parse_ascii_raw_plots(raw_path)
+            finally:
+                os.unlink(raw_path)
+            if len(plots) == len(netlists):
+                x, x_name, variables, data = _stack_results(plots)
+                return {'x': x, 'x_name': x_name, 'variables': variables, 'data': data,
+                        'engine': 'ngspice-alter', 'log': log}
+
+    def run_one(netlist: str) -> Tuple['pd.DataFrame', Dict[str, Any]]:
+        success, log, df, metadata, raw_path = simulate(sanitize_netlist(netlist), timeout or DEFAULT_TIMEOUT,
+                                                        fast_path=fast_path, runner=runner)
+        if raw_path:
+            os.unlink(raw_path)
+        if not success:
+            raise RuntimeError(f"Variant simulation failed:\n{log}")
+        return df, metadata
+
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+        results = list(pool.map(run_one, netlists))
+    x, x_name, variables, data = _stack_results(results)
+    return {'x': x, 'x_name': x_name, 'variables': variables, 'data': data,
+            'engine': 'ngspice', 'log': f"{len(netlists)} separate ngspice runs"}
+
+
+def evaluate_parametric_batch(circuit_type: str, param_matrix: ParamMatrix,
+                              param_names: Sequence[str] = (),
+                              base_params: Optional[Dict[str, Any]] = None,
+                              **kwargs: Any) -> Dict[str, Any]:
+    """
+    Evaluate a generate_parametric_netlist template over a parameter matrix
+
+    Args:
+        circuit_type: Template name ('rc_lowpass', 'rc_highpass', 'rlc_filter')
+        param_matrix: {name: values} or a (variants x params) array
+        param_names: Column names when param_matrix is an array
+        base_params: Fixed parameters shared by all variants
+        **kwargs: Passed to evaluate_variants
+
+    Returns:
+        evaluate_variants result plus 'param_names' and 'params'
+    """
+    names, matrix = _variant_params(param_names, param_matrix)
+    result = evaluate_variants(variant_netlists(circuit_type, names, matrix, base_params), **kwargs)
+    result['param_names'] = names
+    result['params'] = matrix
+    return result
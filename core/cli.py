@@ -0,0 +1,249 @@
+"""
+Command-line batch runner
+Runs sanitize -> simulate -> measure -> archive over many netlists in
+parallel, with a JSON summary and resume support
+
+Usage: python -m core.cli INPUT [INPUT ...] --out DIR [options]
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Sequence, TYPE_CHECKING
+
+from core.archive import ResultArchive
+from core.measurements import measure_result
+from core.runner import simulate, DEFAULT_TIMEOUT
+from core.sanitizer import sanitize_netlist
+from core.singleflight import simulation_key
+
+if TYPE_CHECKING:
+    from core.distributed import Coordinator
+
+NETLIST_EXTENSIONS = ('.cir', '.sp', '.spi', '.net', '.spice')
+MANIFEST_EXTENSIONS = ('.txt', '.lst', '.json')
+SUMMARY_FILE = 'summary.json'
+CLI_TAG = 'cli'
+
+# Number of log lines kept in the summary for failed runs
+LOG_TAIL_LINES = 20
+
+
+def _manifest_entries(manifest: Path) -> List[Path]:
+    """Paths listed in a manifest (JSON list/{'netlists': [...]} or one path per line)"""
+    text = manifest.read_text()
+    if manifest.suffix.lower() == '.json':
+        data = json.loads(text)
+        entries = data['netlists'] if isinstance(data, dict) else data
+    else:
+        entries = [line.strip() for line in text.splitlines()
+                   if line.strip() and not line.strip().startswith('#')]
+    return [(manifest.parent / entry) for entry in entries]
+
+
+def collect_inputs(inputs: Sequence[str]) -> List[Path]:
+    """
+    Expand directories, glob patterns and manifests into netlist paths
+
+    Directories are searched recursively for netlist extensions. Paths are
+    de-duplicated and returned in a stable order.
+    """
+    paths: List[Path] = []
+    for item in inputs:
+        path = Path(item)
+        if path.is_dir():
+            paths.extend(sorted(p for p in path.rglob('*')
+                                if p.is_file() and p.suffix.lower() in NETLIST_EXTENSIONS))
+        elif path.is_file() and path.suffix.lower() in MANIFEST_EXTENSIONS:
+            paths.extend(_manifest_entries(path))
+        elif path.is_file():
+            paths.append(path)
+        else:
+            matches = sorted(glob.glob(item, recursive=True))
+            if not matches:
+                raise FileNotFoundError(f"No netlists match: {item}")
+            paths.extend(Path(m) for m in matches if Path(m).is_file())
+
+    seen = set()
+    unique = []
+    for path in paths:
+        resolved = path.resolve()
+        if resolved not in seen:
+            seen.add(resolved)
+            unique.append(path)
+    return unique
+
+
+def run_job(path: str, out_dir: str, netlist: str, key: str, timeout: int,
+            coordinator: Optional['Coordinator'] = None, codec: Optional[str] = None,
+            tolerance: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Simulate one sanitized netlist, measure it and archive the result
+
+    Runs in a worker process, or on a thread that hands the simulation to
+    remote workers when a coordinator is given. Only successful runs are
+    archived, so failed inputs are retried on resume. codec and tolerance
+    select compressed storage (see ResultArchive).
+    """
+    start_time = time.time()
+    entry: Dict[str, Any] = {'input': path, 'key': key}
+    try:
+        if coordinator is not None:
+            success, log, df, metadata, raw_path = coordinator.run(netlist, timeout)
+        else:
+            success, log, df, metadata, raw_path = simulate(netlist, timeout)
+        if raw_path:
+            os.unlink(raw_path)
+        if not success or df is None:
+            entry.update(status='failed', error=log.strip().splitlines()[-LOG_TAIL_LINES:])
+        else:
+            measurements = measure_result(netlist, log, df)
+            run_id = ResultArchive(out_dir, codec=codec, tolerance=tolerance).save(
+                df, metadata, tags=[CLI_TAG], key=key,
+                extra={'source': path, 'measurements': measurements}
+            )
+            entry.update(status='ok', run_id=run_id, points=len(df), measurements=measurements)
+    except Exception as e:
+        entry.update(status='failed', error=[f"{type(e).__name__}: {e}"])
+    entry['elapsed'] = time.time() - start_time
+    return entry
+
+
+def run_batch(inputs: Sequence[str], out_dir: str, workers: Optional[int] = None,
+              timeout: int = DEFAULT_TIMEOUT, save_vectors: Optional[Sequence[str]] = None,
+              resume: bool = True, quiet: bool = False,
+              remote: Optional[Sequence[str]] = None,
+              codec: Optional[str] = None, tolerance: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Run every netlist found in inputs
+
+    Args:
+        inputs: Directories, glob patterns, manifests or netlist files
+        out_dir: Result archive directory; the summary is written there too
+        workers: Worker processes (default: CPU count)
+        timeout: Per-netlist ngspice timeout in seconds
+        save_vectors: Only save these output vectors
+        resume: Skip netlists whose sanitized form is already archived
+        quiet: Suppress per-netlist progress lines
+        remote: Worker URLs (see core.distributed); simulations run there
+            while measurement and archiving stay local
+        codec: Store results compressed with 'zlib' or 'lzma'
+        tolerance: Largest trace error allowed when compressing, relative
+            to each trace's peak magnitude
+            (default: lossless)
+
+    Returns:
+        Summary dictionary (also written to <out_dir>/summary.json)
+    """
+    archive = ResultArchive(out_dir)
+    paths = collect_inputs(inputs)
+    started = time.time()
+    entries: Dict[str, Dict[str, Any]] = {}
+    jobs = []
+
+    # Newest archived run per simulation key, read from the catalog once
+    latest: Dict[str, Dict[str, Any]] = {}
+    if resume:
+        for record in archive.list_runs():
+            latest.setdefault(record.get('key'), record)
+
+    for path in paths:
+        try:
+            netlist = sanitize_netlist(path.read_text(), save_vectors=save_vectors)
+        except (OSError, ValueError) as e:
+            entries[str(path)] = {'input': str(path), 'status': 'failed', 'error': [str(e)]}
+            continue
+        key = simulation_key(netlist)
+        record = latest.get(key)
+        if record is not None:
+            entries[str(path)] = {'input': str(path), 'key': key, 'status': 'cached', 'run_id': record['run_id'],
+                                  'points': record['points'], 'measurements': record.get('measurements')}
+            continue
+        jobs.append((str(path), out_dir, netlist, key, timeout))
+
+    def report(entry: Dict[str, Any]) -> None:
+        entries[entry['input']] = entry
+        if not quiet:
+            print(f"[{len(entries)}/{len(paths)}] {entry['status']:<6} {entry['input']}"
+                  f" ({entry.get('elapsed', 0.0):.2f}s)", flush=True)
+
+    if jobs and remote:
+        from core.distributed import Coordinator
+
+        with Coordinator(remote) as coordinator:
+            with ThreadPoolExecutor(max_workers=workers or coordinator.capacity()) as pool:
+                futures = [pool.submit(run_job, *job, coordinator=coordinator, codec=codec, tolerance=tolerance)
+                           for job in jobs]
+                for future in as_completed(futures):
+                    report(future.result())
+    elif jobs:
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+            futures = [pool.submit(run_job, *job, codec=codec, tolerance=tolerance) for job in jobs]
+            for future in as_completed(futures):
+                report(future.result())
+
+    results = [entries[str(path)] for path in paths if str(path) in entries]
+    counts = {status: sum(1 for e in results if e['status'] == status) for status in ('ok', 'cached', 'failed')}
+    summary = {
+        'created': time.time(),
+        'elapsed': time.time() - started,
+        'archive': str(Path(out_dir).resolve()),
+        'total': len(results),
+        **counts,
+        'results': results,
+    }
+
+    summary_path = Path(out_dir) / SUMMARY_FILE
+    tmp_path = summary_path.with_suffix('.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(summary, f, indent=2)
+    os.replace(tmp_path, summary_path)
+    return summary
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog='python -m core.cli',
+        description="Run ngspice over directories, globs or manifests of netlists"
+    )
+    parser.add_argument('inputs', nargs='+', help="Netlist files, directories, glob patterns or manifests")
+    parser.add_argument('-o', '--out', required=True, help="Output directory (result archive and summary.json)")
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help="Worker processes (default: all cores), or parallel jobs with --remote "
+                             "(default: total worker slots)")
+    parser.add_argument('-t', '--timeout', type=int, default=DEFAULT_TIMEOUT, help="Per-netlist timeout in seconds")
+    parser.add_argument('--save', nargs='+', metavar='VECTOR', help="Only save these output vectors")
+    parser.add_argument('--no-resume', action='store_true', help="Re-run netlists that are already archived")
+    parser.add_argument('-q', '--quiet', action='store_true', help="Only print the final summary")
+    parser.add_argument('--remote', nargs='+', metavar='URL',
+                        help="Run simulations on these workers (python -m core.distributed)")
+    parser.add_argument('--compress', choices=['zlib', 'lzma'], default=None,
+                        help="Store results in the compressed waveform format")
+    parser.add_argument('--tolerance', type=float, default=None,
+                        help="With --compress, quantize each trace to within this fraction "
+                             "of its peak magnitude (e.g. 1e-4)")
+    args = parser.parse_args(argv)
+    if args.tolerance is not None and not args.compress:
+        parser.error("--tolerance requires --compress")
+
+    try:
+        summary = run_batch(args.inputs, args.out, workers=args.workers, timeout=args.timeout,
+                            save_vectors=args.save, resume=not args.no_resume, quiet=args.quiet,
+                            remote=args.remote, codec=args.compress, tolerance=args.tolerance)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+
+    print(f"{summary['total']} netlists: {summary['ok']} ok, {summary['cached']} cached, "
+          f"{summary['failed']} failed in {summary['elapsed']:.1f}s "
+          f"-> {Path(args.out) / SUMMARY_FILE}")
+    return 1 if summary['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
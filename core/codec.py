@@ -0,0 +1,289 @@
+"""
+Compact waveform storage codec
+Delta-encodes the x axis, XOR-encodes (or quantizes within a tolerance)
+the traces and compresses fixed-size row chunks independently with zlib or
+lzma, so a window of a stored result decompresses only the chunks it spans
+"""
+
+import bisect
+import json
+import lzma
+import os
+import struct
+import zlib
+from typing import Dict, Any, List, Optional, Sequence, Tuple, Union, TYPE_CHECKING
+
+import numpy as np
+
+from core.archive import _column_array
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+MAGIC = b'OSWAVE1\n'
+CODEC_VERSION = 1
+
+# Rows per independently compressed chunk (can be overridden by environment variable)
+CHUNK_ROWS = int(os.environ.get('OPENSPICE_CODEC_CHUNK_ROWS', '65536'))
+
+COMPRESSORS = {
+    'zlib': (lambda data: zlib.compress(data, 6), zlib.decompress),
+    'lzma': (lambda data: lzma.compress(data, preset=6), lzma.decompress),
+}
+
+# Quantized values must fit comfortably in int64 steps
+_MAX_STEPS = 2.0 ** 62
+
+Tolerance = Union[None, float, Dict[str, float]]
+
+
+def _shuffle(words: np.ndarray) -> bytes:
+    """Byte-transpose 8-byte words so equal high bytes sit together (compresses better)"""
+    return words.view(np.uint8).reshape(-1, 8).T.tobytes()
+
+
+def _unshuffle(data: bytes, count: int) -> np.ndarray:
+    return np.frombuffer(data, dtype=np.uint8).reshape(8, count).T.copy().view(np.int64).ravel()
+
+
+def _encode(values: np.ndarray, encoding: str, step: Optional[float]) -> np.ndarray:
+    """Encode one real float64 chunk to int64 words"""
+    if encoding == 'quantized':
+        return np.diff(np.round(values / step).astype(np.int64), prepend=np.int64(0))
+    words = values.view(np.int64)
+    if encoding == 'delta':
+        # Integer differences of the bit patterns wrap consistently, so this is lossless
+        return np.diff(words, prepend=np.int64(0))
+    encoded = words.copy()
+    encoded[1:] = words[1:] ^ words[:-1]
+    return encoded
+
+
+def _decode(words: np.ndarray, encoding: str, step: Optional[float]) -> np.ndarray:
+    if encoding == 'quantized':
+        return np.cumsum(words, dtype=np.int64).astype(float) * step
+    if encoding == 'delta':
+        return np.cumsum(words, dtype=np.int64).view(float)
+    return np.bitwise_xor.accumulate(words).view(float)
+
+
+def _column_spec(values: np.ndarray, encoding: str, tolerance: Optional[float]) -> Dict[str, Any]:
+    """Pick the encoding for a column; quantization needs finite values within int64 range"""
+    spec: Dict[str, Any] = {'dtype': 'complex128' if np.iscomplexobj(values) else 'float64',
+                            'encoding': encoding, 'step': None}
+    if tolerance and tolerance > 0:
+        parts = np.abs(np.concatenate(_components(values, spec) + [np.zeros(1)]))
+        step = 2.0 * tolerance
+        if np.all(np.isfinite(parts)) and parts.max() / step < _MAX_STEPS:
+            spec.update(encoding='quantized', step=step)
+    return spec
+
+
+def _components(values: np.ndarray, spec: Dict[str, Any]) -> List[np.ndarray]:
+    if spec['dtype'] == 'complex128':
+        return [np.ascontiguousarray(values.real), np.ascontiguousarray(values.imag)]
+    return [np.ascontiguousarray(values, dtype=float)]
+
+
+def relative_tolerances(df: 'pd.DataFrame', tolerance: float) -> Dict[str, float]:
+    """
+    Per-trace absolute tolerances of tolerance times each trace's peak magnitude
+
+    Traces that are all zero (or not finite) get 0, i.e. lossless storage.
+    """
+    tolerances = {}
+    for name in df.columns:
+        values = np.abs(_column_array(df[name]))
+        peak = float(values.max()) if len(values) else 0.0
+        tolerances[str(name)] = tolerance * peak if np.isfinite(peak) else 0.0
+    return tolerances
+
+
+def write_waveforms(path: str, df: 'pd.DataFrame', metadata: Dict[str, Any],
+                    tolerance: Tolerance = None, codec: str = 'zlib',
+                    chunk_rows: int = CHUNK_ROWS) -> Dict[str, Any]:
+    """
+    Store a parsed result in the compact waveform format
+
+    Args:
+        path: Output file
+        df: DataFrame from parse_ascii_raw (the index is the x axis)
+        metadata: Metadata dictionary stored alongside
+        tolerance: None for lossless storage, or the largest absolute error
+            allowed per trace (one value for all traces or {name: value});
+            the x axis is always stored losslessly
+        codec: 'zlib' or 'lzma'
+        chunk_rows: Rows per independently compressed chunk
+
+    Returns:
+        {'raw_bytes', 'stored_bytes', 'ratio', 'lossy_columns'}
+    """
+    if codec not in COMPRESSORS:
+        raise ValueError(f"Unknown codec: {codec} (choose from {', '.join(COMPRESSORS)})")
+    compress = COMPRESSORS[codec][0]
+    chunk_rows = max(int(chunk_rows), 1)
+    points = len(df)
+    bounds = list(range(0, points, chunk_rows)) or [0]
+
+    x_name = df.index.name if df.index.name else None
+    columns: List[Tuple[Optional[str], np.ndarray, Dict[str, Any]]] = []
+    if x_name is not None:
+        x = np.real(np.asarray(df.index.values)).astype(float)
+        columns.append((None, x, _column_spec(x, 'delta', None)))
+    for name in df.columns:
+        values = _column_array(df[name])
+        column_tolerance = tolerance.get(str(name)) if isinstance(tolerance, dict) else tolerance
+        columns.append((str(name), values, _column_spec(values, 'xor', column_tolerance)))
+
+    blobs: List[bytes] = []
+    offset = 0
+    raw_bytes = 0
+    for _, values, spec in columns:
+        spec['chunks'] = []
+        for start in bounds:
+            rows = slice(start, min(start + chunk_rows, points))
+            payload = b''.join(_shuffle(_encode(part[rows], spec['encoding'], spec['step']))
+                               for part in _components(values, spec))
+            blob = compress(payload)
+            spec['chunks'].append([offset, len(blob)])
+            blobs.append(blob)
+            offset += len(blob)
+        raw_bytes += values.nbytes
+
+    header = {
+        'version': CODEC_VERSION,
+        'codec': codec,
+        'points': points,
+        'chunk_rows': chunk_rows,
+        'x_name': x_name,
+        'metadata': metadata,
+        'columns': {name if name is not None else '': spec for name, _, spec in columns},
+    }
+    if x_name is not None:
+        x = columns[0][1]
+        header['x_first'] = [float(x[start]) for start in bounds if start < points]
+        header['x_ascending'] = bool(np.all(np.diff(x) >= 0))
+
+    header_bytes = json.dumps(header).encode()
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<Q', len(header_bytes)))
+        f.write(header_bytes)
+        for blob in blobs:
+            f.write(blob)
+    os.replace(tmp_path, path)
+
+    stored = len(MAGIC) + 8 + len(header_bytes) + offset
+    return {
+        'raw_bytes': raw_bytes,
+        'stored_bytes': stored,
+        'ratio': raw_bytes / stored if stored else 0.0,
+        'lossy_columns': [name for name, _, spec in columns if spec['encoding'] == 'quantized'],
+    }
+
+
+class WaveformFile:
+    """
+    Reader for files written by write_waveforms
+
+    Only the header is read on open; column chunks are read and
+    decompressed on demand, and window reads touch only the chunks that
+    overlap the requested rows.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"Not a waveform file: {path}")
+            (length,) = struct.unpack('<Q', f.read(8))
+            self.header = json.loads(f.read(length))
+        self._data_offset = len(MAGIC) + 8 + length
+        self._decompress = COMPRESSORS[self.header['codec']][1]
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        return self.header['metadata']
+
+    @property
+    def columns(self) -> List[str]:
+        return [name for name in self.header['columns'] if name != '']
+
+    @property
+    def x_name(self) -> Optional[str]:
+        return self.header['x_name']
+
+    def __len__(self) -> int:
+        return self.header['points']
+
+    def _read(self, key: str, rows: slice) -> np.ndarray:
+        spec = self.header['columns'][key]
+        chunk_rows = self.header['chunk_rows']
+        points = len(self)
+        start, stop = max(rows.start or 0, 0), min(points if rows.stop is None else rows.stop, points)
+        if stop <= start:
+            return np.zeros(0, dtype=spec['dtype'])
+        first, last = start // chunk_rows, (stop - 1) // chunk_rows
+        pieces = []
+        with open(self.path, 'rb') as f:
+            for chunk in range(first, last + 1):
+                offset, length = spec['chunks'][chunk]
+                f.seek(self._data_offset + offset)
+                payload = self._decompress(f.read(length))
+                count = min(chunk_rows, points - chunk * chunk_rows)
+                parts = [_decode(_unshuffle(payload[i * count * 8:(i + 1) * count * 8], count),
+                                 spec['encoding'], spec['step'])
+                         for i in range(len(payload) // (count * 8))]
+                pieces.append(parts[0] + 1j * parts[1] if spec['dtype'] == 'complex128' else parts[0])
+        values = np.concatenate(pieces)
+        offset = first * chunk_rows
+        return values[start - offset:stop - offset]
+
+    def x(self, rows: slice = slice(None)) -> np.ndarray:
+        if self.x_name is None:
+            return np.arange(len(self), dtype=float)[rows]
+        return self._read('', rows)
+
+    def column(self, name: str, rows: slice = slice(None)) -> np.ndarray:
+        return self._read(name, rows)
+
+    def window_slice(self, x_min: Optional[float] = None, x_max: Optional[float] = None) -> slice:
+        """Row slice covering x_min <= x <= x_max, decoding only the chunks at its edges"""
+        points = len(self)
+        if self.x_name is None or not self.header.get('x_ascending', False):
+            return slice(0, points)
+        firsts = self.header['x_first']
+        chunk_rows = self.header['chunk_rows']
+
+        def locate(value: float, side: str) -> int:
+            chunk = max(bisect.bisect_left(firsts, value) - 1, 0) if side == 'left' else \
+                max(bisect.bisect_right(firsts, value) - 1, 0)
+            start = chunk * chunk_rows
+            x = self.x(slice(start, start + chunk_rows))
+            return start + int(np.searchsorted(x, value, side=side))
+
+        start = 0 if x_min is None else locate(x_min, 'left')
+        stop = points if x_max is None else locate(x_max, 'right')
+        return slice(start, max(stop, start))
+
+    def to_dataframe(self, columns: Optional[Sequence[str]] = None,
+                     x_min: Optional[float] = None,
+                     x_max: Optional[float] = None) -> 'pd.DataFrame':
+        """Decode the selected columns and x window as a DataFrame"""
+        import pandas as pd
+
+        columns = self.columns if columns is None else [c for c in columns if c in self.header['columns'] and c]
+        rows = self.window_slice(x_min, x_max)
+        data = {name: self.column(name, rows) for name in columns}
+        if self.x_name is None:
+            return pd.DataFrame(data, columns=columns)
+        return pd.DataFrame(data, index=pd.Index(self.x(rows), name=self.x_name), columns=columns)
+
+
+def read_waveforms(path: str, columns: Optional[Sequence[str]] = None,
+                   x_min: Optional[float] = None,
+                   x_max: Optional[float] = None) -> Tuple['pd.DataFrame', Dict[str, Any]]:
+    """Load a stored result (or a column/x window of it) as (DataFrame, metadata)"""
+    waveforms = WaveformFile(path)
+    return waveforms.to_dataframe(columns, x_min, x_max), waveforms.metadata
@@ -0,0 +1,250 @@
+"""
+Result comparison engine
+Aligns simulation results on a common x-axis and computes per-trace
+error metrics for golden-waveform regression checks
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, List, Optional, Sequence, Tuple, Union, TYPE_CHECKING
+
+import numpy as np
+
+from core.raw_parser import parse_ascii_raw
+from core.raw_index import read_window
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+DEFAULT_RTOL = 1e-3
+DEFAULT_ATOL = 1e-6
+
+# Gap allowed at either end of the reference x range, relative to its span
+DEFAULT_X_TOL = 1e-6
+
+ResultInput = Union['pd.DataFrame', str]
+
+
+def interpolation_weights(x_src: np.ndarray, x_dst: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Left indices and weights for linear interpolation from x_src onto x_dst
+
+    x_src must be sorted ascending. Points outside x_src are clamped to the
+    end values, like numpy.interp. Computing the weights once lets every
+    column sharing the same x-axis be resampled with two gathers.
+    """
+    x_src = np.asarray(x_src, dtype=float)
+    x_dst = np.asarray(x_dst, dtype=float)
+    if len(x_src) < 2:
+        return np.zeros(len(x_dst), dtype=np.intp), np.zeros(len(x_dst))
+
+    idx = np.searchsorted(x_src, x_dst, side='right') - 1
+    idx = np.clip(idx, 0, len(x_src) - 2)
+    x0 = x_src[idx]
+    dx = x_src[idx + 1] - x0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        weight = np.where(dx > 0, (x_dst - x0) / dx, 0.0)
+    return idx, np.clip(weight, 0.0, 1.0)
+
+
+def resample_columns(x_src: np.ndarray, values: np.ndarray, x_dst: np.ndarray) -> np.ndarray:
+    """
+    Linearly resample every column of values (points x traces) onto x_dst
+
+    Works for real and complex data.
+    """
+    values = np.asarray(values)
+    if values.ndim == 1:
+        values = values[:, None]
+    idx, weight = interpolation_weights(x_src, x_dst)
+    if len(x_src) < 2:
+        return np.repeat(values[:1], len(x_dst), axis=0)
+    weight = weight[:, None]
+    return values[idx] * (1.0 - weight) + values[idx + 1] * weight
+
+
+def _x_axis(df: 'pd.DataFrame') -> Tuple[np.ndarray, bool]:
+    """x values of a result and whether they should be interpolated in log scale"""
+    import pandas as pd
+
+    index = df.index
+    if isinstance(index, pd.RangeIndex) or not pd.api.types.is_numeric_dtype(index):
+        return np.arange(len(df), dtype=float), False
+    x = np.real(np.asarray(index.values)).astype(float)
+    is_log = str(index.name).lower() == 'frequency' and len(x) > 0 and bool(np.all(x > 0))
+    return x, is_log
+
+
+def _column_matrix(df: 'pd.DataFrame', columns: Sequence[str]) -> np.ndarray:
+    """Stack columns into one array, promoting to complex if any column is complex"""
+    arrays = [np.asarray(df[c].to_numpy()) for c in columns]
+    is_complex = any(a.dtype == object or np.iscomplexobj(a) for a in arrays)
+    dtype = complex if is_complex else float
+    return np.column_stack([a.astype(dtype) for a in arrays]) if arrays else np.empty((len(df), 0))
+
+
+def _coverage(x_ref: np.ndarray, x_test: np.ndarray, is_log: bool, x_tol: float) -> Tuple[float, bool]:
+    """
+    Fraction of the reference x span the test result overlaps, and whether
+    it spans the whole reference range
+
+    Each end may fall short by x_tol times the span plus the test's own
+    step at that end, so results on different time grids still count as
+    covering.
+    """
+    if len(x_ref) == 0:
+        return 1.0, True
+    if len(x_test) == 0:
+        return 0.0, False
+    if is_log and np.all(x_test > 0):
+        x_ref, x_test = np.log10(x_ref), np.log10(np.sort(x_test))
+    else:
+        x_test = np.sort(x_test)
+    ref_lo, ref_hi = x_ref.min(), x_ref.max()
+    span = ref_hi - ref_lo
+    if span <= 0:
+        covered = x_test[0] <= ref_lo <= x_test[-1]
+        return float(covered), bool(covered)
+    overlap = max(min(ref_hi, x_test[-1]) - max(ref_lo, x_test[0]), 0.0)
+    first_step = x_test[1] - x_test[0] if len(x_test) > 1 else 0.0
+    last_step = x_test[-1] - x_test[-2] if len(x_test) > 1 else 0.0
+    covered = (x_test[0] - ref_lo <= x_tol * span + first_step and
+               ref_hi - x_test[-1] <= x_tol * span + last_step)
+    return float(overlap / span), bool(covered)
+
+
+def compare_results(reference: 'pd.DataFrame', test: 'pd.DataFrame',
+                    columns: Optional[Sequence[str]] = None,
+                    rtol: float = DEFAULT_RTOL,
+                    atol: float = DEFAULT_ATOL,
+                    x_tol: float = DEFAULT_X_TOL) -> Dict[str, Any]:
+    """
+    Compare a test result against a reference result
+
+    The test traces are interpolated onto the reference x-axis (log-spaced
+    for frequency sweeps) over the overlapping x range. A trace passes when
+    every point satisfies |test - ref| <= atol + rtol * |ref|. The result
+    as a whole only passes if the test also spans the reference x range, so
+    a run that stopped early is reported as a failure.
+
+    Args:
+        reference: Reference (golden) DataFrame from parse_ascii_raw
+        test: DataFrame to check
+        columns: Traces to compare (default: all reference columns)
+        rtol: Relative tolerance
+        atol: Absolute tolerance
+        x_tol: Gap allowed at either end of the reference x range,
+            relative to its span (on top of one test step)
+
+    Returns:
+        {'passed', 'traces': {name: {'max_abs', 'rms', 'max_rel',
+        'passed'}}, 'missing': [...], 'points': n, 'coverage' (overlapped
+        fraction of the reference x span), 'covered'}
+    """
+    columns = list(columns) if columns is not None else list(reference.columns)
+    present = [c for c in columns if c in reference.columns and c in test.columns]
+    missing = [c for c in columns if c not in present]
+
+    x_ref, is_log = _x_axis(reference)
+    x_test, _ = _x_axis(test)
+
+    if len(x_ref) and len(x_test):
+        lo, hi = max(x_ref.min(), x_test.min()), min(x_ref.max(), x_test.max())
+        in_range = (x_ref >= lo) & (x_ref <= hi)
+    else:
+        in_range = np.zeros(len(x_ref), dtype=bool)
+
+    traces: Dict[str, Dict[str, Any]] = {}
+    if present and in_range.any():
+        ref_values = _column_matrix(reference, present)[in_range]
+        test_values = _column_matrix(test, present)
+        if is_log and np.all(x_test > 0):
+            aligned = resample_columns(np.log10(x_test), test_values, np.log10(x_ref[in_range]))
+        else:
+            aligned = resample_columns(x_test, test_values, x_ref[in_range])
+
+        error = np.abs(aligned - ref_values)
+        scale = np.abs(ref_values)
+        max_abs = error.max(axis=0)
+        rms = np.sqrt(np.mean(error ** 2, axis=0))
+        peak = scale.max(axis=0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            max_rel = np.where(peak > 0, max_abs / peak, np.where(max_abs > 0, np.inf, 0.0))
+        passed = np.all(error <= atol + rtol * scale, axis=0)
+
+        for i, name in enumerate(present):
+            traces[name] = {
+                'max_abs': float(max_abs[i]),
+                'rms': float(rms[i]),
+                'max_rel': float(max_rel[i]),
+                'passed': bool(passed[i]),
+            }
+    else:
+        missing = columns
+
+    coverage, covered = _coverage(x_ref, x_test, is_log, x_tol)
+    return {
+        'passed': covered and not missing and all(t['passed'] for t in traces.values()),
+        'traces': traces,
+        'missing': missing,
+        'points': int(in_range.sum()),
+        'coverage': coverage,
+        'covered': covered,
+    }
+
+
+def _load(result: ResultInput, x_range: Optional[Tuple[float, float]] = None) -> 'pd.DataFrame':
+    import pandas as pd
+
+    if isinstance(result, pd.DataFrame):
+        return result if x_range is None else result[(result.index >= x_range[0]) & (result.index <= x_range[1])]
+    if x_range is not None:
+        # Only the indexed region around the window is parsed
+        df, _ = read_window(result, *x_range)
+        return df
+    df, _ = parse_ascii_raw(result)
+    return df
+
+
+def _compare_pair(args: Tuple[ResultInput, ResultInput, Optional[Sequence[str]], float, float,
+                              Optional[Tuple[float, float]], float]) -> Dict[str, Any]:
+    reference, test, columns, rtol, atol, x_range, x_tol = args
+    return compare_results(_load(reference, x_range), _load(test, x_range), columns, rtol, atol, x_tol)
+
+
+def compare_batch(pairs: Sequence[Tuple[ResultInput, ResultInput]],
+                  columns: Optional[Sequence[str]] = None,
+                  rtol: float = DEFAULT_RTOL,
+                  atol: float = DEFAULT_ATOL,
+                  workers: Optional[int] = None,
+                  x_range: Optional[Tuple[float, float]] = None,
+                  x_tol: float = DEFAULT_X_TOL) -> List[Dict[str, Any]]:
+    """
+    Compare many (reference, test) pairs
+
+    Each side may be a DataFrame or a RAW file path. With workers > 1 the
+    pairs (including RAW parsing) are spread over worker processes. With
+    x_range = (x_min, x_max) only that window is compared, and RAW files
+    are read through their sidecar point index instead of parsed whole.
+
+    Returns:
+        One compare_results report per pair, in input order
+    """
+    jobs = [(ref, test, columns, rtol, atol, x_range, x_tol) for ref, test in pairs]
+    if workers and workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(_compare_pair, jobs, chunksize=max(len(jobs) // (workers * 4), 1)))
+    return [_compare_pair(job) for job in jobs]
+
+
+def summarize_reports(reports: Sequence[Dict[str, Any]]) -> 'pd.DataFrame':
+    """Flatten comparison reports into one row per (pair, trace); 'covered' is per pair"""
+    import pandas as pd
+
+    rows = []
+    for pair_idx, report in enumerate(reports):
+        for name, metrics in report['traces'].items():
+            rows.append({'pair': pair_idx, 'trace': name, **metrics, 'covered': report['covered']})
+        for name in report['missing']:
+            rows.append({'pair': pair_idx, 'trace': name, 'max_abs': np.nan,
+                         'rms': np.nan, 'max_rel': np.nan, 'passed': False, 'covered': report['covered']})
+    return pd.DataFrame(rows, columns=['pair', 'trace', 'max_abs', 'rms', 'max_rel', 'passed', 'covered'])
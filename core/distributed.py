@@ -0,0 +1,500 @@
+"""
+Distributed simulation over HTTP workers
+Workers run sanitized netlists and return encoded results; a coordinator
+spreads jobs over them with heartbeats, retries and cache-affine routing
+
+Worker: OPENSPICE_WORKER_TOKEN=... python -m core.distributed --host 0.0.0.0 --port 8765
+"""
+
+import argparse
+import base64
+import hashlib
+import hmac
+import ipaddress
+import json
+import os
+import socket
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, Callable, List, Optional, Sequence, Set, Tuple, TYPE_CHECKING
+
+import numpy as np
+
+from core.runner import simulate, DEFAULT_TIMEOUT
+from core.sanitizer import sanitize_netlist
+from core.singleflight import simulation_key
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+DEFAULT_PORT = 8765
+
+# Shared secret sent with every job (can be overridden by environment variable)
+WORKER_TOKEN = os.environ.get('OPENSPICE_WORKER_TOKEN', '')
+TOKEN_HEADER = 'X-OpenSpice-Token'
+
+# Longest per-job simulation timeout a worker accepts from a coordinator
+MAX_JOB_TIMEOUT = int(os.environ.get('OPENSPICE_WORKER_MAX_TIMEOUT', '600'))
+
+# Seconds between coordinator health checks
+HEARTBEAT_INTERVAL = 5.0
+
+# Worker losses tolerated per job before it fails
+MAX_RETRIES = 2
+
+# Extra seconds a coordinator waits beyond the simulation timeout
+REQUEST_MARGIN = 10.0
+
+# Seconds a job may wait for a free worker slot
+QUEUE_TIMEOUT = 600.0
+
+# Pause before retrying a job a worker rejected as busy
+BUSY_BACKOFF = 0.2
+
+# Results kept per worker for repeated netlists
+WORKER_CACHE_SIZE = 64
+
+MAX_REQUEST_BYTES = 16 * 1024 * 1024
+
+SimulateResult = Tuple[bool, str, Optional['pd.DataFrame'], Dict[str, Any], Optional[str]]
+Runner = Callable[[str, int], SimulateResult]
+
+
+def is_loopback(host: str) -> bool:
+    """Whether a listen address only accepts connections from this machine"""
+    if not host:
+        return False
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        pass
+    try:
+        return all(ipaddress.ip_address(info[4][0]).is_loopback
+                   for info in socket.getaddrinfo(host, None))
+    except (OSError, ValueError):
+        return False
+
+
+class WorkerUnavailable(RuntimeError):
+    """A worker could not be reached or did not answer in time"""
+
+
+class WorkerBusy(RuntimeError):
+    """A worker has no free simulation slot"""
+
+
+def _encode_array(values: np.ndarray) -> Dict[str, str]:
+    values = np.asarray(values)
+    if values.dtype == object:
+        values = values.astype(complex if any(isinstance(v, complex) for v in values) else float)
+    values = np.ascontiguousarray(values, dtype=values.dtype.newbyteorder('<'))
+    return {'dtype': values.dtype.str, 'data': base64.b64encode(values.tobytes()).decode('ascii')}
+
+
+def _decode_array(item: Dict[str, str]) -> np.ndarray:
+    return np.frombuffer(base64.b64decode(item['data']), dtype=np.dtype(item['dtype']))
+
+
+def encode_result(df: 'pd.DataFrame', metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """JSON-safe form of a parsed result (columns as base64 little-endian arrays)"""
+    return {
+        'x_name': df.index.name,
+        'x': _encode_array(df.index.values) if df.index.name is not None else None,
+        'columns': [[str(name), _encode_array(df[name].to_numpy())] for name in df.columns],
+        'metadata': metadata,
+    }
+
+
+def decode_result(payload: Dict[str, Any]) -> Tuple['pd.DataFrame', Dict[str, Any]]:
+    """Inverse of encode_result"""
+    import pandas as pd
+
+    data = {name: _decode_array(item) for name, item in payload['columns']}
+    columns = [name for name, _ in payload['columns']]
+    if payload['x'] is None:
+        return pd.DataFrame(data, columns=columns), payload['metadata']
+    index = pd.Index(_decode_array(payload['x']), name=payload['x_name'])
+    return pd.DataFrame(data, index=index, columns=columns), payload['metadata']
+
+
+class SimulationWorker:
+    """
+    HTTP worker that runs netlists with a local runner
+
+    Endpoints:
+        GET /health  -> {'worker', 'capacity', 'active', 'completed', ...}
+        POST /run    -> {'success', 'log', 'key', 'worker', 'cached', 'result'}
+
+    Incoming netlists are sanitized again before they are run. At most
+    `capacity` jobs run at once; further jobs are rejected with 503 so the
+    coordinator can place them elsewhere. Successful results are kept in
+    an LRU cache keyed by the netlist hash. Requested timeouts are clamped
+    to `max_timeout`.
+
+    Raises:
+        ValueError: if host is not a loopback address and no token is set
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = DEFAULT_PORT,
+                 runner: Runner = simulate, capacity: Optional[int] = None,
+                 cache_size: int = WORKER_CACHE_SIZE, token: str = WORKER_TOKEN,
+                 max_timeout: int = MAX_JOB_TIMEOUT):
+        if not token and not is_loopback(host):
+            raise ValueError(f"Refusing to serve on {host or 'all interfaces'} without a token "
+                             "(set OPENSPICE_WORKER_TOKEN)")
+        self.runner = runner
+        self.capacity = capacity or os.cpu_count() or 1
+        self.cache_size = cache_size
+        self.token = token
+        self.max_timeout = max_timeout
+        self.started = time.time()
+        self.stats = {'active': 0, 'completed': 0, 'failed': 0, 'cache_hits': 0}
+        self._slots = threading.BoundedSemaphore(self.capacity)
+        self._cache: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self.worker_id = f"{socket.gethostname()}:{self.server.server_address[1]}"
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def health(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'worker': self.worker_id, 'capacity': self.capacity, 'cached': len(self._cache),
+                    'uptime': time.time() - self.started, **self.stats}
+
+    def execute(self, netlist: str, timeout: int = DEFAULT_TIMEOUT) -> Dict[str, Any]:
+        """
+        Run one netlist and encode its result
+
+        Raises:
+            WorkerBusy: if all slots are taken
+        """
+        netlist = sanitize_netlist(netlist)
+        timeout = max(1, min(int(timeout), self.max_timeout))
+        key = simulation_key(netlist)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.stats['cache_hits'] += 1
+                return {**self._cache[key], 'cached': True}
+
+        if not self._slots.acquire(blocking=False):
+            raise WorkerBusy(self.worker_id)
+        with self._lock:
+            self.stats['active'] += 1
+        try:
+            success, log, df, metadata, raw_path = self.runner(netlist, timeout)
+            if raw_path:
+                os.unlink(raw_path)
+        except Exception as e:
+            success, log, df, metadata = False, f"Worker error: {type(e).__name__}: {e}", None, {}
+        finally:
+            self._slots.release()
+            with self._lock:
+                self.stats['active'] -= 1
+
+        payload = {
+            'success': bool(success and df is not None),
+            'log': log,
+            'key': key,
+            'worker': self.worker_id,
+            'result': encode_result(df, metadata) if success and df is not None else None,
+        }
+        with self._lock:
+            self.stats['completed' if payload['success'] else 'failed'] += 1
+            if payload['success']:
+                self._cache[key] = payload
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return {**payload, 'cached': False}
+
+    def _handler_class(self) -> type:
+        worker = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+            def _reply(self, status: int, body: Dict[str, Any]) -> None:
+                data = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self) -> None:
+                if self.path != '/health':
+                    return self._reply(404, {'error': 'not found'})
+                self._reply(200, worker.health())
+
+            def do_POST(self) -> None:
+                if self.path != '/run':
+                    return self._reply(404, {'error': 'not found'})
+                if worker.token and not hmac.compare_digest(self.headers.get(TOKEN_HEADER, ''), worker.token):
+                    return self._reply(403, {'error': 'invalid token'})
+                length = int(self.headers.get('Content-Length') or 0)
+                if length > MAX_REQUEST_BYTES:
+                    return self._reply(413, {'error': 'request too large'})
+                try:
+                    request = json.loads(self.rfile.read(length))
+                    netlist = str(request['netlist'])
+                    timeout = int(request.get('timeout', DEFAULT_TIMEOUT))
+                except (ValueError, KeyError, TypeError):
+                    return self._reply(400, {'error': 'expected {"netlist": ..., "timeout": ...}'})
+                try:
+                    self._reply(200, worker.execute(netlist, timeout))
+                except WorkerBusy:
+                    self._reply(503, {'error': 'busy'})
+
+        return Handler
+
+    def start(self) -> 'SimulationWorker':
+        """Serve on a background thread"""
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class Coordinator:
+    """
+    Client side of the worker pool
+
+    Jobs go to the highest-ranked worker for their netlist hash
+    (rendezvous hashing), so repeated netlists reach the worker that has
+    them cached; when that worker's slots are full the job spills to the
+    next one. A heartbeat thread polls /health, marking unreachable
+    workers lost and returning recovered ones to the pool. Jobs on a lost
+    worker are retried elsewhere.
+    """
+
+    def __init__(self, urls: Sequence[str], heartbeat_interval: float = HEARTBEAT_INTERVAL,
+                 retries: int = MAX_RETRIES, token: str = WORKER_TOKEN,
+                 queue_timeout: float = QUEUE_TIMEOUT):
+        if not urls:
+            raise ValueError("No worker URLs given")
+        self.heartbeat_interval = heartbeat_interval
+        self.retries = retries
+        self.token = token
+        self.queue_timeout = queue_timeout
+        self.workers: Dict[str, Dict[str, Any]] = {
+            url.rstrip('/'): {'alive': False, 'capacity': 1, 'running': 0, 'last_seen': None, 'losses': 0}
+            for url in urls
+        }
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._heartbeat: Optional[threading.Thread] = None
+        self.check_health()
+
+    def __enter__(self) -> 'Coordinator':
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def start(self) -> 'Coordinator':
+        """Start the heartbeat thread"""
+        if self._heartbeat is None:
+            self._heartbeat = threading.Thread(target=self._heartbeat_loop, daemon=True)
+            self._heartbeat.start()
+        return self
+
+    def close(self) -> None:
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+
+    def _heartbeat_loop(self) -> None:
+        while not self._stop.wait(self.heartbeat_interval):
+            self.check_health()
+
+    def _request(self, url: str, path: str, body: Optional[Dict[str, Any]], timeout: float) -> Dict[str, Any]:
+        data = json.dumps(body).encode('utf-8') if body is not None else None
+        request = urllib.request.Request(url + path, data=data, method='POST' if body is not None else 'GET')
+        request.add_header('Content-Type', 'application/json')
+        if self.token:
+            request.add_header(TOKEN_HEADER, self.token)
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                return json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            if e.code == 503:
+                raise WorkerBusy(url)
+            raise RuntimeError(f"{url} rejected the job: HTTP {e.code}")
+        except (urllib.error.URLError, OSError, ValueError) as e:
+            raise WorkerUnavailable(f"{url}: {e}")
+
+    def check_health(self) -> Dict[str, bool]:
+        """Poll every worker once; returns {url: alive}"""
+        for url in list(self.workers):
+            try:
+                health = self._request(url, '/health', None, timeout=min(self.heartbeat_interval, 5.0))
+            except (WorkerUnavailable, WorkerBusy, RuntimeError):
+                health = None
+            with self._cond:
+                worker = self.workers[url]
+                worker['alive'] = health is not None
+                if health is not None:
+                    worker['capacity'] = max(int(health.get('capacity', 1)), 1)
+                    worker['last_seen'] = time.time()
+                self._cond.notify_all()
+        return {url: w['alive'] for url, w in self.workers.items()}
+
+    def capacity(self) -> int:
+        """Total slots of the live workers"""
+        with self._cond:
+            return max(sum(w['capacity'] for w in self.workers.values() if w['alive']), 1)
+
+    def _ranked(self, key: str, exclude: Set[str]) -> List[str]:
+        alive = [url for url, w in self.workers.items() if w['alive'] and url not in exclude]
+        return sorted(alive, key=lambda url: hashlib.sha256(f"{key}\0{url}".encode('utf-8')).digest(), reverse=True)
+
+    def _acquire(self, key: str, exclude: Set[str], deadline: float) -> Optional[str]:
+        """Reserve a slot on the best-ranked worker with one free"""
+        with self._cond:
+            while not self._stop.is_set():
+                ranked = self._ranked(key, exclude)
+                if not ranked:
+                    return None
+                for url in ranked:
+                    worker = self.workers[url]
+                    if worker['running'] < worker['capacity']:
+                        worker['running'] += 1
+                        return url
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return None
+                self._cond.wait(timeout=min(remaining, self.heartbeat_interval))
+            return None
+
+    def _release(self, url: str) -> None:
+        with self._cond:
+            self.workers[url]['running'] -= 1
+            self._cond.notify_all()
+
+    def _mark_lost(self, url: str) -> None:
+        with self._cond:
+            self.workers[url]['alive'] = False
+            self.workers[url]['losses'] += 1
+            self._cond.notify_all()
+
+    def run(self, netlist: str, timeout: int = DEFAULT_TIMEOUT) -> SimulateResult:
+        """
+        Simulate a sanitized netlist on some worker
+
+        Returns:
+            Same tuple as simulate(), with raw_file_path always None
+
+        Raises:
+            RuntimeError: if no worker could run the job
+        """
+        key = simulation_key(netlist)
+        deadline = time.time() + self.queue_timeout
+        failed: Set[str] = set()
+        busy: Set[str] = set()
+        errors: List[str] = []
+
+        while len(errors) <= self.retries:
+            url = self._acquire(key, failed | busy, deadline)
+            if url is None:
+                if busy and time.time() < deadline:
+                    # Every other worker is busy too: back off, then start again from the best-ranked
+                    busy.clear()
+                    time.sleep(BUSY_BACKOFF)
+                    continue
+                if not any(w['alive'] for w in self.workers.values()):
+                    self.check_health()
+                    if any(w['alive'] and u not in failed for u, w in self.workers.items()):
+                        continue
+                break
+            try:
+                payload = self._request(url, '/run', {'netlist': netlist, 'timeout': timeout},
+                                        timeout=timeout + REQUEST_MARGIN)
+            except WorkerBusy:
+                # Slot taken by another coordinator: spill to the next-ranked worker
+                busy.add(url)
+                if time.time() > deadline:
+                    errors.append(f"{url}: busy")
+                    break
+                continue
+            except WorkerUnavailable as e:
+                self._mark_lost(url)
+                failed.add(url)
+                errors.append(str(e))
+                continue
+            except RuntimeError as e:
+                failed.add(url)
+                errors.append(str(e))
+                continue
+            finally:
+                self._release(url)
+
+            log = payload['log'] + f"\n\nRan on worker {payload['worker']}"
+            if payload.get('cached'):
+                log += " (cached result)"
+            if not payload['success'] or payload['result'] is None:
+                return False, log, None, {}, None
+            df, metadata = decode_result(payload['result'])
+            return True, log, df, metadata, None
+
+        raise RuntimeError("No worker could run the simulation" + ''.join(f"\n  {e}" for e in errors))
+
+    def map(self, netlists: Sequence[str], timeout: int = DEFAULT_TIMEOUT,
+            parallel: Optional[int] = None) -> List[SimulateResult]:
+        """
+        Run many netlists, keeping every worker slot busy
+
+        Jobs that no worker could run are returned as failures rather
+        than raised, so one lost job does not abort a sweep.
+        """
+        def run_one(netlist: str) -> SimulateResult:
+            try:
+                return self.run(netlist, timeout)
+            except RuntimeError as e:
+                return False, str(e), None, {}, None
+
+        with ThreadPoolExecutor(max_workers=parallel or self.capacity()) as pool:
+            return list(pool.map(run_one, netlists))
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog='python -m core.distributed',
+        description="Serve ngspice simulations to a coordinator over HTTP"
+    )
+    parser.add_argument('--host', default='127.0.0.1', help="Interface to listen on")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="Port to listen on")
+    parser.add_argument('-j', '--capacity', type=int, default=None, help="Concurrent simulations (default: all cores)")
+    args = parser.parse_args(argv)
+
+    try:
+        worker = SimulationWorker(args.host, args.port, capacity=args.capacity)
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"Worker {worker.worker_id} serving {worker.capacity} slots at {worker.url}", flush=True)
+    try:
+        worker.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        worker.server.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,241 @@
+"""
+Static simulation cost estimator
+Predicts output points, circuit size and RAW file size from a netlist
+before ngspice is launched, and decides whether a job should run
+"""
+
+import math
+import os
+from typing import Dict, Any, List, Tuple
+
+from core.netlist_parser import parse_netlist, collect_nodes, replace_line
+from core.utils import parse_spice_value
+
+# Admission limits (can be overridden by environment variables)
+MAX_POINTS = int(os.environ.get('NGSPICE_MAX_POINTS', '2000000'))
+LOW_PRIORITY_POINTS = int(os.environ.get('NGSPICE_LOW_PRIORITY_POINTS', '200000'))
+MAX_RAW_BYTES = int(os.environ.get('NGSPICE_MAX_RAW_MB', '256')) * 1024 * 1024
+
+# Approximate ASCII RAW bytes per stored value ("\t-1.234567890123456e-03\n")
+REAL_VALUE_BYTES = 24
+COMPLEX_VALUE_BYTES = 46
+POINT_HEADER_BYTES = 8
+
+# Element types that add a branch current vector to the output
+BRANCH_ELEMENTS = ('V', 'L', 'E', 'H')
+
+COMPLEX_ANALYSES = ('ac', 'noise', 'pz')
+
+
+def _value(token: str) -> float:
+    return parse_spice_value(token)
+
+
+def _sweep_points(kind: str, count: float, start: float, stop: float) -> int:
+    """Number of points produced by a dec/oct/lin sweep"""
+    kind = kind.lower()
+    if kind == 'lin':
+        return max(int(count), 1)
+    if start <= 0 or stop <= 0:
+        return max(int(count), 1)
+    base = 10.0 if kind == 'dec' else 2.0
+    span = abs(math.log(stop / start, base))
+    return int(math.floor(count * span)) + 1
+
+
+def _tran_points(args: List[str]) -> int:
+    """Output points of .tran tstep tstop [tstart [tmax]] [uic]"""
+    values = [_value(a) for a in args if a.lower() != 'uic']
+    tstep, tstop = values[0], values[1]
+    tstart = values[2] if len(values) > 2 else 0.0
+    span = max(tstop - tstart, 0.0)
+    # ngspice caps the internal step at min(tstep, span/50) unless tmax is given
+    step = min(tstep, span / 50.0) if span > 0 else tstep
+    if len(values) > 3 and values[3] > 0:
+        step = min(step, values[3])
+    if step <= 0:
+        return 1
+    return int(math.ceil(span / step - 1e-9)) + 1
+
+
+def _dc_points(args: List[str]) -> int:
+    """Output points of .dc src start stop step [src2 start2 stop2 step2]"""
+    points = 1
+    for i in range(0, len(args) - 3, 4):
+        start, stop, step = _value(args[i + 1]), _value(args[i + 2]), _value(args[i + 3])
+        if step == 0:
+            continue
+        points *= int(math.floor(abs(stop - start) / abs(step) + 1e-9)) + 1
+    return points
+
+
+def analysis_points(analysis: Dict[str, Any]) -> int:
+    """Estimate the number of output points of one analysis directive"""
+    kind = analysis['type']
+    args = analysis['args']
+    try:
+        if kind == 'tran':
+            return _tran_points(args)
+        if kind == 'ac':
+            return _sweep_points(args[0], _value(args[1]), _value(args[2]), _value(args[3]))
+        if kind == 'dc':
+            return _dc_points(args)
+        if kind == 'noise':
+            for i, token in enumerate(args):
+                if token.lower() in ('dec', 'oct', 'lin'):
+                    return _sweep_points(token, _value(args[i + 1]),
+                                         _value(args[i + 2]), _value(args[i + 3]))
+    except (IndexError, ValueError):
+        pass
+    return 1
+
+
+def estimate_simulation_cost(netlist: str) -> Dict[str, Any]:
+    """
+    Estimate the cost of simulating a netlist without running it
+
+    Args:
+        netlist: Netlist content
+
+    Returns:
+        Dictionary with node/element counts, number of output vectors,
+        per-analysis point counts and the expected RAW size in bytes.
+        'points' and 'raw_bytes' are totals over all analyses, which is
+        an upper bound on what a single RAW file will hold.
+    """
+    parsed = parse_netlist(netlist)
+    elements = parsed['elements']
+    nodes = collect_nodes(elements)
+    branches = sum(1 for e in elements if e['type'] in BRANCH_ELEMENTS)
+
+    # Scale vector + node voltages + branch currents
+    n_vectors = 1 + len(nodes) + branches
+
+    # A .save restricts the RAW file to the listed vectors
+    saved = [token.lower() for directive in parsed['directives']
+             if directive.split()[0].lower() == '.save' for token in directive.split()[1:]]
+    if saved and not any(token.startswith('all') for token in saved):
+        n_vectors = min(n_vectors, 1 + len(saved))
+
+    analyses = []
+    for analysis in parsed['analyses']:
+        points = analysis_points(analysis)
+        value_bytes = COMPLEX_VALUE_BYTES if analysis['type'] in COMPLEX_ANALYSES else REAL_VALUE_BYTES
+        analyses.append({
+            'type': analysis['type'],
+            'line': analysis['line'],
+            'points': points,
+            'raw_bytes': points * (n_vectors * value_bytes + POINT_HEADER_BYTES),
+        })
+
+    return {
+        'nodes': len(nodes),
+        'elements': len(elements),
+        'vectors': n_vectors,
+        'analyses': analyses,
+        'points': sum(a['points'] for a in analyses),
+        'raw_bytes': sum(a['raw_bytes'] for a in analyses),
+    }
+
+
+def classify_cost(estimate: Dict[str, Any],
+                  max_points: int = MAX_POINTS,
+                  low_priority_points: int = LOW_PRIORITY_POINTS,
+                  max_raw_bytes: int = MAX_RAW_BYTES) -> str:
+    """
+    Classify an estimate as 'run', 'low_priority' or 'oversize'
+    """
+    if estimate['points'] > max_points or estimate['raw_bytes'] > max_raw_bytes:
+        return 'oversize'
+    if estimate['points'] > low_priority_points:
+        return 'low_priority'
+    return 'run'
+
+
+def _format_number(value: float) -> str:
+    return f"{value:.6g}"
+
+
+def downscale_netlist(netlist: str, max_points: int = MAX_POINTS) -> str:
+    """
+    Coarsen .tran/.ac/.dc resolution so each analysis stays within max_points
+
+    Only the analysis directives are rewritten; the circuit is unchanged.
+    """
+    parsed = parse_netlist(netlist)
+    for analysis in parsed['analyses']:
+        points = analysis_points(analysis)
+        if points <= max_points:
+            continue
+
+        kind = analysis['type']
+        args = list(analysis['args'])
+        try:
+            if kind == 'tran':
+                flags = [a for a in args if a.lower() == 'uic']
+                values = [a for a in args if a.lower() != 'uic']
+                tstart = _value(values[2]) if len(values) > 2 else 0.0
+                span = _value(values[1]) - tstart
+                values[0] = _format_number(span / max(max_points - 1, 1))
+                # Drop a tmax that would force the fine step back in
+                args = values[:3] + flags
+            elif kind == 'ac':
+                if args[0].lower() == 'lin':
+                    args[1] = str(max_points)
+                else:
+                    factor = max_points / float(points)
+                    args[1] = str(max(int(_value(args[1]) * factor), 1))
+            elif kind == 'dc':
+                factor = points / float(max_points)
+                # Spread the reduction over the sweep dimensions
+                n_sweeps = max(len(args) // 4, 1)
+                scale = factor ** (1.0 / n_sweeps)
+                for i in range(0, len(args) - 3, 4):
+                    args[i + 3] = _format_number(_value(args[i + 3]) * scale)
+            else:
+                continue
+        except (IndexError, ValueError):
+            continue
+
+        netlist = replace_line(netlist, analysis['line'], f".{kind} {' '.join(args)}")
+    return netlist
+
+
+def plan_simulation(netlist: str, oversize_action: str = 'reject') -> Tuple[str, str, Dict[str, Any]]:
+    """
+    Decide how a netlist should be run based on its estimated cost
+
+    Args:
+        netlist: Netlist content
+        oversize_action: 'reject' or 'downscale' for jobs over the limits
+
+    Returns:
+        (decision, netlist_to_run, estimate) where decision is one of
+        'run', 'low_priority', 'downscale' or 'reject'
+    """
+    estimate = estimate_simulation_cost(netlist)
+    decision = classify_cost(estimate)
+
+    if decision != 'oversize':
+        return decision, netlist, estimate
+
+    if oversize_action == 'downscale':
+        budget = max(MAX_POINTS // max(len(estimate['analyses']), 1), 1)
+        # Halve the per-analysis budget until the RAW size limit is met too
+        while budget >= 1:
+            scaled = downscale_netlist(netlist, budget)
+            scaled_estimate = estimate_simulation_cost(scaled)
+            if classify_cost(scaled_estimate) != 'oversize':
+                return 'downscale', scaled, scaled_estimate
+            budget //= 2
+
+    return 'reject', netlist, estimate
+
+
+def describe_estimate(estimate: Dict[str, Any]) -> str:
+    """Human-readable one-line summary of an estimate"""
+    return (
+        f"{estimate['points']:,} points, {estimate['nodes']} nodes, "
+        f"{estimate['elements']} elements, "
+        f"~{estimate['raw_bytes'] / (1024 * 1024):.1f} MB RAW"
+    )
@@ -0,0 +1,263 @@
+"""
+Managed model and subcircuit library
+Indexes a directory of .lib/.model/.subckt files by definition name and
+injects only the definitions a netlist references
+"""
+
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Set, Tuple
+
+from core.netlist_parser import parse_netlist, MODEL_REFERENCE_TYPES
+
+LIBRARY_EXTENSIONS = ('.lib', '.mod', '.model', '.models', '.sub', '.subckt', '.inc', '.sp', '.spi', '.cir')
+
+INDEX_FILE = '.library_index.json'
+INDEX_VERSION = 1
+
+# Library location for the app and runner (can be overridden by environment variable)
+DEFAULT_LIBRARY_DIR = os.environ.get('OPENSPICE_LIBRARY_DIR', '')
+
+INJECTED_MARKER = '* --- definitions from model library ---'
+
+
+def scan_library_file(path: Path) -> List[Dict[str, Any]]:
+    """
+    Locate every .model card and .subckt definition in a file
+
+    Returns:
+        Entries with 'name', 'kind' ('model' or 'subckt'), 'offset' and
+        'length' in bytes. Model cards include their '+' continuation lines;
+        subcircuits run through the matching .ends line.
+    """
+    entries: List[Dict[str, Any]] = []
+    current: Optional[Dict[str, Any]] = None
+    depth = 0
+    offset = 0
+
+    with open(path, 'rb') as f:
+        for raw in f:
+            line = raw.decode('utf-8', errors='replace').strip()
+            lower = line.lower()
+
+            if current is not None and current['kind'] == 'model':
+                if line.startswith('+') or not line or line.startswith('*'):
+                    if line.startswith('+'):
+                        current['length'] = offset + len(raw) - current['offset']
+                    offset += len(raw)
+                    continue
+                current = None
+
+            if current is not None and current['kind'] == 'subckt':
+                if lower.startswith('.subckt'):
+                    depth += 1
+                elif lower.startswith('.ends'):
+                    depth -= 1
+                    if depth == 0:
+                        current['length'] = offset + len(raw) - current['offset']
+                        current = None
+                offset += len(raw)
+                continue
+
+            tokens = line.split()
+            if len(tokens) >= 2 and lower.startswith('.model'):
+                current = {'name': tokens[1].split('(')[0], 'kind': 'model', 'offset': offset, 'length': len(raw)}
+                entries.append(current)
+            elif len(tokens) >= 2 and lower.startswith('.subckt'):
+                current = {'name': tokens[1], 'kind': 'subckt', 'offset': offset, 'length': len(raw)}
+                depth = 1
+                entries.append(current)
+            offset += len(raw)
+
+    return entries
+
+
+def referenced_names(text: str) -> Tuple[Set[str], Set[str]]:
+    """
+    Model/subcircuit names a netlist fragment uses and the ones it defines
+
+    Returns:
+        (referenced, defined), lower-case
+    """
+    parsed = parse_netlist('*\n' + text)
+    defined = set(parsed['models']) | set(parsed['subckts'])
+    elements = list(parsed['elements'])
+    for sub in parsed['subckts'].values():
+        elements.extend(sub['elements'])
+
+    referenced = set()
+    for element in elements:
+        if element['type'] not in MODEL_REFERENCE_TYPES:
+            continue
+        positional = [a for a in element['args'] if '=' not in a]
+        if positional:
+            referenced.add(positional[0].lower())
+    return referenced, defined
+
+
+class ModelLibrary:
+    """
+    Directory of model/subcircuit files with a persistent name index
+
+    The index maps each definition name to its file and byte range, so a
+    definition is read with one seek. It is stored in the library directory
+    and only files whose size or mtime changed are rescanned. Definitions
+    that have been read are kept in an in-memory LRU cache.
+    """
+
+    def __init__(self, root: str, cache_size: int = 4096):
+        self.root = Path(root)
+        self.cache_size = cache_size
+        self._index: Dict[str, Dict[str, Any]] = {}
+        self._files: Dict[str, Dict[str, Any]] = {}
+        self._cache: 'OrderedDict[str, Tuple[str, Set[str]]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.build_index()
+
+    @property
+    def index_path(self) -> Path:
+        return self.root / INDEX_FILE
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, name: str) -> bool:
+        return name.lower() in self._index
+
+    def _load_saved_index(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.index_path, 'r') as f:
+                saved = json.load(f)
+            if saved.get('version') == INDEX_VERSION:
+                return saved['files']
+        except (OSError, ValueError, KeyError):
+            pass
+        return {}
+
+    def build_index(self, force: bool = False) -> int:
+        """
+        (Re)build the name index, rescanning only changed files
+
+        Returns:
+            Number of files scanned
+        """
+        saved = {} if force else self._load_saved_index()
+        files: Dict[str, Dict[str, Any]] = {}
+        scanned = 0
+
+        for path in sorted(self.root.rglob('*')):
+            if not path.is_file() or path.suffix.lower() not in LIBRARY_EXTENSIONS:
+                continue
+            rel = path.relative_to(self.root).as_posix()
+            stat = path.stat()
+            previous = saved.get(rel)
+            if previous and previous['mtime'] == stat.st_mtime_ns and previous['size'] == stat.st_size:
+                files[rel] = previous
+                continue
+            files[rel] = {'mtime': stat.st_mtime_ns, 'size': stat.st_size, 'entries': scan_library_file(path)}
+            scanned += 1
+
+        index: Dict[str, Dict[str, Any]] = {}
+        for rel, info in files.items():
+            for entry in info['entries']:
+                # First definition wins, in sorted file order
+                index.setdefault(entry['name'].lower(), dict(entry, file=rel))
+
+        with self._lock:
+            self._files = files
+            self._index = index
+            self._cache.clear()
+
+        if scanned or set(files) != set(saved):
+            tmp_path = self.index_path.with_suffix('.tmp')
+            try:
+                with open(tmp_path, 'w') as f:
+                    json.dump({'version': INDEX_VERSION, 'files': files}, f)
+                os.replace(tmp_path, self.index_path)
+            except OSError:
+                # Read-only library: keep the index in memory only
+                pass
+        return scanned
+
+    def lookup(self, name: str) -> Optional[Dict[str, Any]]:
+        """Index entry (file, kind, offset, length) for a definition name"""
+        return self._index.get(name.lower())
+
+    def _read(self, name: str) -> Optional[Tuple[str, Set[str]]]:
+        """Definition text and the names it references, through the LRU cache"""
+        key = name.lower()
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        entry = self.lookup(key)
+        if entry is None:
+            return None
+        with open(self.root / entry['file'], 'rb') as f:
+            f.seek(entry['offset'])
+            text = f.read(entry['length']).decode('utf-8', errors='replace').rstrip('\n')
+        referenced, defined = referenced_names(text)
+        value = (text, referenced - defined)
+
+        with self._lock:
+            self._cache[key] = value
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return value
+
+    def get_definition(self, name: str) -> Optional[str]:
+        """Text of a .model card or .subckt block"""
+        value = self._read(name)
+        return value[0] if value else None
+
+    def resolve(self, netlist: str) -> List[str]:
+        """
+        Library definitions needed by a netlist, dependencies first
+
+        Names defined inline in the netlist are not taken from the library.
+        Subcircuits pull in the models and subcircuits they use.
+        """
+        referenced, defined = referenced_names(netlist.split('\n', 1)[1] if '\n' in netlist else '')
+        ordered: List[str] = []
+        visiting: Set[str] = set()
+
+        def visit(name: str) -> None:
+            if name in defined or name in visiting or name in ordered:
+                return
+            value = self._read(name)
+            if value is None:
+                return
+            visiting.add(name)
+            for dependency in sorted(value[1]):
+                visit(dependency)
+            visiting.discard(name)
+            ordered.append(name)
+
+        for name in sorted(referenced):
+            visit(name)
+        return ordered
+
+    def inject(self, netlist: str) -> str:
+        """
+        Insert the referenced library definitions into a netlist
+
+        Definitions go before the .control block (or .end) so they are part
+        of the circuit deck. Netlists that need nothing are returned as-is.
+        """
+        names = self.resolve(netlist)
+        if not names:
+            return netlist
+        block = [INJECTED_MARKER] + [self.get_definition(name) for name in names]
+
+        lines = netlist.split('\n')
+        insert_at = len(lines)
+        for i, line in enumerate(lines):
+            lower = line.strip().lower()
+            if i > 0 and (lower.startswith('.control') or lower == '.end'):
+                insert_at = i
+                break
+        return '\n'.join(lines[:insert_at] + block + lines[insert_at:])
@@ -0,0 +1,244 @@
+"""
+Streaming ngspice log handling
+Keeps a bounded head and tail of a simulation log and extracts
+convergence problems, singular matrices and missing models in one pass
+"""
+
+import os
+import re
+from collections import deque
+from typing import Dict, Any, List, Pattern, Tuple
+
+# Lines kept from the start and the end of a log (can be overridden by environment variable)
+LOG_HEAD_LINES = int(os.environ.get('OPENSPICE_LOG_HEAD_LINES', '200'))
+LOG_TAIL_LINES = int(os.environ.get('OPENSPICE_LOG_TAIL_LINES', '200'))
+
+# Longer log lines are cut to this many characters
+MAX_LINE_LENGTH = 1000
+
+# Distinct nodes/models remembered per issue
+MAX_SUBJECTS = 10
+
+# Bytes read per chunk when streaming a log file
+READ_CHUNK = 1 << 16
+
+# First line of the issue summary appended to a bounded log
+SUMMARY_HEADER = "Log summary:"
+
+# Header of the block that keeps .meas results from omitted lines
+MEASUREMENTS_HEADER = "Measurements (from omitted lines):"
+
+# .meas result lines remembered for that block
+MAX_MEASUREMENT_LINES = 1000
+
+# ngspice prints .meas results as 'name = value'
+_MEASUREMENT_LINE = re.compile(r'^\s*[A-Za-z_]\w*\s*=\s*[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?(?:\s|$)')
+
+# (kind, severity, label, pattern); the first group, if any, names the node or model involved
+ISSUE_PATTERNS: List[Tuple[str, str, str, Pattern[str]]] = [
+    ('timestep_too_small', 'error', 'Timestep too small',
+     re.compile(r'timestep too small(?:.*trouble with (?:node|instance) "?([^"\s]+))?', re.I)),
+    ('singular_matrix', 'error', 'Singular matrix',
+     re.compile(r'singular matrix(?:.*?check nodes? ([^\s,]+))?', re.I)),
+    ('unknown_model', 'error', 'Unknown model',
+     re.compile(r'(?:unable to find definition of model|could not find (?:a valid )?model(?:name)?|'
+                r'unknown model(?: type)?)[\s:]*"?([^"\s-][^"\s]*)?', re.I)),
+    ('gmin_stepping_failed', 'warning', 'Gmin stepping failed', re.compile(r'gmin stepping failed', re.I)),
+    ('source_stepping_failed', 'warning', 'Source stepping failed', re.compile(r'source stepping failed', re.I)),
+    ('no_convergence', 'error', 'No convergence',
+     re.compile(r'(?:iteration limit reached|no convergence|failed to converge)', re.I)),
+    ('error', 'error', 'Error', re.compile(r'^\s*(?:\S+:\s*)?error\b', re.I)),
+    ('warning', 'warning', 'Warning', re.compile(r'^\s*warning\b', re.I)),
+]
+
+_SUMMARY_LINE = re.compile(r'^- (error|warning) \[(\w+)\] x(\d+) @ line (\d+)(?: \{([^}]*)\})?: (.*)$')
+
+
+class LogPipeline:
+    """
+    One-pass log consumer with bounded memory
+
+    Lines are fed as they are produced (or read from a file in chunks);
+    the first `head` and last `tail` lines are kept and everything in
+    between is only counted. Every line is matched against ISSUE_PATTERNS;
+    the first matching pattern wins, so specific problems are not also
+    reported as generic errors. '.meas' result lines are collected as well,
+    so results printed in the omitted middle still reach the rendered log.
+    """
+
+    def __init__(self, head: int = LOG_HEAD_LINES, tail: int = LOG_TAIL_LINES,
+                 max_line_length: int = MAX_LINE_LENGTH):
+        self.head_size = head
+        self.max_line_length = max_line_length
+        self.head: List[str] = []
+        self.tail: 'deque[str]' = deque(maxlen=tail)
+        self.lines = 0
+        self.bytes = 0
+        self.issues: Dict[str, Dict[str, Any]] = {}
+        self.measurements: List[Tuple[int, str]] = []
+        self._partial = ''
+
+    def feed_line(self, line: str) -> None:
+        """Consume one line (without or with its newline)"""
+        line = line.rstrip('\r\n')
+        self.lines += 1
+        self.bytes += len(line) + 1
+        if len(line) > self.max_line_length:
+            line = line[:self.max_line_length] + ' [...]'
+        if len(self.head) < self.head_size:
+            self.head.append(line)
+        else:
+            self.tail.append(line)
+        if line.strip():
+            self._match(line)
+            if len(self.measurements) < MAX_MEASUREMENT_LINES and _MEASUREMENT_LINE.match(line):
+                self.measurements.append((self.lines, line.strip()))
+
+    def feed(self, text: str) -> None:
+        """Consume a chunk of text; an unterminated last line waits for the next chunk"""
+        if not text:
+            return
+        lines = (self._partial + text).split('\n')
+        self._partial = lines.pop()
+        for line in lines:
+            self.feed_line(line)
+
+    def feed_file(self, path: str) -> None:
+        """Stream a log file through the pipeline"""
+        with open(path, 'r', errors='replace') as f:
+            for chunk in iter(lambda: f.read(READ_CHUNK), ''):
+                self.feed(chunk)
+        self.flush()
+
+    def flush(self) -> None:
+        """Consume a pending unterminated line"""
+        if self._partial:
+            partial, self._partial = self._partial, ''
+            self.feed_line(partial)
+
+    def _match(self, line: str) -> None:
+        for kind, severity, label, pattern in ISSUE_PATTERNS:
+            match = pattern.search(line)
+            if match is None:
+                continue
+            issue = self.issues.get(kind)
+            if issue is None:
+                issue = self.issues[kind] = {
+                    'kind': kind, 'severity': severity, 'label': label, 'count': 0,
+                    'first_line': self.lines, 'message': line.strip(), 'subjects': [],
+                }
+            issue['count'] += 1
+            subject = match.group(1) if pattern.groups else None
+            if subject and subject not in issue['subjects'] and len(issue['subjects']) < MAX_SUBJECTS:
+                issue['subjects'].append(subject)
+            return
+
+    @property
+    def omitted(self) -> int:
+        """Lines dropped between head and tail"""
+        return self.lines - len(self.head) - len(self.tail)
+
+    def text(self) -> str:
+        """Kept head and tail, with a marker where lines were omitted"""
+        self.flush()
+        parts = list(self.head)
+        if self.omitted:
+            parts.append(f"[... {self.omitted} lines ({self.bytes / 2**20:.1f} MB total log) omitted ...]")
+        parts.extend(self.tail)
+        return '\n'.join(parts)
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Structured view of the log
+
+        Returns:
+            {'lines', 'bytes', 'omitted', 'errors', 'warnings', 'issues': [...]}
+            with issues ordered errors first, then by first occurrence
+        """
+        self.flush()
+        issues = sorted(self.issues.values(), key=lambda i: (i['severity'] != 'error', i['first_line']))
+        return {
+            'lines': self.lines,
+            'bytes': self.bytes,
+            'omitted': max(self.omitted, 0),
+            'errors': sum(i['count'] for i in issues if i['severity'] == 'error'),
+            'warnings': sum(i['count'] for i in issues if i['severity'] == 'warning'),
+            'issues': issues,
+        }
+
+    def report(self) -> str:
+        """Issue summary block for the end of the log text (empty if nothing to report)"""
+        summary = self.summary()
+        if not summary['issues'] and not summary['omitted']:
+            return ''
+        lines = [f"{SUMMARY_HEADER} {summary['errors']} error(s), {summary['warnings']} warning(s) "
+                 f"in {summary['lines']} lines"]
+        for issue in summary['issues']:
+            subjects = f" {{{', '.join(issue['subjects'])}}}" if issue['subjects'] else ''
+            lines.append(f"- {issue['severity']} [{issue['kind']}] x{issue['count']} "
+                         f"@ line {issue['first_line']}{subjects}: {issue['message']}")
+        return '\n'.join(lines)
+
+    def omitted_measurements(self) -> List[str]:
+        """'.meas' result lines that fell between head and tail"""
+        self.flush()
+        first, last = len(self.head), self.lines - len(self.tail)
+        return [line for number, line in self.measurements if first < number <= last]
+
+    def render(self) -> str:
+        """Bounded log text, .meas results from omitted lines and the issue summary"""
+        text = self.text()
+        measurements = self.omitted_measurements()
+        if measurements:
+            text += '\n\n' + '\n'.join([MEASUREMENTS_HEADER] + measurements)
+        report = self.report()
+        return text + (f"\n\n{report}" if report else '')
+
+
+def bounded_log(text: str, head: int = LOG_HEAD_LINES, tail: int = LOG_TAIL_LINES) -> str:
+    """Run already collected text through a LogPipeline; returns its render()"""
+    pipeline = LogPipeline(head, tail)
+    pipeline.feed(text)
+    return pipeline.render()
+
+
+def summarize_log(log: str) -> Dict[str, Any]:
+    """
+    Structured summary of a simulation log
+
+    Logs produced by the runner end with a LogPipeline report covering the
+    whole ngspice output, including omitted lines; that report is read
+    back. Other text is scanned directly.
+
+    Returns:
+        Same dictionary as LogPipeline.summary()
+    """
+    labels = {kind: label for kind, _, label, _ in ISSUE_PATTERNS}
+    start = log.rfind(SUMMARY_HEADER)
+    if start == -1:
+        pipeline = LogPipeline()
+        pipeline.feed(log)
+        return pipeline.summary()
+
+    head = log[start:].split('\n', 1)[0]
+    total = re.search(r'in (\d+) lines', head)
+    issues = []
+    for line in log[start:].splitlines()[1:]:
+        match = _SUMMARY_LINE.match(line)
+        if match is None:
+            continue
+        severity, kind, count, first_line, subjects, message = match.groups()
+        issues.append({
+            'kind': kind, 'severity': severity, 'label': labels.get(kind, kind), 'count': int(count),
+            'first_line': int(first_line), 'message': message,
+            'subjects': [s.strip() for s in subjects.split(',')] if subjects else [],
+        })
+    omitted = re.search(r'\[\.\.\. (\d+) lines', log)
+    return {
+        'lines': int(total.group(1)) if total else None,
+        'bytes': None,
+        'omitted': int(omitted.group(1)) if omitted else 0,
+        'errors': sum(i['count'] for i in issues if i['severity'] == 'error'),
+        'warnings': sum(i['count'] for i in issues if i['severity'] == 'warning'),
+        'issues': issues,
+    }
@@ -0,0 +1,96 @@
+"""
+Measurement extraction
+Collects .meas results from the ngspice log and basic per-trace statistics
+from parsed results
+"""
+
+import re
+from typing import Dict, Any, List, Optional, Sequence, TYPE_CHECKING
+
+from core.netlist_parser import logical_lines, tokenize
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+_NUMBER = r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?'
+
+
+def measurement_names(netlist: str) -> List[str]:
+    """Names of the .meas/.measure directives in a netlist, in order"""
+    names = []
+    for line in logical_lines(netlist)[1:]:
+        tokens = tokenize(line)
+        if len(tokens) >= 3 and tokens[0].lower() in ('.meas', '.measure'):
+            names.append(tokens[2])
+    return names
+
+
+def parse_measurements(log: str, names: Optional[Sequence[str]] = None) -> Dict[str, Optional[float]]:
+    """
+    Extract .meas results from ngspice output
+
+    ngspice prints each result as 'name = value' (followed by trig/targ
+    details for delay measurements) or reports it as failed.
+
+    Args:
+        log: ngspice log content
+        names: Measurements to look for (default: every 'name = value' line)
+
+    Returns:
+        {name: value}, lower-case names; failed measurements map to None
+    """
+    if names is not None:
+        wanted = [n.lower() for n in names]
+        results: Dict[str, Optional[float]] = {n: None for n in wanted}
+        if not wanted:
+            return results
+        pattern = '|'.join(re.escape(n) for n in wanted)
+    else:
+        results = {}
+        pattern = r'[A-Za-z_]\w*'
+
+    line_re = re.compile(rf'^\s*({pattern})\s*=\s*({_NUMBER})(?:\s|$)', re.IGNORECASE | re.MULTILINE)
+    for match in line_re.finditer(log):
+        results[match.group(1).lower()] = float(match.group(2))
+    return results
+
+
+def trace_statistics(df: 'pd.DataFrame', columns: Optional[Sequence[str]] = None) -> Dict[str, Dict[str, float]]:
+    """
+    Min/max/mean/final value of each trace
+
+    Complex (AC) traces are summarized by magnitude.
+
+    Returns:
+        {column: {'min', 'max', 'mean', 'final'}}
+    """
+    import numpy as np
+
+    stats = {}
+    for name in (columns if columns is not None else df.columns):
+        if name not in df.columns or len(df) == 0:
+            continue
+        values = np.asarray(df[name].to_numpy())
+        if values.dtype == object or np.iscomplexobj(values):
+            values = np.abs(values.astype(complex))
+        values = values.astype(float)
+        stats[str(name)] = {
+            'min': float(np.min(values)),
+            'max': float(np.max(values)),
+            'mean': float(np.mean(values)),
+            'final': float(values[-1]),
+        }
+    return stats
+
+
+def measure_result(netlist: str, log: str, df: Optional['pd.DataFrame'] = None) -> Dict[str, Any]:
+    """
+    All measurements for one simulation
+
+    Returns:
+        {'meas': {name: value}, 'stats': {column: {...}}}
+    """
+    return {
+        'meas': parse_measurements(log, measurement_names(netlist)),
+        'stats': trace_statistics(df) if df is not None else {},
+    }
@@ -0,0 +1,322 @@
+"""
+In-process modified nodal analysis for linear AC sweeps
+Solves R/L/C/V/I/E/G netlists for every frequency point with one batched
+NumPy linear solve, producing the same (DataFrame, metadata) structure
+as parse_ascii_raw
+"""
+
+import math
+import time
+from typing import Dict, Any, List, Optional, Tuple, TYPE_CHECKING
+
+import numpy as np
+
+from core.netlist_parser import parse_netlist, collect_nodes, logical_lines, GROUND_NODES
+from core.utils import parse_spice_value
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+SUPPORTED_ELEMENTS = ('R', 'L', 'C', 'V', 'I', 'E', 'G')
+
+# Elements that introduce a branch-current unknown
+BRANCH_ELEMENTS = ('V', 'L', 'E')
+
+# Dense solves beyond this many unknowns are left to ngspice's sparse solver
+MAX_UNKNOWNS = 400
+
+# Upper bound on complex matrix entries materialized per batched solve
+SOLVE_CHUNK_ELEMENTS = 4_000_000
+
+# Directives that do not change a linear small-signal AC solution
+IGNORED_DIRECTIVES = ('.options', '.option', '.opt', '.nodeset', '.ic', '.temp', '.title', '.save', '.width')
+
+
+class UnsupportedCircuitError(ValueError):
+    """Raised when a netlist cannot be handled by the MNA fast path"""
+
+
+def _value(token: str) -> float:
+    try:
+        return parse_spice_value(token)
+    except ValueError:
+        raise UnsupportedCircuitError(f"Non-numeric value: {token}")
+
+
+def _source_phasor(args: List[str]) -> complex:
+    """AC phasor of an independent source ('AC mag [phase]'), 0 if it has none"""
+    tokens = [t for t in args if '(' not in t and ')' not in t]
+    for i, token in enumerate(tokens):
+        if token.upper() == 'AC':
+            magnitude, phase = 1.0, 0.0
+            if i + 1 < len(tokens):
+                try:
+                    magnitude = parse_spice_value(tokens[i + 1])
+                except ValueError:
+                    return complex(magnitude)
+            if i + 2 < len(tokens):
+                try:
+                    phase = parse_spice_value(tokens[i + 2])
+                except ValueError:
+                    pass
+            return magnitude * complex(math.cos(math.radians(phase)), math.sin(math.radians(phase)))
+        if token.upper().startswith('DISTOF'):
+            raise UnsupportedCircuitError("Distortion sources are not supported")
+    return 0j
+
+
+def ac_frequencies(args: List[str]) -> np.ndarray:
+    """Frequency points of '.ac dec|oct|lin n fstart fstop'"""
+    if len(args) < 4:
+        raise UnsupportedCircuitError("Incomplete .ac directive")
+    kind = args[0].lower()
+    count, fstart, fstop = _value(args[1]), _value(args[2]), _value(args[3])
+    if kind == 'lin':
+        return np.linspace(fstart, fstop, max(int(count), 1))
+    if kind not in ('dec', 'oct') or fstart <= 0 or fstop < fstart:
+        raise UnsupportedCircuitError(f"Unsupported .ac sweep: {' '.join(args)}")
+    base = 10.0 if kind == 'dec' else 2.0
+    n_points = int(math.floor(count * math.log(fstop / fstart, base) + 1e-9)) + 1
+    return fstart * base ** (np.arange(n_points) / count)
+
+
+def build_mna_system(parsed: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Assemble the MNA matrices of a parsed linear netlist
+
+    The system is (G + s*C) x = b with x = [node voltages, branch currents].
+
+    Returns:
+        Dictionary with 'G', 'C' (real N x N), 'b' (complex N), 'nodes'
+        and 'branches' (element names owning a branch current)
+    """
+    if parsed['subckts'] or parsed['models']:
+        raise UnsupportedCircuitError("Models and subcircuits are not supported")
+    for directive in parsed['directives']:
+        if directive.split()[0].lower() not in IGNORED_DIRECTIVES:
+            raise UnsupportedCircuitError(f"Unsupported directive: {directive}")
+
+    elements = parsed['elements']
+    for element in elements:
+        if element['type'] not in SUPPORTED_ELEMENTS:
+            raise UnsupportedCircuitError(f"Unsupported element: {element['name']}")
+        if element['type'] not in ('V', 'I') and any('=' in a for a in element['args']):
+            raise UnsupportedCircuitError(f"Element parameters are not supported: {element['name']}")
+
+    nodes = collect_nodes(elements)
+    node_index = {name: i for i, name in enumerate(nodes)}
+    branches = [e['name'] for e in elements if e['type'] in BRANCH_ELEMENTS]
+    branch_index = {name: len(nodes) + i for i, name in enumerate(branches)}
+    size = len(nodes) + len(branches)
+    if size > MAX_UNKNOWNS:
+        raise UnsupportedCircuitError(f"Circuit too large for the dense fast path ({size} unknowns)")
+
+    G = np.zeros((size, size))
+    C = np.zeros((size, size))
+    b = np.zeros(size, dtype=complex)
+
+    def idx(node: str) -> int:
+        node = node.lower()
+        return -1 if node in GROUND_NODES else node_index[node]
+
+    def stamp(matrix: np.ndarray, row: int, col: int, value: float) -> None:
+        if row >= 0 and col >= 0:
+            matrix[row, col] += value
+
+    def stamp_conductance(matrix: np.ndarray, a: int, c: int, value: float) -> None:
+        stamp(matrix, a, a, value)
+        stamp(matrix, c, c, value)
+        stamp(matrix, a, c, -value)
+        stamp(matrix, c, a, -value)
+
+    def stamp_branch(a: int, c: int, k: int) -> None:
+        stamp(G, a, k, 1.0)
+        stamp(G, c, k, -1.0)
+        stamp(G, k, a, 1.0)
+        stamp(G, k, c, -1.0)
+
+    for element in elements:
+        etype = element['type']
+        if len(element['nodes']) < (4 if etype in ('E', 'G') else 2):
+            raise UnsupportedCircuitError(f"Incomplete element: {element['name']}")
+        a, c = idx(element['nodes'][0]), idx(element['nodes'][1])
+
+        if etype == 'R':
+            resistance = _value(element['value'])
+            if resistance == 0:
+                raise UnsupportedCircuitError(f"Zero resistance: {element['name']}")
+            stamp_conductance(G, a, c, 1.0 / resistance)
+        elif etype == 'C':
+            stamp_conductance(C, a, c, _value(element['value']))
+        elif etype == 'L':
+            k = branch_index[element['name']]
+            stamp_branch(a, c, k)
+            C[k, k] -= _value(element['value'])
+        elif etype == 'V':
+            k = branch_index[element['name']]
+            stamp_branch(a, c, k)
+            b[k] += _source_phasor(element['args'])
+        elif etype == 'I':
+            phasor = _source_phasor(element['args'])
+            if a >= 0:
+                b[a] -= phasor
+            if c >= 0:
+                b[c] += phasor
+        elif etype == 'E':
+            k = branch_index[element['name']]
+            pc, nc = idx(element['nodes'][2]), idx(element['nodes'][3])
+            gain = _value(element['value'])
+            stamp_branch(a, c, k)
+            stamp(G, k, pc, -gain)
+            stamp(G, k, nc, gain)
+        elif etype == 'G':
+            pc, nc = idx(element['nodes'][2]), idx(element['nodes'][3])
+            gm = _value(element['value'])
+            stamp(G, a, pc, gm)
+            stamp(G, a, nc, -gm)
+            stamp(G, c, pc, -gm)
+            stamp(G, c, nc, gm)
+
+    return {'G': G, 'C': C, 'b': b, 'nodes': nodes, 'branches': branches}
+
+
+def solve_mna(G: np.ndarray, C: np.ndarray, b: np.ndarray, frequencies: np.ndarray) -> np.ndarray:
+    """
+    Solve (G + j*2*pi*f*C) x = b for all frequencies in one batched call
+
+    G, C and b may carry leading batch dimensions (e.g. circuit variants);
+    the frequency axis is inserted just before the matrix dimensions.
+
+    Returns:
+        Complex array of shape (..., n_frequencies, N)
+    """
+    s = 2j * np.pi * np.asarray(frequencies, dtype=float)
+    size = G.shape[-1]
+    batch = int(np.prod(G.shape[:-2])) if G.ndim > 2 else 1
+    chunk = max(SOLVE_CHUNK_ELEMENTS // max(size * size * batch, 1), 1)
+
+    parts = []
+    for start in range(0, len(s), chunk):
+        s_chunk = s[start:start + chunk]
+        A = G[..., None, :, :] + s_chunk[:, None, None] * C[..., None, :, :]
+        rhs = np.broadcast_to(b[..., None, :, None], A.shape[:-1] + (1,))
+        try:
+            parts.append(np.linalg.solve(A, rhs)[..., 0])
+        except np.linalg.LinAlgError:
+            raise UnsupportedCircuitError("Singular MNA matrix (floating node or source loop)")
+    return np.concatenate(parts, axis=-2)
+
+
+def output_names(system: Dict[str, Any]) -> List[Tuple[str, str]]:
+    """(vector name, type) of each MNA unknown, using ngspice naming"""
+    return ([(f"v({node})", 'voltage') for node in system['nodes']] +
+            [(f"i({name.lower()})", 'current') for name in system['branches']])
+
+
+def output_selection(netlist: str) -> Optional[List[str]]:
+    """
+    Vectors ngspice would write for the netlist
+
+    Returns:
+        Lower-case vector names from 'write output.raw <vectors>' or, if
+        that writes everything, from .save lines; None for all vectors
+
+    Raises:
+        UnsupportedCircuitError: if the .control block holds commands
+            other than the sanitizer's own (alter, let, meas, print, ...)
+    """
+    written: Optional[List[str]] = None
+    saved: List[str] = []
+    in_control = False
+    for line in logical_lines(netlist)[1:]:
+        lower = line.lower()
+        if lower.startswith('.control'):
+            in_control = True
+        elif lower.startswith('.endc'):
+            in_control = False
+        elif in_control:
+            # Only the commands the sanitizer generates are understood
+            tokens = lower.split()
+            if tokens[:2] == ['write', 'output.raw']:
+                if tokens[2:]:
+                    written = (written or []) + tokens[2:]
+            elif not (lower.startswith('set filetype') or lower in ('run', 'quit', 'exit')):
+                raise UnsupportedCircuitError(f"Control command needs ngspice: {line}")
+        elif lower.split()[0] == '.save':
+            saved.extend(v for v in lower.split()[1:] if v != 'all')
+    return written or saved or None
+
+
+def _selected_outputs(selection: List[str], names: List[Tuple[str, str]]) -> List[int]:
+    """Indices of the selected vectors among the MNA outputs"""
+    columns = {name: i for i, (name, _) in enumerate(names)}
+    missing = [v for v in selection if v not in columns]
+    if missing:
+        raise UnsupportedCircuitError(f"Saved vectors need ngspice: {' '.join(missing)}")
+    return [columns[v] for v in dict.fromkeys(selection)]
+
+
+def supports_fast_ac(netlist: str) -> bool:
+    """True if the netlist is a linear circuit with a single .ac analysis and no user control commands"""
+    try:
+        selection = output_selection(netlist)
+        parsed = parse_netlist(netlist)
+        if [a['type'] for a in parsed['analyses']] != ['ac']:
+            return False
+        system = build_mna_system(parsed)
+        if selection is not None:
+            _selected_outputs(selection, output_names(system))
+        ac_frequencies(parsed['analyses'][0]['args'])
+        return True
+    except UnsupportedCircuitError:
+        return False
+
+
+def solve_linear_ac(netlist: str) -> Tuple['pd.DataFrame', Dict[str, Any]]:
+    """
+    Run a linear AC analysis in-process
+
+    Args:
+        netlist: Netlist with R/L/C/V/I/E/G elements and a single .ac
+
+    Returns:
+        (DataFrame indexed by frequency, metadata) like parse_ascii_raw,
+        limited to the vectors selected by .save/write output.raw
+
+    Raises:
+        UnsupportedCircuitError: if the netlist needs ngspice
+    """
+    import pandas as pd
+
+    selection = output_selection(netlist)
+    parsed = parse_netlist(netlist)
+    if [a['type'] for a in parsed['analyses']] != ['ac']:
+        raise UnsupportedCircuitError("Only a single .ac analysis is supported")
+
+    frequencies = ac_frequencies(parsed['analyses'][0]['args'])
+    system = build_mna_system(parsed)
+    solution = solve_mna(system['G'], system['C'], system['b'], frequencies)
+
+    names = output_names(system)
+    if selection is not None:
+        keep = _selected_outputs(selection, names)
+        names = [names[i] for i in keep]
+        solution = solution[:, keep]
+    df = pd.DataFrame(solution, columns=[name for name, _ in names])
+    df.index = pd.Index(frequencies, name='frequency')
+
+    variables = [{'index': 0, 'name': 'frequency', 'type': 'frequency', 'unit': ''}]
+    for i, (name, vtype) in enumerate(names, start=1):
+        variables.append({'index': i, 'name': name, 'type': vtype, 'unit': ''})
+
+    metadata = {
+        'title': parsed['title'],
+        'date': time.strftime('%a %b %d %H:%M:%S %Y'),
+        'plotname': 'AC Analysis',
+        'flags': 'complex',
+        'no_variables': len(variables),
+        'no_points': len(frequencies),
+        'variables': variables,
+        'engine': 'mna',
+    }
+    return df, metadata
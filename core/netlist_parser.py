@@ -0,0 +1,319 @@
+"""
+Lightweight SPICE netlist parser
+Splits a netlist into elements, models, subcircuits and analysis directives
+"""
+
+import re
+from typing import Dict, List, Any, Optional, Tuple
+
+from core.utils import parse_spice_value
+
+# Number of node terminals for each element type letter.
+# Types not listed here (X subcircuit calls) are resolved per line.
+ELEMENT_NODE_COUNT = {
+    'R': 2, 'C': 2, 'L': 2, 'V': 2, 'I': 2, 'D': 2, 'B': 2,
+    'F': 2, 'H': 2, 'S': 4, 'W': 2,
+    'E': 4, 'G': 4, 'Q': 3, 'J': 3, 'Z': 3, 'M': 4, 'T': 4,
+    'K': 0,
+}
+
+ANALYSIS_DIRECTIVES = ('.tran', '.ac', '.dc', '.op', '.noise', '.tf', '.pz', '.disto', '.sens')
+
+GROUND_NODES = ('0', 'gnd')
+
+
+def logical_lines(netlist: str) -> List[str]:
+    """
+    Join '+' continuation lines and strip inline comments
+
+    The first (title) line is kept as-is. Full-line '*' comments and blank
+    lines are dropped.
+    """
+    return [line for line, _ in indexed_logical_lines(netlist)]
+
+
+def indexed_logical_lines(netlist: str) -> List[Tuple[str, int]]:
+    """Like logical_lines, but pair each line with the index of its first physical line"""
+    result: List[Tuple[str, int]] = []
+    for idx, line in enumerate(netlist.split('\n')):
+        if idx == 0:
+            result.append((line.rstrip(), 0))
+            continue
+
+        stripped = line.strip()
+        if not stripped or stripped.startswith('*'):
+            continue
+
+        # Inline comments: ';' anywhere, '$' when preceded by whitespace
+        stripped = stripped.split(';', 1)[0]
+        stripped = re.split(r'\s\$', stripped, maxsplit=1)[0].strip()
+        if not stripped:
+            continue
+
+        if stripped.startswith('+') and len(result) > 1:
+            prev, prev_idx = result[-1]
+            result[-1] = (prev + ' ' + stripped[1:].strip(), prev_idx)
+        else:
+            result.append((stripped, idx))
+    return result
+
+
+def tokenize(line: str) -> List[str]:
+    """Split a netlist line into tokens, keeping parenthesised groups and key=value pairs together"""
+    line = re.sub(r'\s*=\s*', '=', line)
+    tokens: List[str] = []
+    current = ''
+    depth = 0
+    for ch in line:
+        if ch == '(':
+            depth += 1
+        elif ch == ')':
+            depth = max(depth - 1, 0)
+
+        if ch.isspace() and depth == 0:
+            if current:
+                tokens.append(current)
+                current = ''
+        else:
+            current += ch
+    if current:
+        tokens.append(current)
+    return tokens
+
+
+def _parse_element(tokens: List[str], line_no: int) -> Dict[str, Any]:
+    """Build an element record from its tokens"""
+    name = tokens[0]
+    etype = name[0].upper()
+
+    if etype == 'X':
+        # Xname n1 n2 ... subckt_name [param=value ...]
+        positional = [t for t in tokens[1:] if '=' not in t]
+        nodes = positional[:-1]
+        args = positional[-1:] + [t for t in tokens[1:] if '=' in t]
+    elif etype == 'K':
+        nodes = []
+        args = tokens[1:]
+    else:
+        n_nodes = ELEMENT_NODE_COUNT.get(etype, 2)
+        if etype == 'Q' and len(tokens) > 5 and _is_name(tokens[5]):
+            # Optional substrate node: Qname c b e s model
+            n_nodes = 4
+        nodes = tokens[1:1 + n_nodes]
+        args = tokens[1 + n_nodes:]
+
+    return {
+        'name': name,
+        'type': etype,
+        'nodes': nodes,
+        'args': args,
+        'value': args[0] if args else '',
+        'line': line_no,
+    }
+
+
+def _is_name(token: str) -> bool:
+    """True for a bare identifier (model name), False for numbers and key=value pairs"""
+    if '=' in token:
+        return False
+    try:
+        parse_spice_value(token)
+        return False
+    except ValueError:
+        return True
+
+
+def parse_netlist(netlist: str) -> Dict[str, Any]:
+    """
+    Parse a SPICE netlist into its structural parts
+
+    Args:
+        netlist: Netlist text (sanitized or not)
+
+    Returns:
+        Dictionary with 'title', 'elements', 'models', 'subckts',
+        'analyses', 'params' and 'directives'. Elements inside .subckt
+        definitions are reported under their subcircuit, not at top level.
+        Lines inside a .control block are ignored. Every record carries
+        'line', the index of its first physical line in the input.
+    """
+    lines = indexed_logical_lines(netlist)
+
+    parsed: Dict[str, Any] = {
+        'title': lines[0][0].lstrip('*').strip() if lines else '',
+        'elements': [],
+        'models': {},
+        'subckts': {},
+        'analyses': [],
+        'params': {},
+        'directives': [],
+    }
+
+    in_control = False
+    current_subckt: Optional[Dict[str, Any]] = None
+
+    for line, line_no in lines[1:]:
+        lower = line.lower()
+
+        if lower.startswith('.control'):
+            in_control = True
+            continue
+        if lower.startswith('.endc'):
+            in_control = False
+            continue
+        if in_control:
+            continue
+
+        tokens = tokenize(line)
+        if not tokens:
+            continue
+        keyword = tokens[0].lower()
+
+        if keyword.startswith('.'):
+            if keyword == '.subckt' and len(tokens) >= 2:
+                current_subckt = {
+                    'name': tokens[1],
+                    'ports': [t for t in tokens[2:] if '=' not in t],
+                    'elements': [],
+                }
+                parsed['subckts'][tokens[1].lower()] = current_subckt
+            elif keyword == '.ends':
+                current_subckt = None
+            elif keyword == '.model' and len(tokens) >= 3:
+                parsed['models'][tokens[1].lower()] = {
+                    'name': tokens[1],
+                    'type': tokens[2].split('(')[0],
+                    'card': line,
+                    'line': line_no,
+                }
+            elif keyword == '.param':
+                for token in tokens[1:]:
+                    if '=' in token:
+                        key, value = token.split('=', 1)
+                        parsed['params'][key.lower()] = value
+            elif keyword in ANALYSIS_DIRECTIVES:
+                parsed['analyses'].append({
+                    'type': keyword[1:],
+                    'args': tokens[1:],
+                    'line': line_no,
+                })
+            elif keyword != '.end':
+                parsed['directives'].append(line)
+            continue
+
+        element = _parse_element(tokens, line_no)
+        if current_subckt is not None:
+            current_subckt['elements'].append(element)
+        else:
+            parsed['elements'].append(element)
+
+    return parsed
+
+
+def collect_nodes(elements: List[Dict[str, Any]], include_ground: bool = False) -> List[str]:
+    """Return the distinct node names referenced by elements, in first-seen order"""
+    seen: Dict[str, None] = {}
+    for element in elements:
+        for node in element['nodes']:
+            key = node.lower()
+            if not include_ground and key in GROUND_NODES:
+                continue
+            seen.setdefault(key, None)
+    return list(seen)
+
+
+def element_numeric_value(element: Dict[str, Any]) -> Optional[float]:
+    """Numeric value of a simple two-terminal element (R/L/C) or controlled-source gain, if any"""
+    if element['type'] not in ('R', 'L', 'C', 'E', 'G', 'F', 'H'):
+        return None
+    args = [a for a in element['args'] if '=' not in a]
+    if element['type'] in ('F', 'H'):
+        args = args[1:]
+    if not args:
+        return None
+    try:
+        return parse_spice_value(args[0])
+    except ValueError:
+        return None
+
+
+def replace_line(netlist: str, line_index: int, new_line: str) -> str:
+    """
+    Replace the physical line at line_index (and its '+' continuations)
+    """
+    lines = netlist.split('\n')
+    end = line_index + 1
+    while end < len(lines) and lines[end].strip().startswith('+'):
+        end += 1
+    lines[line_index:end] = [new_line]
+    return '\n'.join(lines)
+
+
+# Element types whose first non key=value argument names a model or subcircuit
+MODEL_REFERENCE_TYPES = ('D', 'Q', 'M', 'J', 'Z', 'X')
+
+# Element types whose value can be changed with 'alter name = value'
+ALTERABLE_TYPES = ('R', 'L', 'C')
+
+
+def element_signature(element: Dict[str, Any]) -> Tuple[str, str, Tuple[str, ...], str]:
+    """(name, type, nodes, model) of an element, all lower-case; values excluded"""
+    model = ''
+    if element['type'] in MODEL_REFERENCE_TYPES:
+        positional = [a for a in element['args'] if '=' not in a]
+        model = positional[0].lower() if positional else ''
+    return (
+        element['name'].lower(),
+        element['type'],
+        tuple(n.lower() for n in element['nodes']),
+        model,
+    )
+
+
+def diff_netlists(old: str, new: str) -> Dict[str, Any]:
+    """
+    Compare two netlists element by element
+
+    Returns:
+        Dictionary with
+        'same_topology': same elements, connectivity, models references
+            and subcircuit definitions
+        'changed_elements': {element name: {'type', 'old', 'new'}} for
+            top-level elements whose arguments (values) differ
+        'changed_params': {param: new value} for changed/added .param entries
+        'models_changed', 'analyses_changed', 'directives_changed': bools
+    """
+    a, b = parse_netlist(old), parse_netlist(new)
+
+    def subckt_signature(parsed: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            name: (tuple(p.lower() for p in sub['ports']),
+                   [(element_signature(e), e['args']) for e in sub['elements']])
+            for name, sub in parsed['subckts'].items()
+        }
+
+    same_topology = (
+        [element_signature(e) for e in a['elements']] == [element_signature(e) for e in b['elements']]
+        and subckt_signature(a) == subckt_signature(b)
+    )
+
+    changed_elements: Dict[str, Dict[str, Any]] = {}
+    if same_topology:
+        for old_el, new_el in zip(a['elements'], b['elements']):
+            if old_el['args'] != new_el['args']:
+                changed_elements[new_el['name']] = {
+                    'type': new_el['type'],
+                    'old': old_el['args'],
+                    'new': new_el['args'],
+                }
+
+    changed_params = {k: v for k, v in b['params'].items() if a['params'].get(k) != v}
+
+    return {
+        'same_topology': same_topology,
+        'changed_elements': changed_elements,
+        'changed_params': changed_params,
+        'models_changed': {k: m['card'] for k, m in a['models'].items()} != {k: m['card'] for k, m in b['models'].items()},
+        'analyses_changed': [(x['type'], x['args']) for x in a['analyses']] != [(x['type'], x['args']) for x in b['analyses']],
+        'directives_changed': a['directives'] != b['directives'] or bool(set(a['params']) - set(b['params'])),
+    }
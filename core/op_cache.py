@@ -0,0 +1,177 @@
+"""
+Operating-point warm start
+Caches converged DC operating points by circuit topology and feeds them
+back to related netlists as .nodeset/.ic initial conditions
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, TYPE_CHECKING
+
+
+from core.netlist_parser import parse_netlist, collect_nodes, replace_line, element_signature
+from core.raw_parser import parse_ascii_raw
+from core.runner import run_ngspice, DEFAULT_TIMEOUT
+from core.sanitizer import sanitize_netlist
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+WARM_START_MARKER = '* warm-start operating point'
+
+
+def topology_key(netlist: str) -> str:
+    """
+    Hash of a netlist's connectivity, ignoring component values and analyses
+
+    Netlists produced by generate_parametric_netlist with different values,
+    or user edits that only change values, share the same key.
+    """
+    parsed = parse_netlist(netlist)
+    parts = ['|'.join([name, etype, ','.join(nodes), model])
+             for name, etype, nodes, model in map(element_signature, parsed['elements'])]
+    return hashlib.sha256('\n'.join(sorted(parts)).encode()).hexdigest()
+
+
+def operating_point_netlist(netlist: str) -> str:
+    """Replace all analysis directives of a netlist with a single .op"""
+    parsed = parse_netlist(netlist)
+    # Replace from the bottom so earlier line indices stay valid
+    for analysis in sorted(parsed['analyses'], key=lambda a: a['line'], reverse=True):
+        netlist = replace_line(netlist, analysis['line'], f"* (warm start) {analysis['type']} removed")
+    return _insert_before_end(netlist, ['.op'])
+
+
+def _insert_before_end(netlist: str, new_lines: List[str]) -> str:
+    lines = netlist.split('\n')
+    for i in range(len(lines) - 1, -1, -1):
+        if lines[i].strip().lower() == '.end':
+            return '\n'.join(lines[:i] + new_lines + lines[i:])
+    return '\n'.join(lines + new_lines + ['.end'])
+
+
+def extract_operating_point(df: 'pd.DataFrame', metadata: Dict[str, Any]) -> Dict[str, float]:
+    """
+    Extract node voltages from a parsed result
+
+    Works on an 'Operating Point' plot (one point) and on transient results,
+    whose first point is the DC operating point unless UIC was used.
+
+    Returns:
+        {node_name: voltage}; empty if the result holds no usable point
+    """
+    plotname = metadata.get('plotname', '').lower()
+    if df is None or df.empty or not ('operating point' in plotname or 'transient' in plotname):
+        return {}
+
+    op = {}
+    row = df.iloc[0]
+    for var in metadata.get('variables', []):
+        if var.get('type') != 'voltage' or var['name'] not in df.columns:
+            continue
+        name = var['name']
+        value = row[name]
+        if name.lower().startswith('v(') and name.endswith(')'):
+            name = name[2:-1]
+        if isinstance(value, complex):
+            continue
+        op[name.lower()] = float(value)
+    return op
+
+
+def apply_operating_point(netlist: str, op: Dict[str, float], mode: str = 'nodeset') -> str:
+    """
+    Add initial conditions for the netlist's nodes from an operating point
+
+    Args:
+        netlist: Netlist content
+        op: {node_name: voltage} from extract_operating_point
+        mode: 'nodeset' (initial guess for the OP solve) or 'ic'
+            (transient initial conditions)
+
+    Returns:
+        Netlist with a .nodeset/.ic line before .end. Nodes that are not
+        in the netlist are skipped; a previous warm-start line is replaced.
+    """
+    if mode not in ('nodeset', 'ic'):
+        raise ValueError(f"Unknown warm start mode: {mode}")
+
+    lines = netlist.split('\n')
+    for i, line in enumerate(lines):
+        if line.strip() == WARM_START_MARKER:
+            del lines[i:i + 2]
+            break
+    netlist = '\n'.join(lines)
+
+    nodes = collect_nodes(parse_netlist(netlist)['elements'])
+    assignments = [f"V({node})={op[node]:.9g}" for node in nodes if node in op]
+    if not assignments:
+        return netlist
+    return _insert_before_end(netlist, [WARM_START_MARKER, f".{mode} " + ' '.join(assignments)])
+
+
+class OperatingPointCache:
+    """Thread-safe LRU cache of operating points keyed on circuit topology"""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[str, Dict[str, float]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def store(self, netlist: str, op: Dict[str, float]) -> None:
+        if not op:
+            return
+        key = topology_key(netlist)
+        with self._lock:
+            self._entries[key] = dict(op)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def store_result(self, netlist: str, df: 'pd.DataFrame', metadata: Dict[str, Any]) -> bool:
+        """Store the operating point of a finished run if it contains one"""
+        op = extract_operating_point(df, metadata)
+        self.store(netlist, op)
+        return bool(op)
+
+    def lookup(self, netlist: str) -> Optional[Dict[str, float]]:
+        key = topology_key(netlist)
+        with self._lock:
+            op = self._entries.get(key)
+            if op is not None:
+                self._entries.move_to_end(key)
+            return op
+
+    def warm_start(self, netlist: str, mode: str = 'nodeset') -> str:
+        """Return the netlist with cached initial conditions applied, if any"""
+        op = self.lookup(netlist)
+        if op is None:
+            return netlist
+        return apply_operating_point(netlist, op, mode)
+
+
+def capture_operating_point(netlist: str, cache: OperatingPointCache, timeout: Optional[int] = None) -> bool:
+    """
+    Run a .op analysis of the netlist and store the result in the cache
+
+    Returns:
+        True if an operating point was captured
+    """
+    op_netlist = sanitize_netlist(operating_point_netlist(netlist))
+    success, _, raw_path = run_ngspice(op_netlist, timeout=timeout or DEFAULT_TIMEOUT)
+    if not success or not raw_path:
+        return False
+    try:
+        df, metadata = parse_ascii_raw(raw_path)
+        return cache.store_result(netlist, df, metadata)
+    finally:
+        os.unlink(raw_path)
+
+
+# Process-wide cache shared by the app and batch tools
+OP_CACHE = OperatingPointCache()
@@ -0,0 +1,389 @@
+"""
+Derivative-free circuit optimization
+Tunes named component values toward target measurements with Nelder-Mead
+or a CMA-ES population search, evaluating each generation as one batch
+"""
+
+import math
+import re
+from typing import Dict, Any, Callable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from core.batch import evaluate_variants
+from core.netlist_examples import generate_parametric_netlist
+from core.netlist_parser import parse_netlist
+from core.sensitivity import parse_metric, evaluate_metrics, perturb_netlist, sensitivity_elements
+from core.singleflight import simulation_key
+from core.utils import parse_spice_value
+
+METHODS = ('nelder-mead', 'cma-es')
+
+# Simulation budget when none is given
+DEFAULT_MAX_EVALUATIONS = 200
+
+# Objective assigned to candidates whose simulation or metrics fail
+FAILED_OBJECTIVE = 1e12
+
+# Stop when the best objective is below this (all targets met)
+DEFAULT_TOLERANCE = 1e-8
+
+# {name: (low, high)} or {name: (low, high, initial)}
+Bounds = Dict[str, Tuple[float, ...]]
+
+# {metric: value} for equality targets, {metric: ('<=' | '>=', value)} for limits
+Targets = Dict[str, Union[float, Tuple[str, float]]]
+
+NetlistBuilder = Callable[[Dict[str, float]], str]
+
+_TARGET_RE = re.compile(r'^(.+?)\s*(<=|>=|=)\s*(\S+)$')
+
+
+def template_builder(circuit_type: str, base_params: Optional[Dict[str, Any]] = None) -> NetlistBuilder:
+    """Builder for a generate_parametric_netlist template"""
+    def build(values: Dict[str, float]) -> str:
+        return generate_parametric_netlist(circuit_type, **{**(base_params or {}), **values})
+    return build
+
+
+def element_builder(netlist: str) -> NetlistBuilder:
+    """Builder that sets the values of named elements (e.g. R1, C1) in a netlist"""
+    known = {e['name'].lower() for e in sensitivity_elements(netlist)}
+
+    def build(values: Dict[str, float]) -> str:
+        result = netlist
+        for name, value in values.items():
+            if name.lower() not in known:
+                raise ValueError(f"Unknown or non-numeric element: {name}")
+            # Re-parse so line indices stay right if a replacement joins continuation lines
+            element = next(e for e in parse_netlist(result)['elements'] if e['name'].lower() == name.lower())
+            result = perturb_netlist(result, element, value)
+        return result
+    return build
+
+
+class ParameterSpace:
+    """
+    Maps parameters to the unit cube the search runs in
+
+    Parameters with positive bounds are searched on a log scale, so
+    values spanning decades are explored evenly; others linearly.
+    """
+
+    def __init__(self, bounds: Bounds):
+        if not bounds:
+            raise ValueError("No parameters to optimize")
+        self.names = list(bounds)
+        self.low = np.array([float(bounds[n][0]) for n in self.names])
+        self.high = np.array([float(bounds[n][1]) for n in self.names])
+        if np.any(self.high <= self.low):
+            raise ValueError("Each parameter needs low < high")
+        self.log = self.low > 0
+        self._lo = np.where(self.log, np.log(np.where(self.log, self.low, 1.0)), self.low)
+        self._hi = np.where(self.log, np.log(np.where(self.log, self.high, 1.0)), self.high)
+        initial = [bounds[n][2] if len(bounds[n]) > 2 else None for n in self.names]
+        self.initial = np.array([self.to_unit(i, v) if v is not None else 0.5 for i, v in enumerate(initial)])
+
+    def to_unit(self, i: int, value: float) -> float:
+        scaled = math.log(value) if self.log[i] else value
+        return float(np.clip((scaled - self._lo[i]) / (self._hi[i] - self._lo[i]), 0.0, 1.0))
+
+    def values(self, u: np.ndarray) -> Dict[str, float]:
+        """Parameter values of a unit-cube point (clipped to the bounds)"""
+        scaled = self._lo + np.clip(u, 0.0, 1.0) * (self._hi - self._lo)
+        values = np.where(self.log, np.exp(scaled), scaled)
+        return {name: float(f"{value:.6g}") for name, value in zip(self.names, values)}
+
+
+def parse_targets(text: str) -> Targets:
+    """
+    Parse target lines such as 'cutoff(v(out)) = 1k' or 'max(v(out)) <= 1.2'
+
+    Lines starting with '*' are comments.
+
+    Raises:
+        ValueError: for lines without '=', '<=' or '>=' or with a bad value
+    """
+    targets: Targets = {}
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith('*'):
+            continue
+        match = _TARGET_RE.match(line)
+        if not match:
+            raise ValueError(f"Invalid target: {line!r} (expected e.g. 'cutoff(v(out)) = 1k')")
+        spec, op, value = match.groups()
+        parse_metric(spec)
+        number = parse_spice_value(value)
+        targets[spec] = number if op == '=' else (op, number)
+    return targets
+
+
+def _normalize_targets(targets: Targets) -> List[Tuple[str, str, float]]:
+    normalized = []
+    for spec, target in targets.items():
+        parse_metric(spec)
+        op, value = target if isinstance(target, tuple) else ('==', target)
+        if op not in ('==', '<=', '>='):
+            raise ValueError(f"Invalid target operator for {spec!r}: {op}")
+        normalized.append((spec, op, float(value)))
+    if not normalized:
+        raise ValueError("No targets given")
+    return normalized
+
+
+def target_error(targets: Sequence[Tuple[str, str, float]], measured: np.ndarray) -> float:
+    """Sum of squared relative target misses (limits count only when violated)"""
+    total = 0.0
+    for (spec, op, target), value in zip(targets, measured):
+        if not np.isfinite(value):
+            return FAILED_OBJECTIVE
+        miss = value - target
+        if (op == '<=' and miss <= 0) or (op == '>=' and miss >= 0):
+            continue
+        total += (miss / (abs(target) if target != 0 else 1.0)) ** 2
+    return total
+
+
+class Evaluator:
+    """
+    Batched, memoized objective evaluation
+
+    Every call simulates the not-yet-seen candidates of a generation
+    together through evaluate_variants (one batched MNA solve, one
+    ngspice alter loop or parallel runs). Results are cached by the
+    simulation key of the generated netlist, so repeated points (e.g.
+    clipped to the same bound) are not simulated again.
+    """
+
+    def __init__(self, space: ParameterSpace, build: NetlistBuilder, targets: Targets, **kwargs: Any):
+        self.space = space
+        self.build = build
+        self.targets = _normalize_targets(targets)
+        self.metrics = [spec for spec, _, _ in self.targets]
+        self.kwargs = kwargs
+        self.cache: Dict[str, Tuple[float, np.ndarray]] = {}
+        self.history: List[Dict[str, Any]] = []
+        self.simulations = 0
+        self.cache_hits = 0
+        self.engines: List[str] = []
+        self.generation = 0
+
+    def _simulate(self, netlists: List[str]) -> List[np.ndarray]:
+        try:
+            result = evaluate_variants(netlists, **self.kwargs)
+        except RuntimeError:
+            if len(netlists) == 1:
+                return [np.full(len(self.metrics), np.nan)]
+            # One failing candidate must not sink the whole generation
+            return [self._simulate([netlist])[0] for netlist in netlists]
+        self.engines.append(result['engine'])
+        return list(evaluate_metrics(result['x'], result['variables'], result['data'], self.metrics))
+
+    def __call__(self, points: Sequence[np.ndarray]) -> np.ndarray:
+        """Objective values of unit-cube points"""
+        self.generation += 1
+        values = [self.space.values(u) for u in points]
+        netlists = [self.build(v) for v in values]
+        keys = [simulation_key(n) for n in netlists]
+
+        pending: Dict[str, str] = {}
+        for key, netlist in zip(keys, netlists):
+            if key not in self.cache and key not in pending:
+                pending[key] = netlist
+        self.cache_hits += len(keys) - len(pending)
+        if pending:
+            self.simulations += len(pending)
+            for key, measured in zip(pending, self._simulate(list(pending.values()))):
+                self.cache[key] = (target_error(self.targets, measured), measured)
+
+        objectives = []
+        for value, key in zip(values, keys):
+            objective, measured = self.cache[key]
+            objectives.append(objective)
+            self.history.append({'generation': self.generation, **value,
+                                 **dict(zip(self.metrics, measured.tolist())), 'objective': objective})
+        return np.array(objectives)
+
+
+def nelder_mead(evaluate: Callable[[Sequence[np.ndarray]], np.ndarray], x0: np.ndarray,
+                max_evaluations: int, tolerance: float = DEFAULT_TOLERANCE,
+                initial_step: float = 0.25) -> Tuple[np.ndarray, float]:
+    """
+    Nelder-Mead on the unit cube with speculative batches
+
+    Each iteration evaluates reflection, expansion and both contractions
+    in one batch (four candidates) instead of one after another, trading
+    a few extra simulations for fewer sequential rounds.
+    """
+    dims = len(x0)
+    simplex = [np.array(x0, dtype=float)]
+    for i in range(dims):
+        vertex = np.array(x0, dtype=float)
+        vertex[i] = vertex[i] + initial_step if vertex[i] + initial_step <= 1 else vertex[i] - initial_step
+        simplex.append(vertex)
+    simplex = np.clip(np.array(simplex), 0.0, 1.0)
+    scores = evaluate(list(simplex))
+    used = len(simplex)
+
+    while used < max_evaluations:
+        order = np.argsort(scores)
+        simplex, scores = simplex[order], scores[order]
+        if scores[0] <= tolerance or np.max(np.abs(simplex[1:] - simplex[0])) < 1e-6:
+            break
+        centroid = simplex[:-1].mean(axis=0)
+        worst = simplex[-1]
+        candidates = np.clip([
+            centroid + (centroid - worst),          # reflection
+            centroid + 2 * (centroid - worst),      # expansion
+            centroid + 0.5 * (centroid - worst),    # outside contraction
+            centroid - 0.5 * (centroid - worst),    # inside contraction
+        ], 0.0, 1.0)
+        reflected, expanded, outside, inside = evaluate(list(candidates))
+        used += len(candidates)
+
+        if reflected < scores[0]:
+            simplex[-1], scores[-1] = (candidates[1], expanded) if expanded < reflected else (candidates[0], reflected)
+        elif reflected < scores[-2]:
+            simplex[-1], scores[-1] = candidates[0], reflected
+        elif reflected < scores[-1] and outside <= reflected:
+            simplex[-1], scores[-1] = candidates[2], outside
+        elif inside < scores[-1]:
+            simplex[-1], scores[-1] = candidates[3], inside
+        else:
+            # Shrink toward the best vertex
+            simplex[1:] = simplex[0] + 0.5 * (simplex[1:] - simplex[0])
+            scores[1:] = evaluate(list(simplex[1:]))
+            used += dims
+
+    best = int(np.argmin(scores))
+    return simplex[best], float(scores[best])
+
+
+def cma_es(evaluate: Callable[[Sequence[np.ndarray]], np.ndarray], x0: np.ndarray,
+           max_evaluations: int, tolerance: float = DEFAULT_TOLERANCE,
+           population: Optional[int] = None, sigma: float = 0.3,
+           seed: Optional[int] = 0) -> Tuple[np.ndarray, float]:
+    """
+    CMA-ES (weighted recombination, rank-one and rank-mu covariance
+    updates, cumulative step-size adaptation) on the unit cube
+
+    Samples outside the cube are evaluated at their clipped position; the
+    distribution update uses the unclipped samples. The population is
+    reduced to fit small budgets, and at least one generation is always
+    evaluated.
+    """
+    rng = np.random.default_rng(seed)
+    dims = len(x0)
+    lam = max(min(population or 4 + int(3 * math.log(dims)), max_evaluations), 2)
+    mu = lam // 2
+    weights = math.log(mu + 0.5) - np.log(np.arange(1, mu + 1))
+    weights /= weights.sum()
+    mu_eff = 1.0 / np.sum(weights ** 2)
+
+    c_sigma = (mu_eff + 2) / (dims + mu_eff + 5)
+    d_sigma = 1 + 2 * max(0.0, math.sqrt((mu_eff - 1) / (dims + 1)) - 1) + c_sigma
+    c_c = (4 + mu_eff / dims) / (dims + 4 + 2 * mu_eff / dims)
+    c_1 = 2 / ((dims + 1.3) ** 2 + mu_eff)
+    c_mu = min(1 - c_1, 2 * (mu_eff - 2 + 1 / mu_eff) / ((dims + 2) ** 2 + mu_eff))
+    chi_n = math.sqrt(dims) * (1 - 1 / (4 * dims) + 1 / (21 * dims ** 2))
+
+    mean = np.array(x0, dtype=float)
+    cov = np.eye(dims)
+    p_sigma = np.zeros(dims)
+    p_c = np.zeros(dims)
+    best_x, best_score = mean.copy(), float('inf')
+    used = 0
+    generation = 0
+
+    while used == 0 or used + lam <= max_evaluations:
+        eigenvalues, basis = np.linalg.eigh(cov)
+        scale = np.sqrt(np.maximum(eigenvalues, 1e-20))
+        z = rng.standard_normal((lam, dims))
+        y = (z * scale) @ basis.T
+        samples = mean + sigma * y
+        scores = evaluate(list(np.clip(samples, 0.0, 1.0)))
+        used += lam
+        generation += 1
+
+        order = np.argsort(scores)
+        if scores[order[0]] < best_score:
+            best_score = float(scores[order[0]])
+            best_x = np.clip(samples[order[0]], 0.0, 1.0)
+        if best_score <= tolerance:
+            break
+
+        y_sel = y[order[:mu]]
+        y_w = weights @ y_sel
+        mean = mean + sigma * y_w
+
+        inv_sqrt = basis @ np.diag(1 / scale) @ basis.T
+        p_sigma = (1 - c_sigma) * p_sigma + math.sqrt(c_sigma * (2 - c_sigma) * mu_eff) * (inv_sqrt @ y_w)
+        sigma_norm = np.linalg.norm(p_sigma) / math.sqrt(1 - (1 - c_sigma) ** (2 * generation))
+        h_sigma = 1.0 if sigma_norm < (1.4 + 2 / (dims + 1)) * chi_n else 0.0
+        p_c = (1 - c_c) * p_c + h_sigma * math.sqrt(c_c * (2 - c_c) * mu_eff) * y_w
+
+        rank_mu = (weights[:, None] * y_sel).T @ y_sel
+        cov = ((1 - c_1 - c_mu) * cov + c_1 * (np.outer(p_c, p_c) + (1 - h_sigma) * c_c * (2 - c_c) * cov)
+               + c_mu * rank_mu)
+        sigma *= math.exp((c_sigma / d_sigma) * (np.linalg.norm(p_sigma) / chi_n - 1))
+        if sigma * np.sqrt(np.max(eigenvalues)) < 1e-8:
+            break
+
+    return best_x, best_score
+
+
+def optimize(build: NetlistBuilder, bounds: Bounds, targets: Targets, method: str = 'nelder-mead',
+             max_evaluations: int = DEFAULT_MAX_EVALUATIONS, tolerance: float = DEFAULT_TOLERANCE,
+             population: Optional[int] = None, seed: Optional[int] = 0,
+             **kwargs: Any) -> Dict[str, Any]:
+    """
+    Search parameter values that make the measured metrics meet the targets
+
+    Args:
+        build: Function from {name: value} to a netlist (see
+            template_builder and element_builder)
+        bounds: {name: (low, high)} or {name: (low, high, initial)}
+        targets: {metric: value} or {metric: ('<=' | '>=', limit)} with
+            metrics as in core.sensitivity, e.g. 'cutoff(v(out))',
+            'at(v(out), 1k)' or 'overshoot(v(out))'
+        method: 'nelder-mead' or 'cma-es'
+        max_evaluations: Candidate budget (cache hits included)
+        tolerance: Stop once the objective (sum of squared relative
+            target misses) is at or below this
+        population: CMA-ES generation size (default 4 + 3 ln(dims))
+        seed: CMA-ES random seed
+        **kwargs: Passed to evaluate_variants (timeout, workers, fast_path, runner)
+
+    Returns:
+        {'best': {name: value}, 'metrics': {metric: value}, 'objective',
+        'netlist', 'method', 'evaluations', 'simulations', 'cache_hits',
+        'generations', 'engines', 'history' (DataFrame, one row per candidate)}
+    """
+    import pandas as pd
+
+    if method not in METHODS:
+        raise ValueError(f"Unknown method: {method} (choose from {', '.join(METHODS)})")
+    space = ParameterSpace(bounds)
+    evaluator = Evaluator(space, build, targets, **kwargs)
+    if method == 'nelder-mead':
+        best_u, _ = nelder_mead(evaluator, space.initial, max_evaluations, tolerance)
+    else:
+        best_u, _ = cma_es(evaluator, space.initial, max_evaluations, tolerance, population, seed=seed)
+
+    best = space.values(best_u)
+    netlist = build(best)
+    objective, measured = evaluator.cache[simulation_key(netlist)]
+    return {
+        'best': best,
+        'metrics': dict(zip(evaluator.metrics, measured.tolist())),
+        'objective': objective,
+        'netlist': netlist,
+        'method': method,
+        'evaluations': len(evaluator.history),
+        'simulations': evaluator.simulations,
+        'cache_hits': evaluator.cache_hits,
+        'generations': evaluator.generation,
+        'engines': sorted(set(evaluator.engines)),
+        'history': pd.DataFrame(evaluator.history),
+    }
@@ -0,0 +1,119 @@
+"""
+Progress reporting for long ngspice runs
+Tracks simulation time from ngspice's console output and prepares
+control blocks that write partial RAW snapshots during a transient
+"""
+
+import re
+from typing import Dict, Any, List, Optional
+
+from core.netlist_parser import parse_netlist
+from core.utils import parse_spice_value
+
+# ngspice prints "Reference value :  1.23400e-03" while an analysis advances
+REFERENCE_VALUE_RE = re.compile(r'Reference value\s*:\s*([-+]?[0-9.]+(?:[eE][-+]?\d+)?)')
+
+PARTIAL_RAW_TEMPLATE = 'partial_{index}.raw'
+
+
+def transient_stop_time(netlist: str) -> Optional[float]:
+    """Return the stop time of the last .tran directive, or None"""
+    parsed = parse_netlist(netlist)
+    for analysis in reversed(parsed['analyses']):
+        if analysis['type'] != 'tran':
+            continue
+        values = [a for a in analysis['args'] if a.lower() != 'uic']
+        if len(values) < 2:
+            return None
+        try:
+            return parse_spice_value(values[1])
+        except ValueError:
+            return None
+    return None
+
+
+class ProgressTracker:
+    """
+    Turns ngspice console output into a completion fraction
+
+    Feed it stdout/stderr text as it arrives; the latest reference value
+    (simulation time for .tran) is compared against the stop time.
+    """
+
+    def __init__(self, stop_value: Optional[float]):
+        self.stop_value = stop_value
+        self.current_value: Optional[float] = None
+
+    @classmethod
+    def for_netlist(cls, netlist: str) -> 'ProgressTracker':
+        return cls(transient_stop_time(netlist))
+
+    def feed(self, text: str) -> Optional[float]:
+        """Consume console text and return the updated fraction (or None if unknown)"""
+        matches = REFERENCE_VALUE_RE.findall(text)
+        if matches:
+            try:
+                self.current_value = float(matches[-1])
+            except ValueError:
+                pass
+        return self.fraction
+
+    @property
+    def fraction(self) -> Optional[float]:
+        if self.stop_value is None or self.stop_value <= 0 or self.current_value is None:
+            return None
+        return min(max(self.current_value / self.stop_value, 0.0), 1.0)
+
+    def event(self, partial_raw: Optional[str] = None) -> Dict[str, Any]:
+        """Progress event passed to runner callbacks"""
+        return {
+            'fraction': self.fraction,
+            'sim_value': self.current_value,
+            'stop_value': self.stop_value,
+            'partial_raw': partial_raw,
+        }
+
+
+def insert_partial_writes(netlist: str, chunks: int) -> str:
+    """
+    Make a sanitized transient netlist write partial RAW snapshots
+
+    The simulation is halted at chunks-1 evenly spaced breakpoints
+    ('stop when time > t'); at each halt the current plot is written to
+    partial_<k>.raw and the run is resumed. Netlists that are not a single
+    .tran analysis, or that have no 'run' in their control block, are
+    returned unchanged.
+    """
+    if chunks < 2:
+        return netlist
+
+    parsed = parse_netlist(netlist)
+    if [a['type'] for a in parsed['analyses']] != ['tran']:
+        return netlist
+    tstop = transient_stop_time(netlist)
+    if not tstop:
+        return netlist
+
+    lines = netlist.split('\n')
+    in_control = False
+    run_idx = -1
+    for idx, line in enumerate(lines):
+        lower = line.strip().lower()
+        if lower.startswith('.control'):
+            in_control = True
+        elif lower.startswith('.endc'):
+            in_control = False
+        elif in_control and lower == 'run':
+            run_idx = idx
+            break
+    if run_idx < 0:
+        return netlist
+
+    breakpoints: List[str] = []
+    snapshots: List[str] = []
+    for k in range(1, chunks):
+        breakpoints.append(f"stop when time > {tstop * k / chunks:.6g}")
+        snapshots.append(f"write {PARTIAL_RAW_TEMPLATE.format(index=k)}")
+        snapshots.append('resume')
+
+    return '\n'.join(lines[:run_idx] + breakpoints + ['run'] + snapshots + lines[run_idx + 1:])
@@ -0,0 +1,150 @@
+"""
+Multi-resolution min/max pyramids for interactive plotting
+Answers "what does this x window look like at N pixels" in O(pixels),
+independent of how many points the trace has
+"""
+
+import math
+import threading
+from typing import Dict, Any, List, Optional, Sequence, Tuple, TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    import pandas as pd
+    from core.archive import ArchivedResult
+
+# Points per bin at the finest pyramid level
+PYRAMID_BLOCK = 8
+
+# Default horizontal resolution of a plot window
+DEFAULT_PIXELS = 1200
+
+
+def _real_values(values: np.ndarray) -> np.ndarray:
+    """Plot values of a trace (magnitude for complex data)"""
+    values = np.asarray(values)
+    if values.dtype == object or np.iscomplexobj(values):
+        return np.abs(values.astype(complex))
+    return values.astype(float, copy=False)
+
+
+def build_levels(values: np.ndarray, block: int = PYRAMID_BLOCK) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Min/max pyramid of a trace
+
+    Level k holds the min and max of consecutive bins of block * 2**k
+    points. The last bin of each level may be partial.
+
+    Returns:
+        [(mins, maxs), ...] from finest to coarsest
+    """
+    values = _real_values(values)
+    if len(values) == 0:
+        return []
+    n_bins = math.ceil(len(values) / block)
+    padded = np.concatenate([values, np.full(n_bins * block - len(values), values[-1])])
+    blocks = padded.reshape(n_bins, block)
+    levels = [(blocks.min(axis=1), blocks.max(axis=1))]
+
+    while len(levels[-1][0]) > 1:
+        mins, maxs = levels[-1]
+        if len(mins) % 2:
+            mins = np.append(mins, mins[-1])
+            maxs = np.append(maxs, maxs[-1])
+        levels.append((np.minimum(mins[0::2], mins[1::2]), np.maximum(maxs[0::2], maxs[1::2])))
+    return levels
+
+
+class ResultPyramid:
+    """
+    Viewport queries over the traces of one result
+
+    x and the column arrays may be memory-mapped (see ArchivedResult);
+    each column's pyramid is built on first use. A window query does two
+    binary searches on x and then touches at most ~2 * pixels values.
+    """
+
+    def __init__(self, x: np.ndarray, columns: Dict[str, np.ndarray],
+                 block: int = PYRAMID_BLOCK, x_name: str = 'x'):
+        self.x = np.asarray(x)
+        self.x_name = x_name
+        self.columns = columns
+        self.block = block
+        self._levels: Dict[str, List[Tuple[np.ndarray, np.ndarray]]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_dataframe(cls, df: 'pd.DataFrame', block: int = PYRAMID_BLOCK) -> 'ResultPyramid':
+        x = np.real(np.asarray(df.index.values)).astype(float)
+        return cls(x, {str(c): df[c].to_numpy() for c in df.columns}, block, str(df.index.name or 'x'))
+
+    @classmethod
+    def from_archive(cls, result: 'ArchivedResult', block: int = PYRAMID_BLOCK) -> 'ResultPyramid':
+        """Pyramid over an archived result's memory-mapped columns"""
+        if result.meta['x_name'] is None:
+            raise ValueError("Archived result has no x-axis")
+        return cls(result.x(), {name: result.column(name) for name in result.columns},
+                   block, result.meta['x_name'])
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the pyramid levels built so far (the traces themselves are not counted)"""
+        with self._lock:
+            return sum(mins.nbytes + maxs.nbytes for levels in self._levels.values() for mins, maxs in levels)
+
+    @property
+    def x_range(self) -> Tuple[float, float]:
+        return float(self.x[0]), float(self.x[-1])
+
+    def levels(self, column: str) -> List[Tuple[np.ndarray, np.ndarray]]:
+        with self._lock:
+            if column not in self._levels:
+                self._levels[column] = build_levels(self.columns[column], self.block)
+            return self._levels[column]
+
+    def _plan(self, x_min: Optional[float], x_max: Optional[float], pixels: int) -> Dict[str, Any]:
+        """Row range of the window and the pyramid level that fits it into pixels"""
+        start = 0 if x_min is None else int(np.searchsorted(self.x, x_min, side='left'))
+        stop = len(self.x) if x_max is None else int(np.searchsorted(self.x, x_max, side='right'))
+        # Include one point on each side so lines run to the window edges
+        start, stop = max(start - 1, 0), min(stop + 1, len(self.x))
+        per_pixel = (stop - start) / max(pixels, 1)
+        if per_pixel < self.block:
+            return {'start': start, 'stop': stop, 'level': None}
+
+        level = int(math.floor(math.log2(per_pixel / self.block)))
+        size = self.block * 2 ** level
+        return {'start': start, 'stop': stop, 'level': level, 'size': size,
+                'first': start // size, 'last': math.ceil(stop / size)}
+
+    def fetch(self, x_min: Optional[float] = None, x_max: Optional[float] = None,
+              pixels: int = DEFAULT_PIXELS, columns: Optional[Sequence[str]] = None) -> 'pd.DataFrame':
+        """
+        Traces over [x_min, x_max] at about `pixels` horizontal resolution
+
+        Dense windows are returned as a min/max envelope: two rows (min,
+        max) per bin at the bin's center x, which draws as one vertical
+        stroke per pixel column. Windows with few points are returned raw.
+
+        Returns:
+            DataFrame indexed by x with one column per trace
+        """
+        import pandas as pd
+
+        columns = list(self.columns) if columns is None else [c for c in columns if c in self.columns]
+        plan = self._plan(x_min, x_max, pixels)
+
+        if plan['level'] is None:
+            rows = slice(plan['start'], plan['stop'])
+            data = {c: _real_values(self.columns[c][rows]) for c in columns}
+            return pd.DataFrame(data, index=pd.Index(np.array(self.x[rows]), name=self.x_name), columns=columns)
+
+        size, first, last = plan['size'], plan['first'], plan['last']
+        centers = np.minimum(np.arange(first, last) * size + size // 2, len(self.x) - 1)
+        x = np.repeat(np.asarray(self.x[centers]), 2)
+        data = {}
+        for c in columns:
+            mins, maxs = self.levels(c)[plan['level']]
+            data[c] = np.column_stack([mins[first:last], maxs[first:last]]).ravel()
+        return pd.DataFrame(data, index=pd.Index(x, name=self.x_name), columns=columns)
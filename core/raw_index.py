@@ -0,0 +1,238 @@
+"""
+Point-offset index for ASCII RAW files
+Scans a RAW file once, stores the byte offsets of each plot header and of
+every Kth point in a sidecar file, and reads x windows without full parses
+"""
+
+import bisect
+import json
+import os
+from typing import Dict, Any, List, Optional, Tuple, TYPE_CHECKING
+
+from core.raw_parser import parse_raw_lines, parse_value
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Sidecar file stored next to the RAW file
+INDEX_SUFFIX = '.idx.json'
+
+# Every Kth point's offset is recorded (can be overridden by environment variable)
+INDEX_STRIDE = int(os.environ.get('OPENSPICE_RAW_INDEX_STRIDE', '256'))
+
+INDEX_VERSION = 1
+
+_BLANK = (b' ', b'\t', b'\r', b'\n')
+
+
+def index_path(raw_path: str) -> str:
+    """Path of the sidecar index for a RAW file"""
+    return str(raw_path) + INDEX_SUFFIX
+
+
+def _file_stamp(raw_path: str) -> Dict[str, int]:
+    stat = os.stat(raw_path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+class RawIndex:
+    """
+    Offsets of the plots and of every `stride`th point of a RAW file
+
+    Each plot records its header offset, the offset of its first value
+    line, its end offset, the number of points and, for points 0, K, 2K,
+    ..., the point number, byte offset and x value. Binary plots are
+    listed but carry no point marks.
+    """
+
+    def __init__(self, data: Dict[str, Any]):
+        self.data = data
+
+    @property
+    def stride(self) -> int:
+        return self.data['stride']
+
+    @property
+    def plots(self) -> List[Dict[str, Any]]:
+        return self.data['plots']
+
+    @classmethod
+    def build(cls, raw_path: str, stride: int = INDEX_STRIDE) -> 'RawIndex':
+        """Index a RAW file in one pass"""
+        stride = max(int(stride), 1)
+        plots: List[Dict[str, Any]] = []
+        plot: Optional[Dict[str, Any]] = None
+        header: List[bytes] = []
+        state = None
+        point = 0
+        pending_x = False
+        offset = 0
+
+        def close(end: int) -> None:
+            if plot is not None:
+                plot['end'] = end
+                plot['points'] = point
+                lines = [line.decode('utf-8', 'replace') for line in header]
+                plot['metadata'] = parse_raw_lines(lines)[1]
+                plots.append(plot)
+
+        with open(raw_path, 'rb') as f:
+            for line in f:
+                if line.startswith(b'Title:'):
+                    close(offset)
+                    plot = {'offset': offset, 'values_offset': None, 'binary': False,
+                            'marks': {'point': [], 'offset': [], 'x': []}}
+                    header, state, point, pending_x = [], 'header', 0, False
+                if state == 'header':
+                    header.append(line)
+                    if line.startswith(b'Values:'):
+                        plot['values_offset'] = offset + len(line)
+                        state = 'values'
+                    elif line.startswith(b'Binary:'):
+                        plot['binary'] = True
+                        state = 'binary'
+                elif state == 'values' and line.strip():
+                    marks = plot['marks']
+                    if line[:1] not in _BLANK:
+                        # First line of a point: "<n>\t<x>" or "<n>" followed by the x line
+                        if point % stride == 0:
+                            parts = line.split(b'\t', 1)
+                            has_x = len(parts) == 2 and parts[1].strip()
+                            marks['point'].append(point)
+                            marks['offset'].append(offset)
+                            marks['x'].append(float(parse_value(parts[1].decode()).real) if has_x else None)
+                            pending_x = not has_x
+                        point += 1
+                    elif pending_x:
+                        marks['x'][-1] = float(parse_value(line.decode()).real)
+                        pending_x = False
+                offset += len(line)
+        close(offset)
+
+        return cls({'version': INDEX_VERSION, 'stride': stride, **_file_stamp(raw_path), 'plots': plots})
+
+    def is_current(self, raw_path: str) -> bool:
+        """True if the index was built from the file as it is now"""
+        try:
+            stamp = _file_stamp(raw_path)
+        except OSError:
+            return False
+        return (self.data.get('version') == INDEX_VERSION
+                and all(self.data.get(k) == v for k, v in stamp.items()))
+
+    def save(self, path: str) -> None:
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.data, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'RawIndex':
+        with open(path, 'r') as f:
+            return cls(json.load(f))
+
+    def locate(self, x_min: Optional[float] = None, x_max: Optional[float] = None,
+               plot: int = 0) -> Tuple[int, int, int, int]:
+        """
+        Byte range of the points around an x window
+
+        The range starts at the last mark at or before x_min and ends at the
+        first mark after x_max, so it covers the window plus at most one
+        stride on each side. Plots whose x values are not ascending are
+        returned whole.
+
+        Returns:
+            (start_offset, end_offset, first_point, stop_point)
+        """
+        info = self.plots[plot]
+        if info['binary'] or info['values_offset'] is None:
+            raise ValueError(f"Plot {plot} has no ASCII values to index")
+        marks = info['marks']
+        xs = marks['x']
+        start, stop = 0, len(xs)
+        ascending = None not in xs and all(a <= b for a, b in zip(xs, xs[1:]))
+        if ascending:
+            if x_min is not None:
+                start = max(bisect.bisect_right(xs, x_min) - 1, 0)
+            if x_max is not None:
+                stop = bisect.bisect_right(xs, x_max)
+        if not xs:
+            return info['values_offset'], info['end'], 0, 0
+        start_offset = marks['offset'][start]
+        first_point = marks['point'][start]
+        if stop < len(xs):
+            return start_offset, marks['offset'][stop], first_point, marks['point'][stop]
+        return start_offset, info['end'], first_point, info['points']
+
+
+def load_index(raw_path: str, stride: int = INDEX_STRIDE, write: bool = True) -> RawIndex:
+    """
+    The sidecar index of a RAW file, rebuilt if missing or out of date
+
+    Args:
+        raw_path: ASCII RAW file
+        stride: Points between recorded offsets when (re)building
+        write: Store a rebuilt index next to the file (skipped silently
+            when the directory is not writable)
+    """
+    path = index_path(raw_path)
+    if os.path.exists(path):
+        try:
+            index = RawIndex.load(path)
+            if index.is_current(raw_path):
+                return index
+        except (OSError, ValueError):
+            pass
+    index = RawIndex.build(raw_path, stride)
+    if write:
+        try:
+            index.save(path)
+        except OSError:
+            pass
+    return index
+
+
+def extract_window(raw_path: str, x_min: Optional[float] = None, x_max: Optional[float] = None,
+                   plot: int = 0, index: Optional[RawIndex] = None) -> str:
+    """
+    A self-contained ASCII RAW text holding the points around an x window
+
+    The plot header is copied with 'No. Points' set to the extracted
+    count; the points are padded to the index marks (see RawIndex.locate).
+    """
+    index = index or load_index(raw_path)
+    info = index.plots[plot]
+    start_offset, end_offset, first_point, stop_point = index.locate(x_min, x_max, plot)
+    with open(raw_path, 'rb') as f:
+        f.seek(info['offset'])
+        header = f.read(info['values_offset'] - info['offset']).decode('utf-8', 'replace')
+        f.seek(start_offset)
+        region = f.read(end_offset - start_offset).decode('utf-8', 'replace')
+    header_lines = [f"No. Points: {stop_point - first_point}\n" if line.startswith('No. Points:') else line
+                    for line in header.splitlines(True)]
+    return ''.join(header_lines) + region
+
+
+def read_window(raw_path: str, x_min: Optional[float] = None, x_max: Optional[float] = None,
+                plot: int = 0, index: Optional[RawIndex] = None) -> Tuple['pd.DataFrame', Dict[str, Any]]:
+    """
+    Parse only the points of a RAW plot with x_min <= x <= x_max
+
+    Args:
+        raw_path: ASCII RAW file
+        x_min, x_max: Window bounds on the plot's x variable (None = open)
+        plot: Plot number for files holding several plots
+        index: Index to use (default: load_index(raw_path))
+
+    Returns:
+        (DataFrame, metadata) like parse_ascii_raw, restricted to the window
+    """
+    text = extract_window(raw_path, x_min, x_max, plot, index)
+    df, metadata = parse_raw_lines(text.splitlines(True))
+    if len(df):
+        x = (df.index if df.index.name is not None else df.iloc[:, 0]).to_numpy().real
+        keep = (x >= (x_min if x_min is not None else -float('inf'))) & \
+               (x <= (x_max if x_max is not None else float('inf')))
+        df = df[keep]
+    metadata['no_points'] = len(df)
+    return df, metadata
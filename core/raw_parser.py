@@ -4,12 +4,14 @@ Parses the ASCII RAW format into pandas DataFrame
 """
 
 import re
-import pandas as pd
 import numpy as np
-from typing import Tuple, Dict, List, Any
+from typing import Tuple, Dict, List, Any, TYPE_CHECKING
 from pathlib import Path
 
-def parse_ascii_raw(raw_file_path: str) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+if TYPE_CHECKING:
+    import pandas as pd
+
+def parse_ascii_raw(raw_file_path: str) -> Tuple['pd.DataFrame', Dict[str, Any]]:
     """
     Parse ngspice ASCII RAW file
     
@@ -23,6 +25,37 @@ def parse_ascii_raw(raw_file_path: str) -> Tuple[pd.DataFrame, Dict[str, Any]]:
     with open(raw_file_path, 'r') as f:
         lines = f.readlines()
     
+    return parse_raw_lines(lines)
+
+def parse_ascii_raw_plots(raw_file_path: str) -> List[Tuple['pd.DataFrame', Dict[str, Any]]]:
+    """
+    Parse every plot of an ASCII RAW file holding several plots
+    (e.g. written with 'set appendwrite')
+    
+    Returns:
+        List of (DataFrame, metadata), one per plot, in file order
+    """
+    
+    with open(raw_file_path, 'r') as f:
+        lines = f.readlines()
+    
+    starts = [i for i, line in enumerate(lines) if line.startswith('Title:')]
+    if not starts:
+        return [parse_raw_lines(lines)]
+    
+    bounds = starts + [len(lines)]
+    return [parse_raw_lines(lines[bounds[k]:bounds[k + 1]]) for k in range(len(starts))]
+
+def parse_raw_lines(lines: List[str]) -> Tuple['pd.DataFrame', Dict[str, Any]]:
+    """
+    Parse the lines of a single ASCII RAW plot
+    
+    Returns:
+        (DataFrame with results, metadata dictionary)
+    """
+    import pandas as pd
+
+    
     metadata = {
         'title': '',
         'date': '',
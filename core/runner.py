@@ -3,38 +3,220 @@ NgSpice runner with subprocess management and safety controls
 """
 
 import subprocess
-import tempfile
 import os
-import shutil
+import queue
+import threading
 from pathlib import Path
-from typing import Tuple, Optional
+from typing import Tuple, Optional, Callable, Dict, Any, List, TYPE_CHECKING
 import time
 
+from core.estimator import plan_simulation, describe_estimate
+from core.library import ModelLibrary
+from core.log_pipeline import LogPipeline
+from core.progress import ProgressTracker, insert_partial_writes, PARTIAL_RAW_TEMPLATE
+from core.scratch import SCRATCH
+
+if TYPE_CHECKING:
+    import pandas as pd
+
 # Default timeout in seconds (can be overridden by environment variable)
 DEFAULT_TIMEOUT = int(os.environ.get('NGSPICE_TIMEOUT', '10'))
 
-def run_ngspice(netlist: str, timeout: int = DEFAULT_TIMEOUT) -> Tuple[bool, str, Optional[str]]:
+# What to do with jobs over the cost limits: 'reject' or 'downscale'
+OVERSIZE_ACTION = os.environ.get('NGSPICE_OVERSIZE_ACTION', 'reject')
+
+# Nice increment applied to ngspice for jobs classified as low priority
+LOW_PRIORITY_NICE = 10
+
+# Seconds between progress checks while ngspice is running
+PROGRESS_POLL_INTERVAL = 0.2
+
+# Feed the netlist to ngspice on stdin instead of writing input.cir
+USE_STDIN = os.environ.get('NGSPICE_STDIN', '0') == '1'
+
+ProgressCallback = Callable[[Dict[str, Any]], None]
+
+# Log returned for runs stopped through their cancel_event
+CANCELLED_LOG = "Simulation cancelled"
+
+class SimulationCancelled(Exception):
+    """Raised inside the runner when a job's cancel_event is set"""
+
+def _lower_priority() -> None:
+    """preexec_fn for low-priority ngspice children"""
+    os.nice(LOW_PRIORITY_NICE)
+
+def _communicate_with_progress(process: subprocess.Popen, timeout: float,
+                               tracker: ProgressTracker, workdir: Path,
+                               callback: ProgressCallback,
+                               input_text: Optional[str] = None,
+                               cancel_event: Optional[threading.Event] = None) -> Tuple[str, str]:
+    """
+    communicate() replacement that reports progress while ngspice runs
+    
+    Console output is read on background threads and fed to the tracker.
+    A partial RAW snapshot is reported once ngspice has moved past it
+    (the next snapshot or the final RAW exists), so it is never read
+    half-written. input_text, if given, is written to stdin on another
+    thread. Raises subprocess.TimeoutExpired after killing the process if
+    the timeout is exceeded, and SimulationCancelled if cancel_event is set.
+    """
+    output: Dict[str, List[str]] = {'stdout': [], 'stderr': []}
+    pending: 'queue.Queue[str]' = queue.Queue()
+    
+    def pump(name: str, stream) -> None:
+        for line in iter(stream.readline, ''):
+            output[name].append(line)
+            pending.put(line)
+        stream.close()
+    
+    readers = [
+        threading.Thread(target=pump, args=('stdout', process.stdout), daemon=True),
+        threading.Thread(target=pump, args=('stderr', process.stderr), daemon=True),
+    ]
+    if input_text is not None:
+        def feed_stdin() -> None:
+            try:
+                process.stdin.write(input_text)
+                process.stdin.close()
+            except (BrokenPipeError, OSError):
+                pass
+        readers.append(threading.Thread(target=feed_stdin, daemon=True))
+    for reader in readers:
+        reader.start()
+    
+    deadline = time.time() + timeout
+    next_partial = 1
+    last_fraction = None
+    
+    while True:
+        try:
+            process.wait(timeout=PROGRESS_POLL_INTERVAL)
+            finished = True
+        except subprocess.TimeoutExpired:
+            finished = False
+        
+        text = []
+        while not pending.empty():
+            text.append(pending.get_nowait())
+        fraction = tracker.feed(''.join(text))
+        
+        if finished:
+            break
+        
+        partial_raw = None
+        current = workdir / PARTIAL_RAW_TEMPLATE.format(index=next_partial)
+        following = workdir / PARTIAL_RAW_TEMPLATE.format(index=next_partial + 1)
+        if current.exists() and (following.exists() or (workdir / 'output.raw').exists()):
+            partial_raw = str(current)
+            next_partial += 1
+        
+        if partial_raw or fraction != last_fraction:
+            callback(tracker.event(partial_raw))
+            last_fraction = fraction
+        
+        cancelled = cancel_event is not None and cancel_event.is_set()
+        if cancelled or time.time() > deadline:
+            process.kill()
+            for reader in readers:
+                reader.join(timeout=1)
+            if cancelled:
+                raise SimulationCancelled()
+            raise subprocess.TimeoutExpired(process.args, timeout)
+    
+    for reader in readers:
+        reader.join(timeout=1)
+    return ''.join(output['stdout']), ''.join(output['stderr'])
+
+def _communicate_cancellable(process: subprocess.Popen, timeout: float,
+                             cancel_event: threading.Event,
+                             input_text: Optional[str] = None) -> Tuple[str, str]:
+    """
+    communicate() that gives up when cancel_event is set
+    
+    input_text is handed over on the first communicate() call only; later
+    calls (after a poll timeout) resume writing whatever is left of it.
+    Raises subprocess.TimeoutExpired on timeout and SimulationCancelled
+    (after killing the process) on cancellation.
+    """
+    deadline = time.time() + timeout
+    pending_input = input_text
+    while True:
+        if cancel_event.is_set():
+            process.kill()
+            process.communicate()
+            raise SimulationCancelled()
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            raise subprocess.TimeoutExpired(process.args, timeout)
+        try:
+            stdin_text, pending_input = pending_input, None
+            return process.communicate(input=stdin_text, timeout=min(PROGRESS_POLL_INTERVAL, remaining))
+        except subprocess.TimeoutExpired:
+            continue
+
+def run_ngspice(netlist: str, timeout: int = DEFAULT_TIMEOUT,
+                check_cost: bool = True,
+                oversize_action: str = OVERSIZE_ACTION,
+                progress_callback: Optional[ProgressCallback] = None,
+                partial_chunks: int = 0,
+                library: Optional[ModelLibrary] = None,
+                use_stdin: bool = USE_STDIN,
+                cancel_event: Optional[threading.Event] = None) -> Tuple[bool, str, Optional[str]]:
     """
     Run ngspice in batch mode with the given netlist
     
     Args:
         netlist: Sanitized netlist content
         timeout: Maximum execution time in seconds
+        check_cost: Estimate the analysis cost first and reject, downscale
+            or deprioritize oversized jobs before ngspice is started
+        oversize_action: 'reject' or 'downscale' for jobs over the limits
+        progress_callback: Called with progress events ({'fraction',
+            'sim_value', 'stop_value', 'partial_raw'}) while ngspice runs.
+            'partial_raw' paths are only valid during the callback.
+        partial_chunks: For transient runs with a progress callback, halt
+            this many times to write partial RAW snapshots
+        library: Model library to take referenced .model/.subckt
+            definitions from
+        use_stdin: Pass the netlist on stdin rather than as input.cir
+        cancel_event: Setting this event kills ngspice; the run then
+            returns (False, CANCELLED_LOG, None)
     
     Returns:
         (success, log_content, raw_file_path)
     """
     
-    # Create temporary directory for safe execution
-    with tempfile.TemporaryDirectory(prefix='ngspice_') as tmpdir:
+    if library is not None:
+        netlist = library.inject(netlist)
+    
+    cost_note = ""
+    preexec_fn = None
+    if check_cost:
+        decision, netlist, estimate = plan_simulation(netlist, oversize_action)
+        if decision == 'reject':
+            return False, (
+                f"Simulation rejected: estimated cost ({describe_estimate(estimate)}) "
+                "exceeds the configured limits. Increase the analysis step or "
+                "shorten the sweep."
+            ), None
+        if decision == 'downscale':
+            cost_note = f"\n\nAnalysis resolution reduced to fit limits: {describe_estimate(estimate)}"
+        elif decision == 'low_priority' and hasattr(os, 'nice'):
+            preexec_fn = _lower_priority
+            cost_note = f"\n\nRun at low priority: {describe_estimate(estimate)}"
+    
+    # Recycled sandbox directory (RAM-backed when available) for safe execution
+    with SCRATCH.acquire() as tmpdir:
         try:
-            # Write netlist to temporary file
-            netlist_path = Path(tmpdir) / 'input.cir'
-            netlist_path.write_text(netlist)
+            tracker = None
+            if progress_callback is not None:
+                tracker = ProgressTracker.for_netlist(netlist)
+                netlist = insert_partial_writes(netlist, partial_chunks)
             
             # Output paths
-            log_path = Path(tmpdir) / 'stdout.log'
-            raw_path = Path(tmpdir) / 'output.raw'
+            log_path = tmpdir / 'stdout.log'
+            raw_path = tmpdir / 'output.raw'
             
             # Construct ngspice command
             cmd = [
@@ -42,52 +224,71 @@ def run_ngspice(netlist: str, timeout: int = DEFAULT_TIMEOUT) -> Tuple[bool, str
                 '-b',              # Batch mode
                 '-o', str(log_path),  # Output log
                 '-r', str(raw_path),  # Raw output file
-                str(netlist_path)     # Input netlist
             ]
             
+            if not use_stdin:
+                # Write netlist to the sandbox
+                netlist_path = tmpdir / 'input.cir'
+                netlist_path.write_text(netlist)
+                cmd.append(str(netlist_path))  # Input netlist
+            
             # Run ngspice with timeout
             start_time = time.time()
             process = subprocess.Popen(
                 cmd,
                 cwd=tmpdir,
+                stdin=subprocess.PIPE if use_stdin else subprocess.DEVNULL,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
-                text=True
+                text=True,
+                preexec_fn=preexec_fn
             )
             
             try:
-                stdout, stderr = process.communicate(timeout=timeout)
+                if tracker is not None:
+                    stdout, stderr = _communicate_with_progress(
+                        process, timeout, tracker, tmpdir, progress_callback,
+                        input_text=netlist if use_stdin else None,
+                        cancel_event=cancel_event
+                    )
+                elif cancel_event is not None:
+                    stdout, stderr = _communicate_cancellable(
+                        process, timeout, cancel_event,
+                        input_text=netlist if use_stdin else None
+                    )
+                else:
+                    stdout, stderr = process.communicate(
+                        input=netlist if use_stdin else None, timeout=timeout
+                    )
                 execution_time = time.time() - start_time
             except subprocess.TimeoutExpired:
                 process.kill()
                 stdout, stderr = process.communicate()
                 return False, f"Simulation timeout after {timeout} seconds", None
+            except SimulationCancelled:
+                return False, CANCELLED_LOG, None
             
-            # Read log file
-            log_content = ""
+            # Stream the log: only its head and tail are kept, issues are counted throughout
+            pipeline = LogPipeline()
             if log_path.exists():
-                log_content = log_path.read_text()
-            else:
-                log_content = stdout if stdout else ""
+                pipeline.feed_file(log_path)
+            elif stdout:
+                pipeline.feed(stdout)
+                pipeline.flush()
             
             if stderr:
-                log_content += f"\n\nSTDERR:\n{stderr}"
+                pipeline.feed(f"\nSTDERR:\n{stderr}")
             
+            log_content = pipeline.render()
+            log_content += cost_note
             log_content += f"\n\nExecution time: {execution_time:.2f} seconds"
             
             # Check if simulation was successful
             success = process.returncode == 0 and raw_path.exists()
             
             if success:
-                # Copy raw file to a persistent location
-                persistent_raw = tempfile.NamedTemporaryFile(
-                    mode='wb',
-                    suffix='.raw',
-                    delete=False
-                )
-                shutil.copy2(raw_path, persistent_raw.name)
-                persistent_raw.close()
-                return True, log_content, persistent_raw.name
+                # Move raw file out of the sandbox before it is recycled
+                return True, log_content, SCRATCH.persist(raw_path, suffix='.raw')
             else:
                 return False, log_content, None
                 
@@ -96,6 +297,51 @@ def run_ngspice(netlist: str, timeout: int = DEFAULT_TIMEOUT) -> Tuple[bool, str
         except Exception as e:
             return False, f"Error running ngspice: {str(e)}", None
 
+def simulate(netlist: str, timeout: int = DEFAULT_TIMEOUT, fast_path: bool = True,
+             runner: Optional[Callable[..., Tuple[bool, str, Optional[str]]]] = None,
+             **run_kwargs: Any) -> Tuple[bool, str, Optional['pd.DataFrame'], Dict[str, Any], Optional[str]]:
+    """
+    Simulate a netlist and parse the result
+    
+    Linear R/L/C/V/I/E/G circuits with a single .ac analysis are solved
+    in-process by the MNA engine; everything else runs through ngspice.
+    
+    Args:
+        netlist: Sanitized netlist content
+        timeout: Maximum ngspice execution time in seconds
+        fast_path: Allow the in-process linear AC solver
+        runner: Replacement for run_ngspice with the same signature, e.g.
+            a scheduler's submit function
+        **run_kwargs: Extra arguments for run_ngspice
+    
+    Returns:
+        (success, log_content, dataframe, metadata, raw_file_path);
+        raw_file_path is None when the fast path was used
+    """
+    # NumPy/pandas are only loaded once a result has to be produced
+    from core.mna import solve_linear_ac, UnsupportedCircuitError
+    from core.raw_parser import parse_ascii_raw
+    
+    if fast_path:
+        start_time = time.time()
+        try:
+            df, metadata = solve_linear_ac(netlist)
+            elapsed = time.time() - start_time
+            log_content = (
+                f"Linear AC fast path (in-process MNA): {metadata['no_variables'] - 1} vectors, "
+                f"{metadata['no_points']} frequency points\n\n"
+                f"Execution time: {elapsed * 1000:.2f} ms"
+            )
+            return True, log_content, df, metadata, None
+        except UnsupportedCircuitError:
+            pass
+    
+    success, log_content, raw_path = (runner or run_ngspice)(netlist, timeout, **run_kwargs)
+    if not success or not raw_path:
+        return False, log_content, None, {}, None
+    df, metadata = parse_ascii_raw(raw_path)
+    return True, log_content, df, metadata, raw_path
+
 def check_ngspice_installed() -> bool:
     """Check if ngspice is installed and accessible"""
     try:
@@ -4,7 +4,7 @@ Removes dangerous commands and ensures proper .control block
 """
 
 import re
-from typing import List, Tuple
+from typing import List, Optional, Sequence, Tuple
 
 
 DANGEROUS_PATTERNS = [
@@ -18,12 +18,43 @@ DANGEROUS_PATTERNS = [
     (r'rusage.*', 'resource usage'),
 ]
 
-def sanitize_netlist(netlist: str) -> str:
+# Output vector names accepted for selective saving: v(node), v(a,b),
+# i(source), plain vector names and @device[param]
+VECTOR_NAME_RE = re.compile(
+    r'^(?:[vi]\([\w.:#+-]+(?:,[\w.:#+-]+)?\)|@[\w.:#+-]+\[\w+\]|[A-Za-z_][\w.:#+-]*)$',
+    re.IGNORECASE
+)
+
+def validate_vectors(vectors: Sequence[str]) -> List[str]:
+    """
+    Check output vector names before they are written into a netlist
+    
+    Returns:
+        Cleaned vector names, duplicates removed
+    
+    Raises:
+        ValueError: if a name is not a plain vector reference
+    """
+    cleaned = []
+    for vector in vectors:
+        name = re.sub(r'\s+', '', str(vector))
+        if not VECTOR_NAME_RE.match(name):
+            raise ValueError(f"Invalid output vector name: {vector!r}")
+        if name.lower() not in (c.lower() for c in cleaned):
+            cleaned.append(name)
+    return cleaned
+
+def sanitize_netlist(netlist: str, save_vectors: Optional[Sequence[str]] = None) -> str:
     """
     Sanitize netlist for safe execution
     - Remove dangerous commands
     - Ensure proper .control block with ASCII output
+    - Optionally save and write only the given output vectors
     """
+    vectors = validate_vectors(save_vectors) if save_vectors else []
+    write_line = 'write output.raw' + ''.join(f' {v}' for v in vectors)
+    save_lines = [f".save {' '.join(vectors)}"] if vectors else []
+    
     lines = netlist.split('\n')
     sanitized_lines = []
     in_control = False
@@ -64,23 +95,25 @@ def sanitize_netlist(netlist: str) -> str:
     if has_control and control_start_idx >= 0:
 
         control_lines = []
-        has_filetype = False
         has_run = False
         has_write = False
-        has_quit = False
         
 
         for i in range(control_start_idx + 1, control_end_idx):
             if i < len(sanitized_lines):
                 line_lower = sanitized_lines[i].lower().strip()
-                if 'set filetype' in line_lower:
-                    has_filetype = True
-                if line_lower == 'run':
-                    has_run = True
-                if 'write' in line_lower and 'output.raw' in line_lower:
+                command = line_lower.split()[0] if line_lower else ''
+                if line_lower.startswith('set filetype') or command in ('quit', 'exit'):
+                    continue
+                if command == 'write':
+                    # Only output.raw is collected; point its writes at the selected vectors
+                    if line_lower.split()[1:2] != ['output.raw']:
+                        continue
                     has_write = True
-                if line_lower == 'quit':
-                    has_quit = True
+                    if vectors:
+                        sanitized_lines[i] = write_line
+                if command == 'run':
+                    has_run = True
                 
 
                 is_safe = True
@@ -92,26 +125,23 @@ def sanitize_netlist(netlist: str) -> str:
                     control_lines.append(sanitized_lines[i])
         
 
-        new_control = ['.control']
-        if not has_filetype:
-            new_control.append('set filetype=ascii')
+        new_control = ['.control', 'set filetype=ascii']
         if not has_run:
             new_control.append('run')
         
-
-        for line in control_lines:
-            if not any(x in line.lower() for x in ['set filetype', 'run', 'write', 'quit']):
-                new_control.append(line)
+        # User commands keep their order; only filetype/quit and writes
+        # to other files are dropped
+        new_control.extend(control_lines)
         
         if not has_write:
-            new_control.append('write output.raw')
-        if not has_quit:
-            new_control.append('quit')
+            new_control.append(write_line)
+        new_control.append('quit')
         new_control.append('.endc')
         
 
         sanitized_lines = (
             sanitized_lines[:control_start_idx] +
+            save_lines +
             new_control +
             sanitized_lines[control_end_idx + 1:]
         )
@@ -124,11 +154,11 @@ def sanitize_netlist(netlist: str) -> str:
                 break
         
         if end_idx >= 0:
-            control_block = [
+            control_block = save_lines + [
                 '.control',
                 'set filetype=ascii',
                 'run',
-                'write output.raw',
+                write_line,
                 'quit',
                 '.endc'
             ]
@@ -139,11 +169,11 @@ def sanitize_netlist(netlist: str) -> str:
             )
         else:
 
-            sanitized_lines.extend([
+            sanitized_lines.extend(save_lines + [
                 '.control',
                 'set filetype=ascii',
                 'run',
-                'write output.raw',
+                write_line,
                 'quit',
                 '.endc',
                 '.end'
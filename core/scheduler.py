@@ -0,0 +1,236 @@
+"""
+Priority scheduling of ngspice runs
+Interactive runs go ahead of batch work, waiting batch jobs age into the
+interactive class, and running batch jobs are preempted (killed and
+requeued) when an interactive run would otherwise have to wait
+"""
+
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, Callable, List, Optional, Sequence, Tuple, TYPE_CHECKING
+
+from core.estimator import estimate_simulation_cost, classify_cost
+from core.runner import run_ngspice, simulate, DEFAULT_TIMEOUT
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+INTERACTIVE = 'interactive'
+BATCH = 'batch'
+PRIORITY_CLASSES = (INTERACTIVE, BATCH)
+
+# Concurrent ngspice runs (can be overridden by environment variable)
+MAX_CONCURRENT = int(os.environ.get('OPENSPICE_MAX_CONCURRENT', str(os.cpu_count() or 1)))
+
+# Seconds a batch job waits before it is queued like an interactive one
+AGING_INTERVAL = float(os.environ.get('OPENSPICE_AGING_SECONDS', '30'))
+
+# Restarts after which a batch job is no longer preempted
+MAX_PREEMPTIONS = 3
+
+# Finished jobs kept for metrics
+METRICS_WINDOW = 1000
+
+RunResult = Tuple[bool, str, Optional[str]]
+
+
+def classify_priority(netlist: str) -> str:
+    """BATCH for jobs the cost estimator rates low priority (or oversize), INTERACTIVE otherwise"""
+    return INTERACTIVE if classify_cost(estimate_simulation_cost(netlist)) == 'run' else BATCH
+
+
+class Job:
+    """Bookkeeping for one scheduled run"""
+
+    def __init__(self, job_id: int, priority: str):
+        self.id = job_id
+        self.priority = priority
+        self.submitted = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.queue_wait = 0.0
+        self.run_time = 0.0
+        self.preemptions = 0
+        self.cancel = threading.Event()
+        self.preempted = False
+        self.enqueued = self.submitted
+
+
+def _summary(values: Sequence[float]) -> Dict[str, float]:
+    """Mean, median, 95th percentile and maximum of a sample"""
+    if not values:
+        return {'mean': 0.0, 'p50': 0.0, 'p95': 0.0, 'max': 0.0}
+    ordered = sorted(values)
+
+    def percentile(q: float) -> float:
+        return ordered[int(round(q * (len(ordered) - 1)))]
+
+    return {'mean': sum(ordered) / len(ordered), 'p50': percentile(0.5),
+            'p95': percentile(0.95), 'max': ordered[-1]}
+
+
+class Scheduler:
+    """
+    Admission control for ngspice runs with two priority classes
+
+    run() blocks until the job holds one of `slots` run slots, then runs
+    it on the calling thread (so progress callbacks stay on the caller's
+    thread). Queued jobs are ordered by class, then submission time; a
+    batch job that has waited `aging` seconds is ordered like an
+    interactive one. When an interactive job arrives and no slot is free,
+    the most recently started batch run is cancelled through its
+    cancel_event and queued again with its original submission time.
+    """
+
+    def __init__(self, slots: int = MAX_CONCURRENT, backend: Callable[..., RunResult] = run_ngspice,
+                 aging: float = AGING_INTERVAL, max_preemptions: int = MAX_PREEMPTIONS):
+        self.slots = max(slots, 1)
+        self.backend = backend
+        self.aging = aging
+        self.max_preemptions = max_preemptions
+        self._queue: List[Job] = []
+        self._running: Dict[int, Job] = {}
+        self._finished: 'deque[Job]' = deque(maxlen=METRICS_WINDOW)
+        self._ids = itertools.count(1)
+        self._cond = threading.Condition()
+
+    def _level(self, job: Job, now: float) -> int:
+        if job.priority == INTERACTIVE or now - job.submitted >= self.aging:
+            return 0
+        return 1
+
+    def _next_job(self, now: float) -> Optional[Job]:
+        if not self._queue:
+            return None
+        return min(self._queue, key=lambda job: (self._level(job, now), job.submitted, job.id))
+
+    def _preempt_for_interactive(self) -> None:
+        """Cancel batch runs while interactive jobs outnumber the slots being freed"""
+        # Aged batch jobs queue like interactive ones but never preempt other batch work
+        waiting = sum(1 for job in self._queue if job.priority == INTERACTIVE)
+        freeing = (self.slots - len(self._running)) + sum(1 for job in self._running.values() if job.preempted)
+        victims = sorted(
+            (job for job in self._running.values()
+             if job.priority == BATCH and not job.preempted and job.preemptions < self.max_preemptions),
+            key=lambda job: job.started, reverse=True
+        )
+        for victim in victims[:max(waiting - freeing, 0)]:
+            victim.preempted = True
+            victim.cancel.set()
+
+    def _acquire(self, job: Job) -> None:
+        """Wait until the job is first in line and a slot is free"""
+        with self._cond:
+            while True:
+                now = time.time()
+                if len(self._running) < self.slots and self._next_job(now) is job:
+                    self._queue.remove(job)
+                    job.queue_wait += now - job.enqueued
+                    job.started = now
+                    self._running[job.id] = job
+                    self._cond.notify_all()
+                    return
+                # Re-check periodically so aging takes effect
+                self._cond.wait(timeout=max(min(self.aging, 1.0), 0.05))
+
+    def _release(self, job: Job, result: Optional[RunResult]) -> bool:
+        """Free the job's slot; returns False if it was preempted and requeued"""
+        now = time.time()
+        with self._cond:
+            del self._running[job.id]
+            requeue = job.preempted and result is not None and not result[0]
+            if requeue:
+                job.preemptions += 1
+                job.preempted = False
+                job.cancel.clear()
+                job.enqueued = now
+                self._queue.append(job)
+            else:
+                job.run_time = now - job.started
+                job.finished = now
+                self._finished.append(job)
+            self._cond.notify_all()
+        return not requeue
+
+    def run(self, netlist: str, timeout: int = DEFAULT_TIMEOUT, priority: Optional[str] = None,
+            **kwargs: Any) -> RunResult:
+        """
+        Run a netlist through the backend once a slot is granted
+
+        Args:
+            netlist: Sanitized netlist content
+            timeout: ngspice timeout in seconds (per attempt)
+            priority: INTERACTIVE or BATCH (default: from the cost estimate)
+            **kwargs: Passed to the backend (run_ngspice)
+
+        Returns:
+            The backend's (success, log_content, raw_file_path); preempted
+            attempts are retried and not returned
+        """
+        priority = priority or classify_priority(netlist)
+        if priority not in PRIORITY_CLASSES:
+            raise ValueError(f"Unknown priority class: {priority}")
+        job = Job(next(self._ids), priority)
+        with self._cond:
+            self._queue.append(job)
+            if priority == INTERACTIVE:
+                self._preempt_for_interactive()
+            self._cond.notify_all()
+
+        while True:
+            self._acquire(job)
+            result = None
+            try:
+                result = self.backend(netlist, timeout, cancel_event=job.cancel, **kwargs)
+            finally:
+                done = self._release(job, result)
+            if done:
+                if job.preemptions:
+                    success, log_content, raw_path = result
+                    result = (success, log_content + f"\n\nPreempted by interactive runs {job.preemptions} time(s)", raw_path)
+                return result
+
+    def runner(self, priority: Optional[str] = None) -> Callable[..., RunResult]:
+        """run_ngspice-compatible function that schedules with the given priority"""
+        def run(netlist: str, timeout: int = DEFAULT_TIMEOUT, **kwargs: Any) -> RunResult:
+            return self.run(netlist, timeout, priority, **kwargs)
+        return run
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Queue-wait and run-time statistics per priority class
+
+        Returns:
+            {class: {'queued', 'running', 'completed', 'preemptions',
+            'queue_wait': {'mean', 'p50', 'p95', 'max'}, 'run_time': {...}}}
+        """
+        with self._cond:
+            queued = list(self._queue)
+            running = list(self._running.values())
+            finished = list(self._finished)
+        report = {}
+        for priority in PRIORITY_CLASSES:
+            done = [job for job in finished if job.priority == priority]
+            report[priority] = {
+                'queued': sum(1 for job in queued if job.priority == priority),
+                'running': sum(1 for job in running if job.priority == priority),
+                'completed': len(done),
+                'preemptions': sum(job.preemptions for job in done),
+                'queue_wait': _summary([job.queue_wait for job in done]),
+                'run_time': _summary([job.run_time for job in done]),
+            }
+        return report
+
+
+# Process-wide scheduler shared by the app
+SCHEDULER = Scheduler()
+
+
+def scheduled_simulate(netlist: str, timeout: int = DEFAULT_TIMEOUT, priority: Optional[str] = None,
+                       scheduler: Scheduler = SCHEDULER,
+                       **kwargs: Any) -> Tuple[bool, str, Optional['pd.DataFrame'], Dict[str, Any], Optional[str]]:
+    """simulate() with the ngspice run admitted by the scheduler"""
+    return simulate(netlist, timeout, runner=scheduler.runner(priority), **kwargs)
@@ -0,0 +1,140 @@
+"""
+Scratch space for ngspice jobs
+Places job sandboxes on a RAM-backed filesystem when one is available and
+recycles emptied sandbox directories instead of creating new ones per job
+"""
+
+import atexit
+import os
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+# RAM-backed locations tried before the regular temp directory
+RAM_SCRATCH_CANDIDATES = ('/dev/shm',)
+
+# Explicit scratch location (can be overridden by environment variable)
+DEFAULT_SCRATCH_DIR = os.environ.get('OPENSPICE_SCRATCH_DIR', '')
+
+# Number of emptied sandboxes kept for reuse
+SANDBOX_POOL_SIZE = int(os.environ.get('OPENSPICE_SANDBOX_POOL', '8'))
+
+# Disk-backed directory persisted outputs are moved to (default: the system temp directory)
+DEFAULT_OUTPUT_DIR = os.environ.get('OPENSPICE_OUTPUT_DIR', '')
+
+
+def _usable(path: str) -> bool:
+    return os.path.isdir(path) and os.access(path, os.W_OK | os.X_OK)
+
+
+def scratch_base(preferred: Optional[str] = None) -> str:
+    """
+    Directory job sandboxes are created in
+
+    Uses the preferred/configured directory if set, then /dev/shm, then
+    the system temp directory.
+    """
+    for candidate in (preferred, DEFAULT_SCRATCH_DIR) + RAM_SCRATCH_CANDIDATES:
+        if candidate and _usable(candidate):
+            return candidate
+    return tempfile.gettempdir()
+
+
+def _clear_directory(path: Path) -> None:
+    """Delete everything inside a directory, keeping the directory itself"""
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                shutil.rmtree(entry.path)
+            else:
+                os.unlink(entry.path)
+
+
+class ScratchManager:
+    """
+    Pool of reusable job sandbox directories
+
+    Each sandbox is an empty directory for the duration of one job. On
+    release its contents are deleted and the directory goes back to the
+    pool, so steady-state jobs do not create or remove directories.
+    Outputs that outlive a job are persisted to output_dir, which is
+    disk-backed, so results kept by callers do not hold RAM.
+    """
+
+    def __init__(self, base: Optional[str] = None, pool_size: int = SANDBOX_POOL_SIZE,
+                 output_dir: Optional[str] = None):
+        self.base = scratch_base(base)
+        self.output_dir = output_dir or DEFAULT_OUTPUT_DIR or tempfile.gettempdir()
+        self.pool_size = pool_size
+        self._root: Optional[Path] = None
+        self._root_pid: Optional[int] = None
+        self._free: List[Path] = []
+        self._lock = threading.Lock()
+
+    @property
+    def root(self) -> Path:
+        """Per-process directory holding this manager's sandboxes"""
+        with self._lock:
+            if self._root is None or self._root_pid != os.getpid():
+                # Forked workers get their own root and an empty pool
+                self._root = Path(tempfile.mkdtemp(prefix='openspice_', dir=self.base))
+                self._root_pid = os.getpid()
+                self._free = []
+                atexit.register(shutil.rmtree, str(self._root), True)
+            return self._root
+
+    @contextmanager
+    def acquire(self) -> Iterator[Path]:
+        """Empty sandbox directory for one job, recycled on exit"""
+        root = self.root
+        with self._lock:
+            sandbox = self._free.pop() if self._free else None
+        if sandbox is None:
+            sandbox = Path(tempfile.mkdtemp(prefix='job_', dir=root))
+        try:
+            yield sandbox
+        finally:
+            self.release(sandbox)
+
+    def release(self, sandbox: Path) -> None:
+        try:
+            _clear_directory(sandbox)
+        except OSError:
+            shutil.rmtree(sandbox, ignore_errors=True)
+            return
+        with self._lock:
+            if len(self._free) < self.pool_size and self._root_pid == os.getpid():
+                self._free.append(sandbox)
+                return
+        shutil.rmtree(sandbox, ignore_errors=True)
+
+    def persist(self, path: Path, suffix: str = '') -> str:
+        """
+        Move a job output out of its sandbox so it survives recycling
+
+        The file goes to output_dir (a rename when that is on the scratch
+        filesystem, otherwise a copy); the caller owns the returned path
+        and deletes it when done.
+        """
+        fd, target = tempfile.mkstemp(prefix='ngspice_', suffix=suffix, dir=self.output_dir)
+        os.close(fd)
+        try:
+            os.replace(path, target)
+        except OSError:
+            shutil.copyfile(path, target)
+            os.unlink(path)
+        return target
+
+    def cleanup(self) -> None:
+        """Remove all pooled sandboxes"""
+        with self._lock:
+            root, self._root, self._free = self._root, None, []
+        if root is not None:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+# Process-wide manager used by the runner
+SCRATCH = ScratchManager()
@@ -0,0 +1,247 @@
+"""
+Finite-difference sensitivity analysis
+Perturbs every element value of a netlist, evaluates all variants in one
+batch and ranks the components by their normalized effect on each metric
+"""
+
+import re
+from typing import Dict, Any, List, Optional, Sequence, Tuple, TYPE_CHECKING
+
+import numpy as np
+
+from core.batch import evaluate_variants
+from core.netlist_parser import parse_netlist, replace_line, element_numeric_value
+from core.utils import parse_spice_value
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Relative perturbation applied to each element value
+DEFAULT_STEP = 0.01
+
+# Element types whose value (or gain) is perturbed
+SENSITIVITY_TYPES = ('R', 'L', 'C', 'E', 'G', 'F', 'H')
+
+# Metric statistics: 'stat(trace)' or 'at(trace, x)'
+METRIC_STATS = ('min', 'max', 'mean', 'final', 'rms', 'at', 'cutoff', 'overshoot')
+
+_METRIC_RE = re.compile(r'^\s*(\w+)\s*\(\s*(.+?)\s*(?:,\s*([^,()\s]+)\s*)?\)\s*$')
+
+
+def _value_index(element: Dict[str, Any]) -> int:
+    """Position of the value token in an element's args"""
+    positional = [i for i, arg in enumerate(element['args']) if '=' not in arg]
+    return positional[1] if element['type'] in ('F', 'H') else positional[0]
+
+
+def sensitivity_elements(netlist: str, types: Sequence[str] = SENSITIVITY_TYPES) -> List[Dict[str, Any]]:
+    """
+    Top-level elements with a plain, non-zero numeric value
+
+    Values are recognized with parse_spice_value; expressions such as
+    '{rval}' and model-based devices are skipped.
+
+    Returns:
+        [{'name', 'type', 'value', 'element'}, ...] in netlist order
+    """
+    found = []
+    for element in parse_netlist(netlist)['elements']:
+        if element['type'] not in types:
+            continue
+        value = element_numeric_value(element)
+        if value is None or value == 0:
+            continue
+        found.append({'name': element['name'], 'type': element['type'], 'value': value, 'element': element})
+    return found
+
+
+def perturb_netlist(netlist: str, element: Dict[str, Any], value: float) -> str:
+    """Netlist with one element's value replaced"""
+    args = list(element['args'])
+    args[_value_index(element)] = f"{value:.9g}"
+    return replace_line(netlist, element['line'], ' '.join([element['name']] + element['nodes'] + args))
+
+
+def parse_metric(spec: str) -> Tuple[str, str, Optional[float]]:
+    """
+    Parse a metric such as 'max(v(out))', 'final(i(v1))' or 'at(v(out), 1k)'
+
+    Returns:
+        (statistic, trace, x) with x only set for 'at'
+
+    Raises:
+        ValueError: for unknown statistics or malformed specs
+    """
+    match = _METRIC_RE.match(spec)
+    if not match or match.group(1).lower() not in METRIC_STATS:
+        raise ValueError(f"Invalid metric: {spec!r} (expected e.g. 'max(v(out))' or 'at(v(out), 1k)')")
+    stat, trace, x = match.group(1).lower(), match.group(2), match.group(3)
+    if (stat == 'at') != (x is not None):
+        raise ValueError(f"Invalid metric: {spec!r}")
+    return stat, trace, parse_spice_value(x) if x is not None else None
+
+
+def _cutoff(x: np.ndarray, magnitude: np.ndarray) -> float:
+    """x where the magnitude crosses 1/sqrt(2) of its peak (-3 dB), nearest the peak"""
+    peak = int(np.argmax(magnitude))
+    below = magnitude < magnitude[peak] / np.sqrt(2)
+    after = np.flatnonzero(below[peak:])
+    before = np.flatnonzero(below[:peak])
+    if len(after):
+        hi = peak + int(after[0])
+        lo = hi - 1
+    elif len(before):
+        lo = int(before[-1])
+        hi = lo + 1
+    else:
+        return float('nan')
+    level = magnitude[peak] / np.sqrt(2)
+    scale = np.log10 if x[lo] > 0 and x[hi] > 0 else (lambda v: v)
+    fraction = (magnitude[lo] - level) / (magnitude[lo] - magnitude[hi])
+    position = scale(x[lo]) + fraction * (scale(x[hi]) - scale(x[lo]))
+    return float(10 ** position if scale is np.log10 else position)
+
+
+def _overshoot(column: np.ndarray) -> float:
+    """Peak excursion beyond the final value, in % of the initial-to-final step"""
+    step = column[-1] - column[0]
+    if step == 0:
+        return 0.0
+    peak = column.max() if step > 0 else column.min()
+    return float(max((peak - column[-1]) / step, 0.0) * 100)
+
+
+def evaluate_metrics(x: np.ndarray, variables: Sequence[str], data: np.ndarray,
+                     metrics: Sequence[str]) -> np.ndarray:
+    """
+    Metric values of every variant
+
+    Complex (AC) traces are measured by magnitude. 'cutoff' is the -3 dB
+    point nearest the magnitude peak (log-interpolated on positive x) and
+    'overshoot' the peak beyond the final value in % of the step size.
+
+    Args:
+        x: Shared x-axis
+        variables: Variable names of the last data axis
+        data: (variant x point x variable) array from evaluate_variants
+        metrics: Metric specs (see parse_metric)
+
+    Returns:
+        (variant x metric) array
+    """
+    lookup = {name.lower(): i for i, name in enumerate(variables)}
+    values = np.empty((data.shape[0], len(metrics)))
+    for j, spec in enumerate(metrics):
+        stat, trace, at = parse_metric(spec)
+        if trace.lower() not in lookup:
+            raise ValueError(f"Unknown trace in metric {spec!r}: {trace}")
+        column = data[:, :, lookup[trace.lower()]]
+        column = np.abs(column) if np.iscomplexobj(column) else column.astype(float)
+        if stat == 'min':
+            values[:, j] = column.min(axis=1)
+        elif stat == 'max':
+            values[:, j] = column.max(axis=1)
+        elif stat == 'mean':
+            values[:, j] = column.mean(axis=1)
+        elif stat == 'final':
+            values[:, j] = column[:, -1]
+        elif stat == 'rms':
+            values[:, j] = np.sqrt(np.mean(column ** 2, axis=1))
+        elif stat == 'cutoff':
+            values[:, j] = [_cutoff(x, np.abs(row)) for row in column]
+        elif stat == 'overshoot':
+            values[:, j] = [_overshoot(row) for row in column]
+        else:
+            values[:, j] = [np.interp(at, x, row) for row in column]
+    return values
+
+
+def sensitivity_analysis(netlist: str, metrics: Sequence[str], step: float = DEFAULT_STEP,
+                         central: bool = False, elements: Optional[Sequence[str]] = None,
+                         **kwargs: Any) -> Dict[str, Any]:
+    """
+    Normalized sensitivities of metrics to every element value
+
+    The nominal circuit and one variant per element (two with central
+    differences) are evaluated together by evaluate_variants, i.e. as one
+    batched MNA solve, one ngspice alter loop or parallel runs.
+
+    Args:
+        netlist: Netlist (sanitized or not)
+        metrics: Metric specs, e.g. ['max(v(out))', 'at(v(out), 1k)']
+        step: Relative perturbation of each value
+        central: Use central instead of forward differences
+        elements: Restrict to these element names (default: all found)
+        **kwargs: Passed to evaluate_variants (timeout, workers, fast_path)
+
+    Returns:
+        {'table': ranked DataFrame (see sensitivity_table), 'nominal':
+        {metric: value}, 'engine', 'variants', 'log'}
+    """
+    if not metrics:
+        raise ValueError("No metrics given")
+    for spec in metrics:
+        parse_metric(spec)
+    found = sensitivity_elements(netlist)
+    if elements is not None:
+        wanted = {name.lower() for name in elements}
+        found = [e for e in found if e['name'].lower() in wanted]
+    if not found:
+        raise ValueError("No elements with numeric values to perturb")
+
+    factors = (1 + step, 1 - step) if central else (1 + step,)
+    variants = [netlist]
+    for item in found:
+        variants.extend(perturb_netlist(netlist, item['element'], item['value'] * f) for f in factors)
+
+    result = evaluate_variants(variants, **kwargs)
+    values = evaluate_metrics(result['x'], result['variables'], result['data'], metrics)
+    nominal = values[0]
+    perturbed = values[1:].reshape(len(found), len(factors), len(metrics))
+
+    if central:
+        # (M+ - M-) / (2 h) per unit relative change
+        semi = (perturbed[:, 0] - perturbed[:, 1]) / (2 * step)
+    else:
+        semi = (perturbed[:, 0] - nominal) / step
+    with np.errstate(divide='ignore', invalid='ignore'):
+        normalized = np.where(nominal != 0, semi / nominal, np.nan)
+
+    return {
+        'table': sensitivity_table(found, metrics, nominal, semi, normalized),
+        'nominal': dict(zip(metrics, nominal.tolist())),
+        'engine': result['engine'],
+        'variants': len(variants),
+        'log': result['log'],
+    }
+
+
+def sensitivity_table(found: Sequence[Dict[str, Any]], metrics: Sequence[str], nominal: np.ndarray,
+                      semi: np.ndarray, normalized: np.ndarray) -> 'pd.DataFrame':
+    """
+    Ranked table with one row per metric and element
+
+    Columns: 'metric', 'rank', 'element', 'type', 'value', 'nominal',
+    'sensitivity' (normalized, % change of the metric per % change of the
+    value) and 'delta_per_unit' (metric change per unit relative change).
+    Rows are ranked by |sensitivity| within each metric.
+    """
+    import pandas as pd
+
+    rows = []
+    for j, metric in enumerate(metrics):
+        strength = np.abs(np.where(np.isnan(normalized[:, j]), 0.0, normalized[:, j]))
+        order = np.lexsort((-np.abs(semi[:, j]), -strength))
+        for rank, i in enumerate(order, start=1):
+            rows.append({
+                'metric': metric,
+                'rank': rank,
+                'element': found[i]['name'],
+                'type': found[i]['type'],
+                'value': found[i]['value'],
+                'nominal': float(nominal[j]),
+                'sensitivity': float(normalized[i, j]),
+                'delta_per_unit': float(semi[i, j]),
+            })
+    return pd.DataFrame(rows, columns=['metric', 'rank', 'element', 'type', 'value',
+                                       'nominal', 'sensitivity', 'delta_per_unit'])
@@ -0,0 +1,317 @@
+"""
+Resident ngspice sessions for incremental re-simulation
+Keeps the circuit loaded in an 'ngspice -p' process and applies value-only
+edits with alter/alterparam instead of reloading the whole netlist
+"""
+
+import atexit
+import itertools
+import os
+import queue
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Sequence, Tuple, TYPE_CHECKING
+
+from core.estimator import plan_simulation
+from core.log_pipeline import LogPipeline
+from core.netlist_parser import diff_netlists, ALTERABLE_TYPES
+from core.runner import DEFAULT_TIMEOUT
+from core.scratch import SCRATCH
+from core.singleflight import coalesced_simulate
+from core.utils import parse_spice_value
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# ngspice in pipe mode: commands on stdin, output on stdout
+PIPE_COMMAND = ('ngspice', '-p')
+
+# Resident sessions kept alive at once (can be overridden by environment variable)
+MAX_SESSIONS = int(os.environ.get('OPENSPICE_MAX_SESSIONS', '4'))
+
+# Seconds to wait for a new session to answer its first command
+STARTUP_TIMEOUT = 10
+
+# Echoed after each command batch to find the end of its output
+SENTINEL_PREFIX = '__openspice_done_'
+
+
+class SessionError(RuntimeError):
+    """The resident session cannot serve the request; run in batch mode instead"""
+
+
+def split_control(netlist: str) -> Tuple[str, List[str]]:
+    """
+    Separate a sanitized netlist into its circuit and its control commands
+
+    Returns:
+        (circuit text without the .control block, control commands
+        without quit/exit)
+    """
+    circuit: List[str] = []
+    commands: List[str] = []
+    in_control = False
+    for line in netlist.split('\n'):
+        lower = line.strip().lower()
+        if lower.startswith('.control'):
+            in_control = True
+        elif lower.startswith('.endc'):
+            in_control = False
+        elif not in_control:
+            circuit.append(line)
+        elif lower and not lower.startswith('*') and lower.split()[0] not in ('quit', 'exit'):
+            commands.append(line.strip())
+    return '\n'.join(circuit), commands
+
+
+def plan_update(loaded: str, circuit: str) -> Optional[List[str]]:
+    """
+    Commands that turn the loaded circuit into the new one
+
+    Only value edits qualify: numeric R/L/C values become 'alter' commands
+    and changed .param values become 'alterparam' followed by 'reset'.
+
+    Returns:
+        List of commands (empty if nothing changed), or None when the
+        circuit has to be reloaded
+    """
+    diff = diff_netlists(loaded, circuit)
+    if (not diff['same_topology'] or diff['models_changed']
+            or diff['analyses_changed'] or diff['directives_changed']):
+        return None
+
+    commands = []
+    for name, change in diff['changed_elements'].items():
+        if change['type'] not in ALTERABLE_TYPES or len(change['new']) != 1:
+            return None
+        try:
+            parse_spice_value(change['new'][0])
+        except ValueError:
+            return None
+        commands.append(f"alter {name.lower()} = {change['new'][0]}")
+
+    if diff['changed_params']:
+        commands.extend(f"alterparam {name} = {value}" for name, value in sorted(diff['changed_params'].items()))
+        commands.append('reset')
+    return commands
+
+
+class NgspiceSession:
+    """
+    One resident ngspice process holding the last simulated circuit
+
+    run() reloads the circuit only when its topology, models, analyses or
+    directives changed; value-only edits are applied in place. Commands
+    are followed by an echoed sentinel so the session knows when ngspice
+    has finished with them.
+    """
+
+    def __init__(self, command: Sequence[str] = PIPE_COMMAND):
+        self.command = list(command)
+        self.circuit: Optional[str] = None
+        self.stats = {'reloads': 0, 'alters': 0}
+        self._process: Optional[subprocess.Popen] = None
+        self._output: 'queue.Queue[Optional[str]]' = queue.Queue()
+        self._workdir: Optional[Path] = None
+        self._sentinels = itertools.count(1)
+        self._lock = threading.Lock()
+
+    @property
+    def alive(self) -> bool:
+        return self._process is not None and self._process.poll() is None
+
+    def _start(self) -> None:
+        self.close()
+        self._workdir = Path(tempfile.mkdtemp(prefix='session_', dir=SCRATCH.root))
+        try:
+            self._process = subprocess.Popen(
+                self.command,
+                cwd=self._workdir,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+                bufsize=1
+            )
+        except OSError as e:
+            self.close()
+            raise SessionError(f"cannot start {self.command[0]}: {e}")
+
+        self._output = queue.Queue()
+
+        def pump(stream, output: 'queue.Queue[Optional[str]]') -> None:
+            for line in iter(stream.readline, ''):
+                output.put(line)
+            output.put(None)
+
+        threading.Thread(target=pump, args=(self._process.stdout, self._output), daemon=True).start()
+        try:
+            self._execute([], STARTUP_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            raise SessionError("ngspice session did not respond")
+
+    def _execute(self, commands: List[str], timeout: float) -> str:
+        """
+        Send commands and collect their output up to the sentinel
+
+        Raises:
+            SessionError: if ngspice exits or the pipe breaks
+            subprocess.TimeoutExpired: if the commands do not finish in time
+                (the session is closed)
+        """
+        sentinel = f"{SENTINEL_PREFIX}{next(self._sentinels)}"
+        try:
+            self._process.stdin.write(''.join(f"{c}\n" for c in commands + [f"echo {sentinel}"]))
+            self._process.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            self.close()
+            raise SessionError(f"ngspice session closed: {e}")
+
+        deadline = time.time() + timeout
+        output = LogPipeline()
+        while True:
+            try:
+                line = self._output.get(timeout=max(deadline - time.time(), 0))
+            except queue.Empty:
+                self.close()
+                raise subprocess.TimeoutExpired(self.command, timeout)
+            if line is None:
+                self.close()
+                raise SessionError("ngspice session exited:\n" + '\n'.join((output.head + list(output.tail))[-20:]))
+            if line.rstrip().endswith(sentinel):
+                return output.render()
+            output.feed_line(line)
+
+    def run(self, netlist: str, timeout: int = DEFAULT_TIMEOUT) -> Tuple[bool, str, Optional[str]]:
+        """
+        Simulate a sanitized netlist in the resident process
+
+        Returns:
+            (success, log_content, raw_file_path), like run_ngspice()
+
+        Raises:
+            SessionError: if the session cannot be used
+        """
+        circuit, control = split_control(netlist)
+        with self._lock:
+            if not self.alive:
+                self._start()
+
+            update = plan_update(self.circuit, circuit) if self.circuit is not None else None
+            if update is None:
+                (self._workdir / 'input.cir').write_text(circuit)
+                commands = (['destroy all', 'remcirc'] if self.circuit is not None else []) + ['source input.cir']
+                note = "circuit loaded"
+                self.stats['reloads'] += 1
+            else:
+                commands = ['destroy all'] + update
+                note = f"{len(update)} value change(s) applied without reloading" if update else "re-run of loaded circuit"
+                self.stats['alters'] += 1
+
+            raw_path = self._workdir / 'output.raw'
+            if raw_path.exists():
+                raw_path.unlink()
+            self.circuit = None
+
+            start_time = time.time()
+            try:
+                log_content = self._execute(commands + control, timeout)
+            except subprocess.TimeoutExpired:
+                return False, f"Simulation timeout after {timeout} seconds", None
+            execution_time = time.time() - start_time
+
+            log_content += f"\n\nResident ngspice session: {note}"
+            log_content += f"\n\nExecution time: {execution_time:.2f} seconds"
+            if not raw_path.exists():
+                return False, log_content, None
+            self.circuit = circuit
+            return True, log_content, SCRATCH.persist(raw_path, suffix='.raw')
+
+    def close(self) -> None:
+        """Stop the ngspice process and remove its working directory"""
+        process, self._process = self._process, None
+        if process is not None and process.poll() is None:
+            process.kill()
+            process.wait()
+        if self._workdir is not None:
+            shutil.rmtree(self._workdir, ignore_errors=True)
+            self._workdir = None
+        self.circuit = None
+
+
+class SessionPool:
+    """Resident sessions by owner (e.g. one per browser session), least recently used closed first"""
+
+    def __init__(self, max_sessions: int = MAX_SESSIONS, command: Sequence[str] = PIPE_COMMAND):
+        self.max_sessions = max_sessions
+        self.command = list(command)
+        self._sessions: 'OrderedDict[str, NgspiceSession]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, owner: str) -> NgspiceSession:
+        evicted = []
+        with self._lock:
+            session = self._sessions.get(owner)
+            if session is None:
+                session = self._sessions[owner] = NgspiceSession(self.command)
+            self._sessions.move_to_end(owner)
+            while len(self._sessions) > self.max_sessions:
+                evicted.append(self._sessions.popitem(last=False)[1])
+        for old in evicted:
+            old.close()
+        return session
+
+    def close(self, owner: str) -> None:
+        with self._lock:
+            session = self._sessions.pop(owner, None)
+        if session is not None:
+            session.close()
+
+    def close_all(self) -> None:
+        with self._lock:
+            sessions, self._sessions = list(self._sessions.values()), OrderedDict()
+        for session in sessions:
+            session.close()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+# Process-wide pool used by the app
+SESSIONS = SessionPool()
+atexit.register(SESSIONS.close_all)
+
+
+def incremental_simulate(netlist: str, session: NgspiceSession, timeout: int = DEFAULT_TIMEOUT,
+                         **kwargs: Any) -> Tuple[bool, str, Optional['pd.DataFrame'], Dict[str, Any], Optional[str]]:
+    """
+    simulate() through a resident session where that pays off
+
+    Linear AC circuits still take the in-process fast path, and jobs the
+    cost estimator does not clear for a normal run (and any session
+    failure) go through coalesced_simulate() with the given kwargs.
+
+    Returns:
+        Same tuple as simulate()
+    """
+    from core.mna import supports_fast_ac
+    from core.raw_parser import parse_ascii_raw
+
+    if supports_fast_ac(netlist) or plan_simulation(netlist)[0] != 'run':
+        return coalesced_simulate(netlist, timeout, **kwargs)
+
+    try:
+        success, log_content, raw_path = session.run(netlist, timeout)
+    except SessionError as e:
+        success, log_content, df, metadata, raw_path = coalesced_simulate(netlist, timeout, **kwargs)
+        return success, log_content + f"\n\nResident session unavailable ({e}); ran in batch mode", df, metadata, raw_path
+
+    if not success or not raw_path:
+        return False, log_content, None, {}, None
+    df, metadata = parse_ascii_raw(raw_path)
+    return True, log_content, df, metadata, raw_path
@@ -0,0 +1,280 @@
+"""
+Per-session result storage with a memory budget
+Keeps each browser session's latest result in memory, spills older and
+oversized results to a memory-mapped on-disk archive and evicts idle
+sessions after a time-to-live
+"""
+
+import atexit
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, TYPE_CHECKING
+
+from core.archive import ResultArchive
+from core.raw_index import index_path
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Hot (in-memory) result bytes allowed per session (can be overridden by environment variable)
+SESSION_BUDGET_BYTES = int(float(os.environ.get('OPENSPICE_SESSION_BUDGET_MB', '64')) * 1024 * 1024)
+
+# Seconds of inactivity after which a session's results are dropped
+SESSION_TTL = float(os.environ.get('OPENSPICE_SESSION_TTL', '1800'))
+
+# Results remembered per session (older ones are deleted)
+MAX_SESSION_RESULTS = int(os.environ.get('OPENSPICE_SESSION_RESULTS', '10'))
+
+# Directory for spilled results (default: system temp directory, not RAM-backed scratch)
+SPILL_DIR = os.environ.get('OPENSPICE_SPILL_DIR', '')
+
+
+def result_nbytes(data: Dict[str, Any]) -> int:
+    """
+    Approximate memory held by a result dictionary
+
+    Counts the DataFrame, text fields (serialized CSV) and derived views
+    that report their own 'nbytes' (e.g. a ResultPyramid's levels).
+    """
+    total = 0
+    df = data.get('dataframe')
+    if df is not None:
+        total += int(df.memory_usage(index=True, deep=True).sum())
+    for key, value in data.items():
+        if isinstance(value, (str, bytes)):
+            total += len(value)
+        elif key != 'dataframe' and isinstance(getattr(value, 'nbytes', None), int):
+            total += value.nbytes
+    return total
+
+
+def _unlink_raw(raw_path: str) -> None:
+    """Delete a result's RAW file and its sidecar point index"""
+    for path in (raw_path, index_path(raw_path)):
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+
+class _SpilledView(dict):
+    """
+    Result dictionary of a spilled entry
+
+    'dataframe' is decoded from the archive on first access only; views
+    such as the pyramid and table read the memory-mapped 'archived' result
+    instead.
+    """
+
+    def __missing__(self, key: str) -> Any:
+        if key != 'dataframe':
+            raise KeyError(key)
+        self['dataframe'] = self['archived'].to_dataframe()
+        return self['dataframe']
+
+
+class _Entry:
+    """One stored result: hot (data in memory) or spilled (run_id in the spill archive)"""
+
+    def __init__(self, result_id: str, data: Dict[str, Any]):
+        self.result_id = result_id
+        self.created = time.time()
+        self.data: Optional[Dict[str, Any]] = data
+        self.spilled_run: Optional[str] = None
+        self.view: Optional[_SpilledView] = None
+        self.nbytes = result_nbytes(data)
+        self.points = len(data['dataframe'])
+        self.title = data['metadata'].get('title', '')
+        self.plotname = data['metadata'].get('plotname', '')
+
+
+class SessionStore:
+    """
+    Result storage for many sessions
+
+    Every session keeps at most `hot` of its latest results in memory;
+    earlier results, and any result whose size exceeds the session's
+    budget, are saved to a ResultArchive and re-read (memory-mapped) on
+    access. The view of the spilled result a session last accessed is
+    kept, so repeated reads (one per UI rerun) reuse it and its cached
+    views; it counts towards memory_usage once its DataFrame is decoded.
+    Derived views are added with attach(), and every access re-checks
+    the budget, so views that grow after a result is stored still count.
+    Sessions untouched for `ttl` seconds are dropped, including their
+    spilled files; idle sessions are swept whenever the store is used.
+    Forgetting a result also deletes its RAW file ('raw_path').
+    """
+
+    def __init__(self, spill_dir: Optional[str] = None, budget: int = SESSION_BUDGET_BYTES,
+                 ttl: float = SESSION_TTL, max_results: int = MAX_SESSION_RESULTS, hot: int = 1):
+        self.budget = budget
+        self.ttl = ttl
+        self.max_results = max_results
+        self.hot = hot
+        self._spill_dir = spill_dir
+        self._archive: Optional[ResultArchive] = None
+        self._sessions: Dict[str, 'OrderedDict[str, _Entry]'] = {}
+        self._last_access: Dict[str, float] = {}
+        self._lock = threading.RLock()
+
+    @property
+    def archive(self) -> ResultArchive:
+        """Spill archive, created on first use"""
+        if self._archive is None:
+            if self._spill_dir is None:
+                self._spill_dir = tempfile.mkdtemp(prefix='openspice_spill_', dir=SPILL_DIR or None)
+                atexit.register(shutil.rmtree, self._spill_dir, True)
+            self._archive = ResultArchive(self._spill_dir)
+        return self._archive
+
+    def _spill(self, session_id: str, entry: _Entry) -> None:
+        data = entry.data
+        entry.spilled_run = self.archive.save(data['dataframe'], data['metadata'], extra={'session': session_id})
+        entry.data = {k: v for k, v in data.items()
+                      if k not in ('dataframe', 'metadata', 'csv', 'window_csv', 'window_csv_range', 'pyramid', 'table')}
+
+    def _enforce(self, session_id: str) -> None:
+        """Spill all but the newest hot results and anything over budget; forget the oldest"""
+        entries = self._sessions[session_id]
+        while len(entries) > self.max_results:
+            _, old = entries.popitem(last=False)
+            self._delete(old)
+        for i, entry in enumerate(reversed(entries.values())):
+            if entry.spilled_run is not None:
+                continue
+            entry.nbytes = result_nbytes(entry.data)
+            if i >= self.hot or entry.nbytes > self.budget:
+                self._spill(session_id, entry)
+
+    def _delete(self, entry: _Entry) -> None:
+        if entry.spilled_run is not None:
+            self.archive.delete(entry.spilled_run)
+        if entry.data and entry.data.get('raw_path'):
+            _unlink_raw(entry.data['raw_path'])
+        entry.data = None
+        entry.view = None
+
+    def _touch(self, session_id: str) -> None:
+        now = time.time()
+        self._last_access[session_id] = now
+        self.evict_idle(now)
+
+    def put(self, session_id: str, df: 'pd.DataFrame', metadata: Dict[str, Any], **extra: Any) -> str:
+        """
+        Store a new result as the session's latest
+
+        Args:
+            session_id: Owner of the result (e.g. one per browser session)
+            df, metadata: Parsed result
+            **extra: Further fields returned with the result (raw_path, run_id, ...)
+
+        Returns:
+            result_id
+        """
+        result_id = uuid.uuid4().hex[:12]
+        with self._lock:
+            self._touch(session_id)
+            entries = self._sessions.setdefault(session_id, OrderedDict())
+            entries[result_id] = _Entry(result_id, {'dataframe': df, 'metadata': metadata, **extra})
+            self._enforce(session_id)
+        return result_id
+
+    def get(self, session_id: str, result_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        A stored result (default: the latest)
+
+        Hot results are returned as their stored dictionary, so values the
+        caller adds (cached views, serialized CSV) stay with the result and
+        count towards the budget. Spilled results come with 'spilled': True
+        and an 'archived' ArchivedResult for windowed access; 'dataframe'
+        is decoded only when first read. The same dictionary is returned
+        until another spilled result of the session is accessed.
+        """
+        with self._lock:
+            self._touch(session_id)
+            entries = self._sessions.get(session_id)
+            if not entries:
+                return None
+            entry = entries.get(result_id) if result_id else next(reversed(entries.values()))
+            if entry is None:
+                return None
+            # Views attached since the last check (and grown lazily) count towards the budget
+            self._enforce(session_id)
+            if entry.spilled_run is None:
+                return entry.data
+            if entry.view is None:
+                # One spilled view per session is kept; older ones are released
+                for other in entries.values():
+                    other.view = None
+                archived = self.archive.open(entry.spilled_run)
+                entry.view = _SpilledView({**(entry.data or {}), 'metadata': archived.metadata,
+                                           'archived': archived, 'spilled': True})
+            return entry.view
+
+    def attach(self, session_id: str, result_id: str, key: str, value: Any) -> Any:
+        """
+        Keep a derived view (pyramid, table, serialized CSV) with a stored result
+
+        The session's budget is enforced again, so a hot result that grows
+        past it is spilled, which drops its derived views. A spilled
+        result's view keeps the value only while it stays within budget.
+
+        Returns:
+            value, for use by the caller whether or not it was kept
+        """
+        with self._lock:
+            entry = self._sessions.get(session_id, {}).get(result_id)
+            if entry is None:
+                return value
+            if entry.spilled_run is None:
+                entry.data[key] = value
+                self._enforce(session_id)
+            elif entry.view is not None and result_nbytes({**entry.view, key: value}) <= self.budget:
+                entry.view[key] = value
+        return value
+
+    def results(self, session_id: str) -> List[Dict[str, Any]]:
+        """Summaries of a session's results, newest first"""
+        with self._lock:
+            entries = list(self._sessions.get(session_id, {}).values())
+        return [{
+            'result_id': e.result_id, 'created': e.created, 'title': e.title, 'plotname': e.plotname,
+            'points': e.points, 'nbytes': e.nbytes, 'spilled': e.spilled_run is not None,
+        } for e in reversed(entries)]
+
+    def memory_usage(self, session_id: Optional[str] = None) -> int:
+        """Bytes of hot results and decoded spilled views held for one session (or all sessions)"""
+        with self._lock:
+            sessions = [session_id] if session_id is not None else list(self._sessions)
+            entries = [e for sid in sessions for e in self._sessions.get(sid, {}).values()]
+            return (sum(e.nbytes for e in entries if e.spilled_run is None) +
+                    sum(result_nbytes(e.view) for e in entries if e.view is not None))
+
+    def drop(self, session_id: str) -> None:
+        """Forget a session and delete its stored results"""
+        with self._lock:
+            entries = self._sessions.pop(session_id, {})
+            self._last_access.pop(session_id, None)
+            for entry in entries.values():
+                self._delete(entry)
+
+    def evict_idle(self, now: Optional[float] = None) -> int:
+        """Drop sessions idle for longer than the TTL; returns how many were dropped"""
+        now = time.time() if now is None else now
+        with self._lock:
+            idle = [sid for sid, last in self._last_access.items() if now - last > self.ttl]
+            for session_id in idle:
+                self.drop(session_id)
+        return len(idle)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+# Process-wide store used by the app
+SESSION_STORE = SessionStore()
@@ -0,0 +1,127 @@
+"""
+Request coalescing for identical simulations
+Concurrent calls with the same key share a single execution and its result
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple, TYPE_CHECKING
+
+from core.runner import simulate, DEFAULT_TIMEOUT
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+class _Flight:
+    """Result slot of one in-progress call"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Deduplicates concurrent calls by key
+
+    The first caller for a key runs the function; callers arriving while
+    it runs block and receive the same result (or exception). Once the
+    call finishes the key is forgotten, so later calls run again.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: Dict[str, _Flight] = {}
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Run fn once per concurrent key
+
+        Returns:
+            (result, shared) where shared is True for callers that reused
+            another caller's execution
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, True
+
+        try:
+            flight.result = fn()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.result, False
+
+    def in_flight(self) -> int:
+        """Number of keys currently executing"""
+        with self._lock:
+            return len(self._flights)
+
+
+def simulation_key(netlist: str, **options: Any) -> str:
+    """Hash of a sanitized netlist plus the options that affect its result"""
+    digest = hashlib.sha256(netlist.encode('utf-8'))
+    for name in sorted(options):
+        value = options[name]
+        if value is None or isinstance(value, (str, int, float, bool)):
+            digest.update(f"\0{name}={value!r}".encode('utf-8'))
+    return digest.hexdigest()
+
+
+# Process-wide coalescing layer used by the app
+SIMULATIONS = SingleFlight()
+
+
+def _own_copy(raw_path: str) -> Optional[str]:
+    """New path for the same RAW file (None if the original is already gone)"""
+    fd, target = tempfile.mkstemp(prefix='ngspice_', suffix='.raw', dir=os.path.dirname(raw_path) or None)
+    os.close(fd)
+    os.unlink(target)
+    try:
+        try:
+            os.link(raw_path, target)
+        except OSError:
+            shutil.copyfile(raw_path, target)
+    except FileNotFoundError:
+        return None
+    return target
+
+
+def coalesced_simulate(netlist: str, timeout: int = DEFAULT_TIMEOUT,
+                       flights: SingleFlight = SIMULATIONS,
+                       **kwargs: Any) -> Tuple[bool, str, Optional['pd.DataFrame'], Dict[str, Any], Optional[str]]:
+    """
+    simulate() with concurrent identical requests sharing one run
+
+    Callers that join an in-flight run get the same DataFrame and
+    metadata objects, so results must be treated as read-only. Each caller
+    gets its own RAW path (a hard link, or a copy, of the shared file) and
+    deletes it independently. Only the caller that started the run
+    receives progress callbacks.
+
+    Returns:
+        Same tuple as simulate()
+    """
+    key = simulation_key(netlist, **kwargs)
+    result, shared = flights.do(key, lambda: simulate(netlist, timeout, **kwargs))
+    if not shared:
+        return result
+    success, log_content, df, metadata, raw_path = result
+    return (success, log_content + "\n\nShared result of an identical simulation already running",
+            df, metadata, _own_copy(raw_path) if raw_path else None)
@@ -0,0 +1,275 @@
+"""
+Spectrum analysis of transient results
+Resamples non-uniform transient traces onto a uniform grid and computes
+windowed FFT amplitude/phase, PSD and harmonic tables for all traces at once
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Sequence, Tuple, TYPE_CHECKING
+
+import numpy as np
+
+from core.compare import resample_columns
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Upper bound on FFT length (can be overridden by environment variable)
+MAX_FFT_POINTS = int(os.environ.get('OPENSPICE_MAX_FFT_POINTS', str(2 ** 20)))
+
+# Bytes of spectra kept by the process-wide cache (can be overridden by environment variable)
+SPECTRUM_CACHE_BYTES = int(float(os.environ.get('OPENSPICE_SPECTRUM_CACHE_MB', '64')) * 1024 * 1024)
+
+# Flat-top window coefficients (SRS SR785 / HFT-style five-term window)
+_FLATTOP = (0.21557895, 0.41663158, 0.277263158, 0.083578947, 0.006947368)
+
+DEFAULT_HARMONICS = 9
+
+
+def window_function(name: str, n: int) -> np.ndarray:
+    """Window of length n: 'rectangular', 'hann', 'hamming', 'blackman' or 'flattop'"""
+    name = name.lower()
+    if name in ('rectangular', 'rect', 'none'):
+        return np.ones(n)
+    if name in ('hann', 'hanning'):
+        return np.hanning(n)
+    if name == 'hamming':
+        return np.hamming(n)
+    if name == 'blackman':
+        return np.blackman(n)
+    if name == 'flattop':
+        k = np.arange(n) * 2 * np.pi / max(n - 1, 1)
+        return sum((-1) ** i * a * np.cos(i * k) for i, a in enumerate(_FLATTOP))
+    raise ValueError(f"Unknown window: {name}")
+
+
+WINDOWS = ('hann', 'rectangular', 'hamming', 'blackman', 'flattop')
+
+
+def _real_column(values: np.ndarray) -> np.ndarray:
+    values = np.asarray(values)
+    if values.dtype == object or np.iscomplexobj(values):
+        return np.real(values.astype(complex))
+    return values.astype(float, copy=False)
+
+
+def uniform_grid(x: np.ndarray, points: Optional[int] = None,
+                 x_start: Optional[float] = None, x_stop: Optional[float] = None) -> np.ndarray:
+    """
+    Uniform time grid over [x_start, x_stop]
+
+    By default the grid has as many points as the source has in that span,
+    rounded up to a power of two and capped at MAX_FFT_POINTS.
+    """
+    x = np.asarray(x, dtype=float)
+    lo = x[0] if x_start is None else max(x_start, x[0])
+    hi = x[-1] if x_stop is None else min(x_stop, x[-1])
+    if not hi > lo:
+        raise ValueError("Empty time span for spectrum")
+    if points is None:
+        in_span = int(np.searchsorted(x, hi, side='right') - np.searchsorted(x, lo, side='left'))
+        points = 1 << max(in_span - 1, 1).bit_length()
+    points = int(min(max(points, 8), MAX_FFT_POINTS))
+    # Periodic grid: the stop point is one sample past the last one
+    return lo + (hi - lo) * np.arange(points) / points
+
+
+def compute_spectrum(df: 'pd.DataFrame', columns: Optional[Sequence[str]] = None,
+                     window: str = 'hann', points: Optional[int] = None,
+                     x_start: Optional[float] = None, x_stop: Optional[float] = None,
+                     remove_dc: bool = False) -> Dict[str, Any]:
+    """
+    Single-sided spectrum of transient traces
+
+    All traces are resampled onto one uniform grid (a single vectorized
+    interpolation) and transformed with one FFT call along the time axis.
+
+    Args:
+        df: Transient DataFrame indexed by time
+        columns: Traces to analyze (default: all)
+        window: Window name (see WINDOWS)
+        points: FFT length (default: source points, rounded to a power of two)
+        x_start, x_stop: Time span to analyze, e.g. to skip start-up transients
+        remove_dc: Subtract each trace's mean before windowing
+
+    Returns:
+        {'frequency' (F), 'amplitude' (F x K, peak amplitude corrected for
+        the window's coherent gain), 'phase' (F x K, degrees), 'psd'
+        (F x K, units^2/Hz), 'columns', 'fs', 'points', 'window'}
+    """
+    columns = list(df.columns) if columns is None else [c for c in columns if c in df.columns]
+    if not columns:
+        raise ValueError("No traces to analyze")
+    x = np.real(np.asarray(df.index.values)).astype(float)
+    grid = uniform_grid(x, points, x_start, x_stop)
+    n = len(grid)
+    fs = 1.0 / (grid[1] - grid[0])
+
+    values = np.column_stack([_real_column(df[c].to_numpy()) for c in columns])
+    samples = resample_columns(x, values, grid)
+    if remove_dc:
+        samples = samples - samples.mean(axis=0)
+
+    w = window_function(window, n)
+    spectrum = np.fft.rfft(samples * w[:, None], axis=0)
+    frequency = np.fft.rfftfreq(n, d=1.0 / fs)
+
+    # One-sided scaling: double every bin except DC (and Nyquist for even n)
+    one_sided = np.full(len(frequency), 2.0)
+    one_sided[0] = 1.0
+    if n % 2 == 0:
+        one_sided[-1] = 1.0
+    magnitude = np.abs(spectrum)
+    amplitude = magnitude * one_sided[:, None] / w.sum()
+    psd = magnitude ** 2 * one_sided[:, None] / (fs * np.sum(w ** 2))
+
+    return {
+        'frequency': frequency,
+        'amplitude': amplitude,
+        'phase': np.degrees(np.angle(spectrum)),
+        'psd': psd,
+        'columns': columns,
+        'fs': fs,
+        'points': n,
+        'window': window,
+    }
+
+
+def amplitude_frame(spectrum: Dict[str, Any], db: bool = False, include_dc: bool = False) -> 'pd.DataFrame':
+    """Amplitude spectrum as a DataFrame indexed by frequency (optionally in dBV)"""
+    import pandas as pd
+
+    start = 0 if include_dc else 1
+    amplitude = spectrum['amplitude'][start:]
+    if db:
+        amplitude = 20 * np.log10(np.maximum(amplitude, 1e-15))
+    return pd.DataFrame(amplitude, columns=spectrum['columns'],
+                        index=pd.Index(spectrum['frequency'][start:], name='frequency'))
+
+
+def _peak_bin(amplitude: np.ndarray, center: int, radius: int = 2) -> int:
+    lo, hi = max(center - radius, 0), min(center + radius + 1, len(amplitude))
+    return lo + int(np.argmax(amplitude[lo:hi])) if hi > lo else min(center, len(amplitude) - 1)
+
+
+def harmonic_table(spectrum: Dict[str, Any], fundamental: Optional[float] = None,
+                   harmonics: int = DEFAULT_HARMONICS) -> Tuple['pd.DataFrame', Dict[str, float]]:
+    """
+    Harmonic amplitudes and THD of each analyzed trace
+
+    Args:
+        spectrum: Result of compute_spectrum
+        fundamental: Fundamental frequency (default: largest non-DC peak of
+            each trace)
+        harmonics: Highest harmonic number to report
+
+    Returns:
+        (DataFrame with one row per trace and harmonic: 'trace',
+        'harmonic', 'frequency', 'amplitude', 'phase', 'dbc'),
+        {trace: THD in percent}
+    """
+    import pandas as pd
+
+    frequency = spectrum['frequency']
+    df_bin = frequency[1] - frequency[0]
+    rows: List[Dict[str, Any]] = []
+    thd: Dict[str, float] = {}
+
+    for k, name in enumerate(spectrum['columns']):
+        amplitude = spectrum['amplitude'][:, k]
+        if fundamental is None:
+            f0_bin = 1 + int(np.argmax(amplitude[1:])) if len(amplitude) > 1 else 0
+        else:
+            f0_bin = _peak_bin(amplitude, int(round(fundamental / df_bin)))
+        if f0_bin == 0:
+            continue
+
+        fundamental_amplitude = amplitude[f0_bin]
+        distortion = 0.0
+        for h in range(1, harmonics + 1):
+            center = h * f0_bin
+            if center >= len(amplitude):
+                break
+            b = f0_bin if h == 1 else _peak_bin(amplitude, center)
+            a = float(amplitude[b])
+            if h > 1:
+                distortion += a ** 2
+            rows.append({
+                'trace': name,
+                'harmonic': h,
+                'frequency': float(frequency[b]),
+                'amplitude': a,
+                'phase': float(spectrum['phase'][b, k]),
+                'dbc': 20 * np.log10(a / fundamental_amplitude) if a > 0 and fundamental_amplitude > 0 else -np.inf,
+            })
+        thd[name] = 100.0 * np.sqrt(distortion) / fundamental_amplitude if fundamental_amplitude > 0 else np.nan
+
+    table = pd.DataFrame(rows, columns=['trace', 'harmonic', 'frequency', 'amplitude', 'phase', 'dbc'])
+    return table, thd
+
+
+def data_key(df: 'pd.DataFrame', columns: Sequence[str]) -> str:
+    """Content hash of the x-axis and the given columns"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(np.ascontiguousarray(np.asarray(df.index.values, dtype=float)).tobytes())
+    for name in columns:
+        digest.update(str(name).encode('utf-8') + b'\0')
+        digest.update(np.ascontiguousarray(np.asarray(df[name].to_numpy())).tobytes())
+    return digest.hexdigest()
+
+
+def spectrum_nbytes(spectrum: Dict[str, Any]) -> int:
+    """Memory held by the arrays of a compute_spectrum result"""
+    return sum(value.nbytes for value in spectrum.values() if isinstance(value, np.ndarray))
+
+
+class SpectrumCache:
+    """
+    LRU cache of spectra keyed by trace data and analysis settings
+
+    Bounded by entry count and by the total bytes of the cached arrays;
+    a spectrum larger than max_bytes on its own is returned uncached.
+    """
+
+    def __init__(self, max_entries: int = 64, max_bytes: int = SPECTRUM_CACHE_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: 'OrderedDict[Tuple, Dict[str, Any]]' = OrderedDict()
+        self._sizes: Dict[Tuple, int] = {}
+        self._lock = threading.Lock()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def spectrum(self, df: 'pd.DataFrame', columns: Optional[Sequence[str]] = None, **kwargs: Any) -> Dict[str, Any]:
+        """compute_spectrum with memoization"""
+        columns = list(df.columns) if columns is None else [c for c in columns if c in df.columns]
+        key = (data_key(df, columns), tuple(sorted(kwargs.items())))
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+        result = compute_spectrum(df, columns, **kwargs)
+        size = spectrum_nbytes(result)
+        with self._lock:
+            self.misses += 1
+            if size > self.max_bytes or key in self._entries:
+                return result
+            self._entries[key] = result
+            self._sizes[key] = size
+            self.nbytes += size
+            while len(self._entries) > self.max_entries or self.nbytes > self.max_bytes:
+                old, _ = self._entries.popitem(last=False)
+                self.nbytes -= self._sizes.pop(old)
+        return result
+
+
+# Process-wide cache shared by the app
+SPECTRUM_CACHE = SpectrumCache()
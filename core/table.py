@@ -0,0 +1,99 @@
+"""
+Row-windowed access to result tables
+Serves one page of rows (and a subset of columns) at a time, with
+binary-search lookup of the row for an x value
+"""
+
+import math
+from typing import Dict, Any, Optional, Sequence, TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    import pandas as pd
+    from core.archive import ArchivedResult
+
+DEFAULT_PAGE_SIZE = 100
+
+
+class ResultTable:
+    """
+    Paged view over a result's rows
+
+    Works on in-memory columns or on an archived result's memory-mapped
+    columns; only the rows of the requested window are materialized.
+    """
+
+    def __init__(self, x: Optional[np.ndarray], columns: Dict[str, np.ndarray], x_name: Optional[str] = None):
+        self.x = None if x is None else np.asarray(x)
+        self.x_name = x_name
+        self.columns = columns
+        self._rows = len(self.x) if self.x is not None else (len(next(iter(columns.values()))) if columns else 0)
+
+    @classmethod
+    def from_dataframe(cls, df: 'pd.DataFrame') -> 'ResultTable':
+        x = None
+        if df.index.name is not None:
+            x = np.real(np.asarray(df.index.values)).astype(float)
+        return cls(x, {str(c): df[c].to_numpy() for c in df.columns}, df.index.name)
+
+    @classmethod
+    def from_archive(cls, result: 'ArchivedResult') -> 'ResultTable':
+        x = result.x() if result.meta['x_name'] is not None else None
+        return cls(x, {name: result.column(name) for name in result.columns}, result.meta['x_name'])
+
+    def __len__(self) -> int:
+        return self._rows
+
+    def page_count(self, page_size: int = DEFAULT_PAGE_SIZE) -> int:
+        return max(math.ceil(len(self) / page_size), 1)
+
+    def window(self, start: int, count: int = DEFAULT_PAGE_SIZE,
+               columns: Optional[Sequence[str]] = None) -> 'pd.DataFrame':
+        """Rows [start, start + count) of the selected columns"""
+        import pandas as pd
+
+        start = min(max(int(start), 0), len(self))
+        rows = slice(start, min(start + max(int(count), 0), len(self)))
+        names = list(self.columns) if columns is None else [c for c in columns if c in self.columns]
+        data = {name: np.array(self.columns[name][rows]) for name in names}
+        if self.x is None:
+            return pd.DataFrame(data, index=pd.RangeIndex(rows.start, rows.stop), columns=names)
+        return pd.DataFrame(data, index=pd.Index(np.array(self.x[rows]), name=self.x_name), columns=names)
+
+    def page(self, number: int, page_size: int = DEFAULT_PAGE_SIZE,
+             columns: Optional[Sequence[str]] = None) -> 'pd.DataFrame':
+        """Zero-based page of rows"""
+        return self.window(number * page_size, page_size, columns)
+
+    def locate(self, x_value: float) -> int:
+        """
+        Row whose x is closest to x_value (binary search on the sorted x)
+
+        Results without an x-axis are located by row number.
+        """
+        if len(self) == 0:
+            return 0
+        if self.x is None:
+            return min(max(int(x_value), 0), len(self) - 1)
+        i = int(np.searchsorted(self.x, x_value, side='left'))
+        if i >= len(self.x):
+            return len(self.x) - 1
+        if i > 0 and abs(float(self.x[i - 1]) - x_value) <= abs(float(self.x[i]) - x_value):
+            return i - 1
+        return i
+
+    def page_of(self, x_value: float, page_size: int = DEFAULT_PAGE_SIZE) -> int:
+        """Page containing the row closest to x_value"""
+        return self.locate(x_value) // page_size
+
+    def describe_window(self, number: int, page_size: int = DEFAULT_PAGE_SIZE) -> Dict[str, Any]:
+        """Row range and x range shown on a page"""
+        start = min(number * page_size, len(self))
+        stop = min(start + page_size, len(self))
+        info: Dict[str, Any] = {'start': start, 'stop': stop, 'rows': len(self)}
+        if self.x is not None and stop > start:
+            info['x_first'] = float(self.x[start])
+            info['x_last'] = float(self.x[stop - 1])
+        return info
+
@@ -2,70 +2,31 @@
 Utility functions for file I/O, CSV export, and formatting
 """
 
-import pandas as pd
-from typing import Dict, Any, Optional
+import re
+from typing import Dict, Any, TYPE_CHECKING
 import io
 
-def dataframe_to_csv(df: pd.DataFrame) -> str:
-    """Convert DataFrame to CSV string"""
-    output = io.StringIO()
-    df.to_csv(output)
-    return output.getvalue()
+if TYPE_CHECKING:
+    import pandas as pd
 
-def format_unit(variable_name: str, metadata: Dict[str, Any]) -> str:
-    """Format variable name with unit"""
-    for var_info in metadata.get('variables', []):
-        if var_info['name'] == variable_name:
-            unit = var_info.get('unit', '')
-            if unit:
-                return f"{variable_name} ({unit})"
-            elif variable_name.lower() == 'time':
-                return "Time (s)"
-            elif variable_name.lower() == 'frequency':
-                return "Frequency (Hz)"
-    return variable_name
+SPICE_SUFFIXES = {
+    'T': 1e12,
+    'G': 1e9,
+    'MEG': 1e6,
+    'K': 1e3,
+    'MIL': 25.4e-6,
+    'M': 1e-3,
+    'U': 1e-6,
+    'N': 1e-9,
+    'P': 1e-12,
+    'F': 1e-15
+}
 
-def format_value(value: float, precision: int = 4) -> str:
-    """Format numeric value with appropriate precision"""
-    if abs(value) < 1e-3 or abs(value) > 1e6:
-        return f"{value:.{precision}e}"
-    else:
-        return f"{value:.{precision}f}"
-
-def parse_spice_value(value_str: str) -> float:
-    """Parse SPICE-format value (with suffixes like k, m, u, n, p)"""
-    value_str = value_str.strip().upper()
-    
-
-    suffixes = {
-        'T': 1e12,
-        'G': 1e9,
-        'MEG': 1e6,
-        'K': 1e3,
-        'M': 1e-3,
-        'U': 1e-6,
-        'N': 1e-9,
-        'P': 1e-12,
-        'F': 1e-15
-    }
-    
-    for suffix, multiplier in suffixes.items():
-        if value_str.endswith(suffix):
-            num_part = value_str[:-len(suffix)]
-            try:
-                return float(num_part) * multiplier
-            except ValueError:
-                pass
-    
+_SPICE_VALUE_RE = re.compile(
+    r'^([+-]?(?:\d+\.?\d*|\.\d+)(?:E[+-]?\d+)?)(MEG|MIL|[TGKMUNPF])?[A-Z]*$'
+)
 
-    try:
-        return float(value_str)
-    except ValueError:
-        raise ValueError(f"Cannot parse SPICE value: {value_str}")
-from typing import Dict, Any, Optional
-import io
-
-def dataframe_to_csv(df: pd.DataFrame) -> str:
+def dataframe_to_csv(df: 'pd.DataFrame') -> str:
     """Convert DataFrame to CSV string"""
     output = io.StringIO()
     df.to_csv(output)
@@ -92,32 +53,17 @@ def format_value(value: float, precision: int = 4) -> str:
         return f"{value:.{precision}f}"
 
 def parse_spice_value(value_str: str) -> float:
-    """Parse SPICE-format value (with suffixes like k, m, u, n, p)"""
-    value_str = value_str.strip().upper()
-    
+    """Parse SPICE-format value (with suffixes like k, m, u, n, p)
 
-    suffixes = {
-        'T': 1e12,
-        'G': 1e9,
-        'MEG': 1e6,
-        'K': 1e3,
-        'M': 1e-3,
-        'U': 1e-6,
-        'N': 1e-9,
-        'P': 1e-12,
-        'F': 1e-15
-    }
+    Trailing unit letters after the scale factor are ignored, as in SPICE
+    itself: '10us' is 1e-5 and '1kOhm' is 1e3.
+    """
+    value_str = value_str.strip().upper()
     
-    for suffix, multiplier in suffixes.items():
-        if value_str.endswith(suffix):
-            num_part = value_str[:-len(suffix)]
-            try:
-                return float(num_part) * multiplier
-            except ValueError:
-                pass
+    match = _SPICE_VALUE_RE.match(value_str)
+    if not match:
+        raise ValueError(f"Cannot parse SPICE value: {value_str}")
     
-
-    try:
-        return float(value_str)
-    except ValueError:
-        raise ValueError(f"Cannot parse SPICE value: {value_str}")
\ No newline at end of file
+    number, suffix = match.group(1), match.group(2)
+    multiplier = SPICE_SUFFIXES.get(suffix, 1.0) if suffix else 1.0
+    return float(number) * multiplier
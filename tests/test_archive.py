@@ -0,0 +1,111 @@
+"""Tests for the on-disk result archive"""
+
+import sys
+import os
+import tempfile
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.archive import ResultArchive
+
+def make_result():
+    time = np.linspace(0, 1e-3, 101)
+    df = pd.DataFrame(
+        {'v(in)': np.sin(time * 1e4), 'v(out)': np.cos(time * 1e4)},
+        index=pd.Index(time, name='time')
+    )
+    metadata = {'title': 'Test', 'plotname': 'Transient Analysis', 'variables': []}
+    return df, metadata
+
+def test_save_and_load_window():
+    """Test round trip and windowed column access"""
+    df, metadata = make_result()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        archive = ResultArchive(tmpdir)
+        run_id = archive.save(df, metadata, tags=['nightly'], key='abc')
+        
+        loaded, loaded_meta = archive.load(run_id)
+        assert loaded_meta == metadata
+        assert loaded.index.name == 'time'
+        assert np.allclose(loaded.values, df.values)
+        
+        window, _ = archive.load(run_id, columns=['v(out)'], x_min=1.99e-4, x_max=3.01e-4)
+        assert list(window.columns) == ['v(out)']
+        assert window.index.min() >= 1.99e-4
+        assert window.index.max() <= 3.01e-4
+        assert len(window) == 11
+        
+        result = archive.open(run_id)
+        assert isinstance(result.column('v(in)'), np.memmap)
+
+def test_complex_columns():
+    """Test archiving of AC results with complex values"""
+    freq = np.logspace(1, 3, 5)
+    df = pd.DataFrame({'v(out)': pd.Series([1 + 1j, 0.5, 0.1 - 0.2j, 0.05, 0.01j], dtype=object)})
+    df.index = pd.Index(freq, name='frequency')
+    with tempfile.TemporaryDirectory() as tmpdir:
+        archive = ResultArchive(tmpdir)
+        loaded, _ = archive.load(archive.save(df, {'plotname': 'AC Analysis'}))
+        
+        assert np.iscomplexobj(loaded['v(out)'].values)
+        assert loaded['v(out)'].iloc[2] == 0.1 - 0.2j
+
+def test_catalog_queries():
+    """Test listing, lookup by key and deletion"""
+    df, metadata = make_result()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        archive = ResultArchive(tmpdir)
+        first = archive.save(df, metadata, tags=['nightly'], key='k1')
+        second = archive.save(df, dict(metadata, plotname='AC Analysis'), key='k2')
+        
+        assert len(archive.list_runs()) == 2
+        assert [r['run_id'] for r in archive.list_runs(tag='nightly')] == [first]
+        assert [r['run_id'] for r in archive.list_runs(plotname='AC Analysis')] == [second]
+        assert archive.find('k2') == second
+        assert archive.find('missing') is None
+        
+        archive.delete(first)
+        assert [r['run_id'] for r in ResultArchive(tmpdir).list_runs()] == [second]
+        assert archive.find('k1') is None
+
+def save_many(root, count):
+    """Archive count results from one process"""
+    df, metadata = make_result()
+    archive = ResultArchive(root)
+    return [archive.save(df, metadata, key=str(i)) for i in range(count)]
+
+def test_catalog_damage_and_concurrent_appends():
+    """Test that partial catalog lines are skipped and that processes can append concurrently"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        with ProcessPoolExecutor(max_workers=4) as pool:
+            saved = [run for runs in pool.map(save_many, [tmpdir] * 4, [25] * 4) for run in runs]
+        archive = ResultArchive(tmpdir)
+        assert len(archive.list_runs()) == 100
+        assert {r['run_id'] for r in archive.list_runs()} == set(saved)
+
+        # A killed writer leaves a partial line; the next record lands on the same line
+        with open(archive.catalog_path, 'a') as f:
+            f.write('{"run_id": "20240101-000000-dead", "created": 1')
+        df, metadata = make_result()
+        recovered = archive.save(df, metadata, key='after-crash')
+        with open(archive.catalog_path, 'a') as f:
+            f.write('not json\n')
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            reopened = ResultArchive(tmpdir)
+            runs = reopened.list_runs()
+        assert len(runs) == 101
+        assert reopened.find('after-crash') == recovered
+        assert any('unreadable' in str(w.message) for w in caught)
+
+if __name__ == "__main__":
+    test_save_and_load_window()
+    test_complex_columns()
+    test_catalog_queries()
+    test_catalog_damage_and_concurrent_appends()
+    print("All archive tests passed!")
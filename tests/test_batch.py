@@ -0,0 +1,91 @@
+"""Tests for batched parametric evaluation"""
+
+import sys
+import os
+import numpy as np
+
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.batch import evaluate_parametric_batch, build_alter_script, variant_netlists
+from core.mna import solve_linear_ac
+from core.netlist_examples import generate_parametric_netlist
+from core.runner import check_ngspice_installed
+from core.sanitizer import sanitize_netlist
+
+import pytest
+
+def test_batched_mna_matches_single_solves():
+    """Test that the batched solve equals per-variant solves"""
+    values = {'R': [100, 1000, 4700], 'C': [1e-6, 1e-7, 2.2e-9]}
+    result = evaluate_parametric_batch("rc_highpass", values)
+    
+    assert result['engine'] == 'mna'
+    assert result['param_names'] == ['R', 'C']
+    assert result['data'].shape == (3, 351, 3)
+    
+    for i, (r, c) in enumerate(zip(values['R'], values['C'])):
+        df, _ = solve_linear_ac(generate_parametric_netlist("rc_highpass", R=r, C=c))
+        assert np.allclose(result['data'][i], df.values)
+        assert result['variables'] == list(df.columns)
+
+def test_monte_carlo_matrix():
+    """Test an array parameter matrix with base parameters"""
+    rng = np.random.default_rng(0)
+    matrix = np.column_stack([50 * rng.uniform(0.9, 1.1, 200), 1e-6 * rng.uniform(0.9, 1.1, 200)])
+    result = evaluate_parametric_batch("rlc_filter", matrix, param_names=['R', 'C'], base_params={'L': 2e-3})
+    
+    assert result['data'].shape[0] == 200
+    # Series current peaks exactly at resonance
+    out = result['variables'].index('i(l1)')
+    peaks = result['x'][np.argmax(np.abs(result['data'][:, :, out]), axis=1)]
+    f0 = 1 / (2 * np.pi * np.sqrt(2e-3 * matrix[:, 1]))
+    assert np.all(np.abs(peaks - f0) / f0 < 0.05)
+
+def test_build_alter_script():
+    """Test the single-run alter control loop"""
+    netlists = variant_netlists("rc_highpass", ['R'], np.array([[1000.0], [2000.0], [1000.0]]))
+    script = build_alter_script(netlists)
+    lines = script.split('\n')
+    
+    assert lines.count('run') == 3
+    assert lines.count('write output.raw') == 3
+    assert 'set appendwrite' in lines
+    assert lines.index('alter r1 = 2000.0') < lines.index('alter r1 = 1000.0')
+    assert lines[-1] == '.end'
+    
+    # Changing analyses cannot be expressed with alter
+    tran_variants = variant_netlists("rc_lowpass", ['freq'], np.array([[1000.0], [50.0]]))
+    assert build_alter_script(tran_variants) is None
+
+def test_alter_script_keeps_control_commands():
+    """Test that the alter loop keeps user control commands and the saved vector selection"""
+    base = ("* RC\nV1 in 0 AC 1\nR1 in out 1k\nC1 out 0 1u\n.ac dec 10 10 100k\n"
+            ".control\noption reltol=1e-4\nrun\nmeas ac vpeak max vm(out)\n.endc\n.end")
+    netlists = [sanitize_netlist(base.replace('1k', r), save_vectors=['v(out)']) for r in ('1k', '2k', '3k')]
+    lines = build_alter_script(netlists).split('\n')
+
+    assert lines.count('option reltol=1e-4') == 1
+    assert lines.count('meas ac vpeak max vm(out)') == 3
+    assert lines.count('write output.raw v(out)') == 3 and 'write output.raw' not in lines
+    assert '.save v(out)' in lines and lines.count('quit') == 1
+    assert lines.index('option reltol=1e-4') < lines.index('set appendwrite') < lines.index('run')
+    assert lines.index('alter r1 = 2k') < lines.index('alter r1 = 3k')
+
+@pytest.mark.skipif(not check_ngspice_installed(), reason="ngspice not installed")
+def test_ngspice_alter_batch():
+    """Test one ngspice run stepping through transient variants"""
+    result = evaluate_parametric_batch("rc_lowpass", {'R': [1000, 2000]}, fast_path=False)
+    
+    assert result['engine'] == 'ngspice-alter'
+    assert result['data'].shape[0] == 2
+    assert result['x_name'] == 'time'
+
+if __name__ == "__main__":
+    test_batched_mna_matches_single_solves()
+    test_monte_carlo_matrix()
+    test_build_alter_script()
+    test_alter_script_keeps_control_commands()
+    if check_ngspice_installed():
+        test_ngspice_alter_batch()
+    print("All batch tests passed!")
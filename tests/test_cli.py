@@ -0,0 +1,129 @@
+"""Tests for the command-line batch runner and measurement extraction"""
+
+import sys
+import os
+import json
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.cli import collect_inputs, run_batch, main, SUMMARY_FILE
+from core.archive import ResultArchive
+from core.sanitizer import sanitize_netlist
+from core.singleflight import simulation_key
+from core.measurements import measurement_names, parse_measurements, trace_statistics
+
+RC_TEMPLATE = """* RC {r}
+V1 in 0 AC 1
+R1 in out {r}
+C1 out 0 1u
+.ac dec 10 10 100k
+.end
+"""
+
+SAMPLE_LOG = """
+Doing analysis at TEMP = 27.000000 and TNOM = 27.000000
+
+tdelay              =  1.234560e-06 targ=  2.23456e-06 trig=  1.00000e-06
+vmax                =  4.990000e+00 at=  5.000000e-03
+Error: measure  rise_t  (TRIG) : out of interval
+
+No. of Data Rows : 1001
+"""
+
+def make_netlists(root):
+    for i, r in enumerate(['1k', '2k', '5k']):
+        Path(root, 'set', f'rc{i}.cir').write_text(RC_TEMPLATE.format(r=r))
+    Path(root, 'set', 'notes.md').write_text('not a netlist')
+
+def test_measurements():
+    """Test .meas extraction from the log and per-trace statistics"""
+    netlist = ("* meas\nV1 in 0 PULSE(0 5 1u 1n 1n 1m 2m)\n.tran 1u 5m\n"
+               ".meas tran tdelay TRIG v(in) VAL=2.5 RISE=1 TARG v(out) VAL=2.5 RISE=1\n"
+               ".measure tran vmax MAX v(out)\n.meas tran rise_t TRIG v(out) VAL=0.5 RISE=1 TARG v(out) VAL=4.5 RISE=1\n.end")
+    names = measurement_names(netlist)
+    assert names == ['tdelay', 'vmax', 'rise_t']
+
+    measured = parse_measurements(SAMPLE_LOG, names)
+    assert measured == {'tdelay': 1.23456e-06, 'vmax': 4.99, 'rise_t': None}
+    assert parse_measurements(SAMPLE_LOG)['vmax'] == 4.99
+
+    df = pd.DataFrame({'v(out)': [1 + 1j, 0.5j, 0.1], 'v(in)': [0.0, 1.0, 2.0]},
+                      index=pd.Index([1.0, 10.0, 100.0], name='frequency'))
+    stats = trace_statistics(df)
+    assert np.isclose(stats['v(out)']['max'], np.sqrt(2))
+    assert stats['v(in)'] == {'min': 0.0, 'max': 2.0, 'mean': 1.0, 'final': 2.0}
+
+def test_collect_inputs():
+    """Test directory, glob and manifest expansion"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        os.mkdir(os.path.join(tmpdir, 'set'))
+        make_netlists(tmpdir)
+        manifest = Path(tmpdir, 'jobs.txt')
+        manifest.write_text("# overnight set\nset/rc0.cir\nset/rc2.cir\n")
+
+        assert [p.name for p in collect_inputs([os.path.join(tmpdir, 'set')])] == ['rc0.cir', 'rc1.cir', 'rc2.cir']
+        assert [p.name for p in collect_inputs([str(manifest)])] == ['rc0.cir', 'rc2.cir']
+        # Overlapping inputs are de-duplicated
+        assert len(collect_inputs([os.path.join(tmpdir, 'set', '*.cir'), str(manifest)])) == 3
+
+def test_run_batch_and_resume():
+    """Test a parallel batch run, the summary report and resume"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        os.mkdir(os.path.join(tmpdir, 'set'))
+        make_netlists(tmpdir)
+        out_dir = os.path.join(tmpdir, 'results')
+
+        summary = run_batch([os.path.join(tmpdir, 'set')], out_dir, workers=2, quiet=True)
+        assert (summary['total'], summary['ok'], summary['failed']) == (3, 3, 0)
+        with open(os.path.join(out_dir, SUMMARY_FILE)) as f:
+            assert json.load(f)['ok'] == 3
+
+        entry = summary['results'][0]
+        assert entry['input'].endswith('rc0.cir')
+        assert entry['points'] == 41
+        assert np.isclose(entry['measurements']['stats']['v(in)']['max'], 1.0)
+
+        df, _ = ResultArchive(out_dir).load(entry['run_id'], columns=['v(out)'])
+        assert len(df) == 41
+
+        # Second run only reuses archived results
+        assert main([os.path.join(tmpdir, 'set'), '--out', out_dir, '--quiet']) == 0
+        with open(os.path.join(out_dir, SUMMARY_FILE)) as f:
+            resumed = json.load(f)
+        assert resumed['cached'] == 3
+        assert resumed['results'][0]['run_id'] == entry['run_id']
+
+        # Changing the saved vectors changes the sanitized netlist
+        summary = run_batch([os.path.join(tmpdir, 'set', 'rc0.cir')], out_dir, save_vectors=['v(out)'], quiet=True)
+        assert summary['ok'] == 1
+
+def test_resume_matches_archived_keys():
+    """Test that resume matches every input against the archived run of its key"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        os.mkdir(os.path.join(tmpdir, 'set'))
+        make_netlists(tmpdir)
+        out_dir = os.path.join(tmpdir, 'results')
+        archive = ResultArchive(out_dir)
+        df = pd.DataFrame({'v(out)': [1.0, 0.5]}, index=pd.Index([10.0, 100.0], name='frequency'))
+        archive.save(df, {'plotname': 'AC Analysis'}, key='unrelated')
+        expected = {}
+        for path in collect_inputs([os.path.join(tmpdir, 'set')]):
+            key = simulation_key(sanitize_netlist(path.read_text()))
+            expected[str(path)] = archive.save(df, {'plotname': 'AC Analysis'}, key=key)
+
+        summary = run_batch([os.path.join(tmpdir, 'set')], out_dir, quiet=True)
+        assert summary['cached'] == 3
+        assert {e['input']: e['run_id'] for e in summary['results']} == expected
+
+if __name__ == "__main__":
+    test_measurements()
+    test_collect_inputs()
+    test_run_batch_and_resume()
+    test_resume_matches_archived_keys()
+    print("All CLI tests passed!")
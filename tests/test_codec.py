@@ -0,0 +1,137 @@
+"""Tests for the compressed waveform codec"""
+
+import sys
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.codec import write_waveforms, read_waveforms, WaveformFile, relative_tolerances
+from core.archive import ResultArchive
+from core.cli import main
+
+def make_transient(points=50000):
+    time = np.linspace(0, 1e-3, points)
+    df = pd.DataFrame(
+        {'v(out)': np.sin(2 * np.pi * 1e4 * time) * (1 - np.exp(-time / 1e-4)),
+         'i(v1)': 1e-3 * np.cos(2 * np.pi * 1e4 * time)},
+        index=pd.Index(time, name='time')
+    )
+    return df, {'title': 'Codec', 'plotname': 'Transient Analysis', 'variables': []}
+
+def make_ac(points=301):
+    frequency = np.logspace(1, 6, points)
+    response = 1 / (1 + 1j * frequency / 1e3)
+    df = pd.DataFrame({'v(out)': response}, index=pd.Index(frequency, name='frequency'))
+    return df, {'title': 'AC', 'plotname': 'AC Analysis', 'variables': []}
+
+def test_lossless_round_trip():
+    """Test that lossless storage restores every bit, for real and complex data"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for codec in ('zlib', 'lzma'):
+            for df, metadata in (make_transient(), make_ac()):
+                path = os.path.join(tmpdir, f'{codec}.wfz')
+                stats = write_waveforms(path, df, metadata, codec=codec, chunk_rows=4096)
+                loaded, loaded_meta = read_waveforms(path)
+                assert loaded_meta == metadata
+                assert loaded.index.name == df.index.name
+                assert np.array_equal(loaded.index.values, df.index.values)
+                assert np.array_equal(loaded.values, df.values)
+                assert stats['lossy_columns'] == []
+                assert stats['stored_bytes'] == os.path.getsize(path)
+
+def test_quantized_within_tolerance():
+    """Test that lossy columns stay within the tolerance and compress far better"""
+    df, metadata = make_transient()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        lossless = write_waveforms(os.path.join(tmpdir, 'a.wfz'), df, metadata)
+        path = os.path.join(tmpdir, 'b.wfz')
+        lossy = write_waveforms(path, df, metadata, tolerance={'v(out)': 1e-5})
+        assert lossy['lossy_columns'] == ['v(out)']
+        assert lossy['stored_bytes'] < lossless['stored_bytes'] * 0.75
+        loaded, _ = read_waveforms(path)
+        assert np.abs(loaded['v(out)'] - df['v(out)']).max() <= 1e-5
+        assert np.array_equal(loaded['i(v1)'], df['i(v1)'])
+        assert np.array_equal(loaded.index.values, df.index.values)
+
+        # Non-finite values cannot be quantized and stay lossless
+        df.iloc[10, 0] = np.nan
+        assert write_waveforms(path, df, metadata, tolerance=1e-3)['lossy_columns'] == ['i(v1)']
+        with pytest.raises(ValueError):
+            write_waveforms(path, df, metadata, codec='bz2')
+
+def test_window_reads_only_needed_chunks():
+    """Test windowed reads against a slice of the full result"""
+    df, metadata = make_transient()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, 'w.wfz')
+        write_waveforms(path, df, metadata, chunk_rows=1000)
+        waveforms = WaveformFile(path)
+        rows = waveforms.window_slice(2.5e-4, 2.6e-4)
+        expected = df[(df.index >= 2.5e-4) & (df.index <= 2.6e-4)]
+        assert rows.stop - rows.start == len(expected)
+
+        window = waveforms.to_dataframe(['i(v1)'], 2.5e-4, 2.6e-4)
+        assert list(window.columns) == ['i(v1)']
+        assert np.array_equal(window['i(v1)'].values, expected['i(v1)'].values)
+        assert np.array_equal(waveforms.column('v(out)', slice(999, 1001)), df['v(out)'].values[999:1001])
+        assert len(waveforms.to_dataframe(x_min=2.0, x_max=3.0)) == 0
+
+def test_archive_and_cli_codec():
+    """Test compressed archive runs and the batch CLI flags"""
+    df, metadata = make_transient(5000)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        archive = ResultArchive(tmpdir, codec='zlib', tolerance=1e-6)
+        run_id = archive.save(df, metadata)
+        result = archive.open(run_id)
+        assert result.columns == ['v(out)', 'i(v1)']
+        assert len(result) == 5000
+        assert np.abs(result.column('i(v1)') - df['i(v1)'].values).max() <= 1e-6
+        window, _ = archive.load(run_id, columns=['v(out)'], x_min=1e-4, x_max=2e-4)
+        assert len(window) == len(df[(df.index >= 1e-4) & (df.index <= 2e-4)])
+        assert archive.list_runs()[0]['codec'] == 'zlib'
+        assert result.window_slice(1e-4, 2e-4).start == df.index.searchsorted(1e-4)
+
+        netlist_dir = os.path.join(tmpdir, 'netlists')
+        os.makedirs(netlist_dir)
+        with open(os.path.join(netlist_dir, 'rc.cir'), 'w') as f:
+            f.write("* RC\nV1 in 0 AC 1\nR1 in out 1k\nC1 out 0 1u\n.ac dec 10 10 100k\n.end\n")
+        out_dir = os.path.join(tmpdir, 'out')
+        assert main([netlist_dir, '-o', out_dir, '-q', '--compress', 'lzma']) == 0
+        assert ResultArchive(out_dir).list_runs()[0]['codec'] == 'lzma'
+        with pytest.raises(SystemExit):
+            main([netlist_dir, '-o', out_dir, '--tolerance', '1e-3'])
+
+def test_relative_tolerance_and_lazy_columns():
+    """Test that small currents survive a tolerance sized for voltages and that slices decode lazily"""
+    df, metadata = make_transient(20000)
+    df['i(v1)'] = df['i(v1)'] * 1.39e-3
+    assert relative_tolerances(df, 1e-4) == {'v(out)': 1e-4 * np.abs(df['v(out)']).max(),
+                                             'i(v1)': 1e-4 * np.abs(df['i(v1)']).max()}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        archive = ResultArchive(tmpdir, codec='zlib', tolerance=1e-4)
+        result = archive.open(archive.save(df, metadata))
+        for name in ('v(out)', 'i(v1)'):
+            peak = np.abs(df[name]).max()
+            decoded = np.asarray(result.column(name))
+            assert np.abs(decoded).max() > 0.99 * peak
+            assert np.abs(decoded - df[name].values).max() <= 1e-4 * peak
+
+        rows = slice(12345, 12400)
+        window = result.column('i(v1)')[rows]
+        assert len(window) == 55 and len(result.column('i(v1)')) == 20000
+        assert np.abs(window - df['i(v1)'].values[rows]).max() <= 1e-4 * np.abs(df['i(v1)']).max()
+        assert result._arrays == {}
+
+if __name__ == "__main__":
+    test_lossless_round_trip()
+    test_quantized_within_tolerance()
+    test_window_reads_only_needed_chunks()
+    test_archive_and_cli_codec()
+    test_relative_tolerance_and_lazy_columns()
+    print("All codec tests passed!")
@@ -0,0 +1,102 @@
+"""Tests for the result comparison engine"""
+
+import sys
+import os
+import numpy as np
+import pandas as pd
+
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.compare import resample_columns, compare_results, compare_batch, summarize_reports
+
+def make_tran(n_points, scale=1.0, offset=0.0):
+    time = np.linspace(0, 1e-3, n_points)
+    return pd.DataFrame(
+        {
+            'v(in)': np.sin(2 * np.pi * 1e3 * time),
+            'v(out)': scale * (1 - np.exp(-time / 1e-4)) + offset,
+        },
+        index=pd.Index(time, name='time')
+    )
+
+def test_resample_columns():
+    """Test vectorized interpolation of several columns at once"""
+    x_src = np.array([0.0, 1.0, 3.0])
+    values = np.array([[0.0, 10.0], [1.0, 20.0], [3.0, 40.0]])
+    out = resample_columns(x_src, values, np.array([-1.0, 0.5, 2.0, 5.0]))
+    
+    assert np.allclose(out[:, 0], [0.0, 0.5, 2.0, 3.0])
+    assert np.allclose(out[:, 1], [10.0, 15.0, 30.0, 40.0])
+    
+    complex_values = np.array([1 + 1j, 3 - 1j, 5 + 0j])
+    out = resample_columns(x_src, complex_values, np.array([0.5]))
+    assert np.allclose(out[0, 0], 2 + 0j)
+
+def test_compare_mismatched_time_bases():
+    """Test comparison of results with different time steps"""
+    reference = make_tran(1001)
+    test = make_tran(733)
+    
+    report = compare_results(reference, test, rtol=1e-2, atol=1e-3)
+    assert report['passed']
+    assert report['points'] == 1001
+    assert report['traces']['v(out)']['max_abs'] < 1e-3
+    
+    shifted = make_tran(733, offset=0.05)
+    report = compare_results(reference, shifted, rtol=1e-2, atol=1e-3)
+    assert not report['passed']
+    assert report['traces']['v(in)']['passed']
+    assert not report['traces']['v(out)']['passed']
+    assert abs(report['traces']['v(out)']['max_abs'] - 0.05) < 1e-9
+
+def test_compare_ac_and_missing():
+    """Test complex AC traces, log-frequency alignment and missing traces"""
+    freq = np.logspace(1, 6, 251)
+    response = 1 / (1 + 1j * freq / 1e3)
+    reference = pd.DataFrame({'v(out)': response, 'v(in)': np.ones(251)}, index=pd.Index(freq, name='frequency'))
+    coarse_freq = np.logspace(1, 6, 501)
+    test = pd.DataFrame({'v(out)': 1 / (1 + 1j * coarse_freq / 1e3)}, index=pd.Index(coarse_freq, name='frequency'))
+    
+    report = compare_results(reference, test, rtol=1e-2)
+    assert report['traces']['v(out)']['passed']
+    assert report['missing'] == ['v(in)']
+    assert not report['passed']
+
+def test_truncated_run_fails():
+    """Test that a test result ending early fails even where it matches"""
+    reference = make_tran(1001)
+    report = compare_results(reference, reference.iloc[:100], rtol=1e-2, atol=1e-3)
+    assert report['traces']['v(out)']['passed']
+    assert not report['covered'] and not report['passed']
+    assert abs(report['coverage'] - 0.099) < 1e-9
+
+    late_start = compare_results(reference, reference.iloc[500:], rtol=1e-2, atol=1e-3)
+    assert not late_start['passed'] and abs(late_start['coverage'] - 0.5) < 1e-9
+
+    # A coarser grid ending one of its own steps short still covers the range
+    coarse = make_tran(733)
+    report = compare_results(reference, coarse.iloc[:-1], rtol=1e-2, atol=1e-3)
+    assert report['covered'] and report['passed']
+    assert report['coverage'] > 0.99
+
+def test_compare_batch():
+    """Test batch comparison and report flattening"""
+    reference = make_tran(501)
+    pairs = [(reference, make_tran(400)), (reference, make_tran(400, scale=1.5))]
+    
+    reports = compare_batch(pairs, rtol=1e-2, atol=1e-3)
+    assert [r['passed'] for r in reports] == [True, False]
+    assert compare_batch(pairs, rtol=1e-2, atol=1e-3, workers=2) == reports
+    
+    table = summarize_reports(reports)
+    assert len(table) == 4
+    assert list(table[~table['passed']]['trace']) == ['v(out)']
+
+if __name__ == "__main__":
+    test_resample_columns()
+    test_compare_mismatched_time_bases()
+    test_compare_ac_and_missing()
+    test_truncated_run_fails()
+    test_compare_batch()
+    print("All comparison tests passed!")
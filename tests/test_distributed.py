@@ -0,0 +1,173 @@
+"""Tests for distributed simulation with local workers"""
+
+import sys
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+import pytest
+
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.distributed import SimulationWorker, Coordinator, encode_result, decode_result, is_loopback
+from core.cli import run_batch
+from core.mna import solve_linear_ac
+from core.runner import simulate
+from core.sanitizer import sanitize_netlist
+from core.singleflight import simulation_key
+
+RC_TEMPLATE = """* RC {r}
+V1 in 0 AC 1
+R1 in out {r}
+C1 out 0 1u
+.ac dec 10 10 100k
+.end
+"""
+
+def counting_runner(calls):
+    """simulate() that records which netlists it ran"""
+    lock = threading.Lock()
+
+    def run(netlist, timeout):
+        with lock:
+            calls.append(netlist)
+        return simulate(netlist, timeout)
+    return run
+
+def start_workers(count, **kwargs):
+    return [SimulationWorker('127.0.0.1', 0, **kwargs).start() for _ in range(count)]
+
+def test_result_encoding_round_trip():
+    """Test that complex AC results survive encoding unchanged"""
+    df, metadata = solve_linear_ac(RC_TEMPLATE.format(r='1k'))
+    decoded, decoded_meta = decode_result(encode_result(df, metadata))
+    assert decoded.index.name == df.index.name
+    assert list(decoded.columns) == list(df.columns)
+    assert np.array_equal(decoded.values, df.values)
+    assert decoded_meta == metadata
+
+def test_coordinator_spreads_and_caches():
+    """Test that jobs spread over workers and repeats hit the same worker's cache"""
+    calls = []
+    workers = start_workers(3, runner=counting_runner(calls), capacity=2)
+    netlists = [sanitize_netlist(RC_TEMPLATE.format(r=f'{r}k')) for r in range(1, 13)]
+    try:
+        with Coordinator([w.url for w in workers], heartbeat_interval=0.2) as coordinator:
+            assert coordinator.capacity() == 6
+            results = coordinator.map(netlists)
+            assert all(success for success, *_ in results)
+            for netlist, (_, log, df, _, raw_path) in zip(netlists, results):
+                reference, _ = solve_linear_ac(netlist)
+                assert np.allclose(df.values, reference.values)
+                assert raw_path is None
+                assert 'Ran on worker' in log
+            assert sum(1 for w in workers if w.stats['completed']) >= 2
+
+            # Same netlist again: routed to the worker that has it cached
+            again = coordinator.run(netlists[0])
+            assert 'cached result' in again[1]
+            assert len(calls) == len(netlists)
+    finally:
+        for worker in workers:
+            worker.stop()
+
+def test_worker_loss_and_rejection():
+    """Test retry on a lost worker and rejection of unauthenticated jobs"""
+    workers = start_workers(2, capacity=1)
+    netlist = sanitize_netlist(RC_TEMPLATE.format(r='3k'))
+    coordinator = Coordinator([w.url for w in workers], heartbeat_interval=60)
+    try:
+        # Stop whichever worker the job would go to first
+        preferred = coordinator._ranked(simulation_key(netlist), set())[0]
+        lost = next(w for w in workers if w.url == preferred)
+        lost.stop()
+        success, log, df, _, _ = coordinator.run(netlist)
+        assert success
+        assert coordinator.workers[lost.url]['alive'] is False
+        assert coordinator.workers[lost.url]['losses'] == 1
+
+        # Health checks notice the loss; with no workers left the job fails
+        next(w for w in workers if w is not lost).stop()
+        assert not any(coordinator.check_health().values())
+        with pytest.raises(RuntimeError):
+            coordinator.run(netlist)
+    finally:
+        coordinator.close()
+
+    guarded = SimulationWorker('127.0.0.1', 0, token='secret').start()
+    try:
+        with pytest.raises(RuntimeError, match='HTTP 403'):
+            Coordinator([guarded.url], token='wrong', retries=0).run(netlist)
+        assert Coordinator([guarded.url], token='secret').run(netlist)[0]
+    finally:
+        guarded.stop()
+
+def test_busy_worker_spills_to_next():
+    """Test that a job the top-ranked worker rejects as busy runs on the next-ranked worker"""
+    workers = start_workers(2, capacity=1)
+    netlist = sanitize_netlist(RC_TEMPLATE.format(r='7k'))
+    coordinator = Coordinator([w.url for w in workers], heartbeat_interval=60, queue_timeout=2)
+    preferred = coordinator._ranked(simulation_key(netlist), set())[0]
+    busy = next(w for w in workers if w.url == preferred)
+    other = next(w for w in workers if w is not busy)
+    # Another client holds the preferred worker's only slot
+    busy._slots.acquire()
+    try:
+        start = time.time()
+        success, log, _, _, _ = coordinator.run(netlist)
+        assert success and f"Ran on worker {other.worker_id}" in log
+        assert time.time() - start < 1.0
+    finally:
+        busy._slots.release()
+        coordinator.close()
+        for worker in workers:
+            worker.stop()
+
+def test_worker_token_and_timeout_limits():
+    """Test that public binds need a token and requested timeouts are clamped"""
+    with pytest.raises(ValueError, match='token'):
+        SimulationWorker('0.0.0.0', 0, token='')
+    assert not is_loopback('') and is_loopback('localhost') and is_loopback('::1')
+    SimulationWorker('0.0.0.0', 0, token='secret').server.server_close()
+
+    timeouts = []
+
+    def run(netlist, timeout):
+        timeouts.append(timeout)
+        return simulate(netlist, timeout)
+
+    worker = SimulationWorker('127.0.0.1', 0, runner=run, max_timeout=30)
+    try:
+        worker.execute(RC_TEMPLATE.format(r='4k'), timeout=10 ** 6)
+        worker.execute(RC_TEMPLATE.format(r='6k'), timeout=5)
+    finally:
+        worker.server.server_close()
+    assert timeouts == [30, 5]
+
+def test_cli_remote_batch():
+    """Test the batch runner handing simulations to remote workers"""
+    root = tempfile.mkdtemp()
+    for i, r in enumerate(['1k', '2k', '5k']):
+        Path(root, f'rc{i}.cir').write_text(RC_TEMPLATE.format(r=r))
+    workers = start_workers(2, capacity=2)
+    try:
+        summary = run_batch([root], os.path.join(root, 'out'), remote=[w.url for w in workers], quiet=True)
+    finally:
+        for worker in workers:
+            worker.stop()
+    assert summary['ok'] == 3
+    assert all(entry['points'] == 41 for entry in summary['results'])
+
+if __name__ == "__main__":
+    test_result_encoding_round_trip()
+    test_coordinator_spreads_and_caches()
+    test_worker_loss_and_rejection()
+    test_busy_worker_spills_to_next()
+    test_worker_token_and_timeout_limits()
+    test_cli_remote_batch()
+    print("All distributed tests passed!")
@@ -0,0 +1,79 @@
+"""Tests for the simulation cost estimator"""
+
+import sys
+import os
+
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.estimator import (
+    estimate_simulation_cost, classify_cost, downscale_netlist, plan_simulation
+)
+from core.netlist_examples import EXAMPLES
+from core.netlist_parser import parse_netlist
+from core.sanitizer import sanitize_netlist
+
+def test_estimate_examples():
+    """Test point and size estimates for the bundled examples"""
+    estimate = estimate_simulation_cost(EXAMPLES["RC Low-Pass Filter (AC/TRAN)"])
+    
+    assert estimate['nodes'] == 2
+    assert estimate['elements'] == 3
+    # time/frequency + v(in) + v(out) + i(vin)
+    assert estimate['vectors'] == 4
+    
+    ac, tran = estimate['analyses']
+    assert ac['type'] == 'ac'
+    assert ac['points'] == 251
+    assert tran['type'] == 'tran'
+    assert tran['points'] == 1001
+    assert estimate['raw_bytes'] > 0
+    
+    for netlist in EXAMPLES.values():
+        assert classify_cost(estimate_simulation_cost(netlist)) == 'run'
+    
+    saved = sanitize_netlist(EXAMPLES["RC Low-Pass Filter (AC/TRAN)"], save_vectors=['v(out)'])
+    saved_estimate = estimate_simulation_cost(saved)
+    assert saved_estimate['vectors'] == 2
+    assert saved_estimate['raw_bytes'] < estimate['raw_bytes']
+
+def test_reject_oversized_tran():
+    """Test that an accidental .tran 1p 1 is rejected before running"""
+    netlist = """* Oversized
+V1 in 0 1
+R1 in 0 1k
+.tran 1p 1
+.end
+"""
+    decision, _, estimate = plan_simulation(netlist, oversize_action='reject')
+    
+    assert estimate['points'] > 1e11
+    assert decision == 'reject'
+
+def test_downscale_oversized_analyses():
+    """Test downscaling of .tran and .ac resolution"""
+    netlist = """* Oversized
+V1 in 0 AC 1
+R1 in out 1k
+C1 out 0 1u
+.ac dec 100000 1 1e9
+.tran 1p 1m
+.end
+"""
+    scaled = downscale_netlist(netlist, max_points=1000)
+    
+    for analysis in estimate_simulation_cost(scaled)['analyses']:
+        assert analysis['points'] <= 1001
+    
+    assert 'R1 in out 1k' in scaled
+    assert len(parse_netlist(scaled)['analyses']) == 2
+    
+    decision, run_netlist, _ = plan_simulation(netlist, oversize_action='downscale')
+    assert decision == 'downscale'
+    assert run_netlist != netlist
+
+if __name__ == "__main__":
+    test_estimate_examples()
+    test_reject_oversized_tran()
+    test_downscale_oversized_analyses()
+    print("All estimator tests passed!")
@@ -0,0 +1,42 @@
+"""Tests that core modules import without heavy dependencies"""
+
+import sys
+import os
+import json
+import subprocess
+
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+def loaded_after_import(modules):
+    """Heavy libraries present in a fresh interpreter after importing modules"""
+    script = (
+        "import sys, json\n"
+        f"import {', '.join(modules)}\n"
+        "print(json.dumps([m for m in ('numpy', 'pandas', 'matplotlib') if m in sys.modules]))\n"
+    )
+    output = subprocess.run([sys.executable, '-c', script], cwd=REPO_ROOT,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output)
+
+def test_runner_imports_light():
+    """Test that the runner and netlist tooling load neither numpy nor pandas"""
+    assert loaded_after_import([
+        'core.runner', 'core.sanitizer', 'core.singleflight', 'core.estimator',
+        'core.library', 'core.netlist_examples', 'core.utils', 'core.session', 'core.scheduler',
+        'core.log_pipeline'
+    ]) == []
+
+def test_numeric_modules_defer_pandas():
+    """Test that numeric modules only load numpy at import time"""
+    assert loaded_after_import([
+        'core.mna', 'core.compare', 'core.archive', 'core.batch', 'core.op_cache', 'core.raw_parser',
+        'core.sensitivity', 'core.distributed', 'core.session_store',
+        'core.raw_index', 'core.codec', 'core.optimizer'
+    ]) == ['numpy']
+
+if __name__ == "__main__":
+    test_runner_imports_light()
+    test_numeric_modules_defer_pandas()
+    print("All import tests passed!")
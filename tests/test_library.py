@@ -0,0 +1,100 @@
+"""Tests for the model/subcircuit library"""
+
+import sys
+import os
+import tempfile
+from pathlib import Path
+
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.library import ModelLibrary, scan_library_file, INDEX_FILE
+
+VENDOR_LIB = """* Vendor library
+.model D1N4148 D(Is=2.52n Rs=.568 N=1.752
++ Cjo=4p M=.4 tt=20n)
+.model Q2N3904 NPN(Is=6.734f Bf=416.4)
+.model UNUSED D(Is=1n)
+
+.subckt BUFFER in out vcc
+Q1 vcc in out Q2N3904
+D1 out 0 D1N4148
+.ends BUFFER
+"""
+
+OPAMP_LIB = """.subckt AMP in out vcc
+X1 in mid vcc BUFFER
+R1 mid out 1k
+.ends
+"""
+
+def make_library(tmpdir):
+    Path(tmpdir, 'vendor.lib').write_text(VENDOR_LIB)
+    Path(tmpdir, 'opamp.sub').write_text(OPAMP_LIB)
+    Path(tmpdir, 'notes.txt').write_text('.model IGNORED D')
+    return ModelLibrary(tmpdir)
+
+def test_scan_offsets():
+    """Test that index entries cover the whole definition"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = Path(tmpdir, 'vendor.lib')
+        path.write_text(VENDOR_LIB)
+        entries = {e['name']: e for e in scan_library_file(path)}
+        assert set(entries) == {'D1N4148', 'Q2N3904', 'UNUSED', 'BUFFER'}
+
+        data = path.read_bytes()
+        diode = entries['D1N4148']
+        assert data[diode['offset']:diode['offset'] + diode['length']].decode().endswith('tt=20n)\n')
+        buffer = entries['BUFFER']
+        assert data[buffer['offset']:buffer['offset'] + buffer['length']].decode().strip().endswith('.ends BUFFER')
+
+def test_inject_referenced_only():
+    """Test that only referenced definitions and their dependencies are injected"""
+    netlist = """Amplifier test
+V1 vcc 0 5
+V2 in 0 SIN(0 1 1k)
+XA in out vcc amp
+D2 out 0 d1n4148
+.tran 1u 1m
+.control
+run
+.endc
+.end"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        library = make_library(tmpdir)
+        assert len(library) == 5
+        assert 'ignored' not in library
+
+        assert library.resolve(netlist) == ['d1n4148', 'q2n3904', 'buffer', 'amp']
+        injected = library.inject(netlist)
+        assert 'UNUSED' not in injected
+        assert injected.index('.subckt BUFFER') < injected.index('.subckt AMP') < injected.index('.control')
+        assert injected.count('.model D1N4148') == 1
+
+        # Inline definitions take precedence over the library
+        inline = netlist.replace('.tran', '.model D1N4148 D(Is=1p)\n.tran')
+        assert library.resolve(inline) == ['q2n3904', 'buffer', 'amp']
+        assert library.resolve("Only diode\nD1 a 0 D1N4148\n.model d1n4148 D\n.end") == []
+
+        plain = "RC\nR1 in out 1k\nC1 out 0 1u\n.end"
+        assert library.inject(plain) == plain
+
+def test_index_persistence():
+    """Test that the saved index is reused and refreshed on file changes"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        make_library(tmpdir)
+        assert Path(tmpdir, INDEX_FILE).exists()
+
+        library = ModelLibrary(tmpdir)
+        assert library.build_index() == 0
+
+        Path(tmpdir, 'extra.mod').write_text('.model NEWDIODE D(Is=1n)\n')
+        assert library.build_index() == 1
+        assert library.get_definition('newdiode') == '.model NEWDIODE D(Is=1n)'
+        assert library.lookup('NEWDIODE')['file'] == 'extra.mod'
+
+if __name__ == "__main__":
+    test_scan_offsets()
+    test_inject_referenced_only()
+    test_index_persistence()
+    print("All library tests passed!")
@@ -0,0 +1,114 @@
+"""Tests for bounded log streaming and issue extraction"""
+
+import sys
+import os
+import tempfile
+from pathlib import Path
+
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.log_pipeline import LogPipeline, summarize_log, bounded_log, SUMMARY_HEADER, MEASUREMENTS_HEADER
+from core.measurements import parse_measurements
+
+CONVERGENCE_LOG = """Circuit: * diode clamp
+Error on line 4 : d1 in out dx
+  unable to find definition of model dx - default assumed
+Warning: singular matrix:  check nodes out and out
+Warning: gmin stepping failed
+doAnalyses: TRAN:  Timestep too small; time = 1.23e-05, timestep = 1.25e-19: trouble with node "out"
+tran simulation(s) aborted
+Error: transient analysis failed
+"""
+
+def test_issue_extraction():
+    """Test that known ngspice problems are classified with their node or model"""
+    pipeline = LogPipeline()
+    pipeline.feed(CONVERGENCE_LOG)
+    summary = pipeline.summary()
+    issues = {issue['kind']: issue for issue in summary['issues']}
+
+    assert issues['unknown_model']['subjects'] == ['dx']
+    assert issues['singular_matrix']['subjects'] == ['out']
+    assert issues['timestep_too_small']['subjects'] == ['out']
+    assert issues['timestep_too_small']['first_line'] == 6
+    assert issues['gmin_stepping_failed']['severity'] == 'warning'
+    assert issues['error']['count'] == 2
+    assert summary['errors'] == 5 and summary['warnings'] == 1
+    assert [issue['severity'] for issue in summary['issues']][-1] == 'warning'
+    assert summary['omitted'] == 0
+
+def test_bounded_head_and_tail():
+    """Test that huge logs keep only head and tail lines but count issues throughout"""
+    pipeline = LogPipeline(head=5, tail=5, max_line_length=50)
+    pipeline.feed("start\n")
+    for step in range(100000):
+        pipeline.feed(f"step {step}\n")
+        if step % 1000 == 0:
+            pipeline.feed(f"doAnalyses: TRAN:  Timestep too small; time = {step}e-9\n")
+    pipeline.feed("x" * 500 + "\nend")
+    text = pipeline.text()
+
+    assert len(text.splitlines()) == 11
+    assert text.startswith("start\nstep 0\n")
+    assert text.endswith("end")
+    assert "lines (" in text and pipeline.omitted == 1 + 100000 + 100 + 2 - 10
+    assert len(pipeline.tail[-2]) < 60
+    summary = pipeline.summary()
+    assert summary['issues'][0]['count'] == 100
+    assert summary['issues'][0]['first_line'] == 3
+
+def test_summary_survives_render():
+    """Test that the appended report is read back with the full-log counts"""
+    pipeline = LogPipeline(head=3, tail=3)
+    pipeline.feed(CONVERGENCE_LOG * 50)
+    rendered = pipeline.render() + "\n\nExecution time: 0.12 seconds"
+    assert SUMMARY_HEADER in rendered
+
+    restored = summarize_log(rendered)
+    original = pipeline.summary()
+    assert restored['errors'] == original['errors'] == 250
+    assert restored['omitted'] == original['omitted']
+    assert [(i['kind'], i['count'], i['subjects']) for i in restored['issues']] == \
+           [(i['kind'], i['count'], i['subjects']) for i in original['issues']]
+    assert restored['issues'][1]['label'] == 'Unknown model'
+
+    # Plain text without a report is scanned directly; clean short logs get no report
+    assert summarize_log(CONVERGENCE_LOG)['errors'] == 5
+    assert bounded_log("Circuit: rc\nNo. of Data Rows : 10\n") == "Circuit: rc\nNo. of Data Rows : 10"
+
+def test_feed_file():
+    """Test streaming a log file in chunks"""
+    with tempfile.NamedTemporaryFile(mode='w', suffix='.log', delete=False) as f:
+        f.write(CONVERGENCE_LOG * 3000)
+        path = f.name
+    try:
+        pipeline = LogPipeline(head=10, tail=10)
+        pipeline.feed_file(path)
+        assert pipeline.lines == 8 * 3000
+        assert pipeline.summary()['issues'][1]['count'] == 3000
+    finally:
+        Path(path).unlink()
+
+def test_measurements_in_omitted_lines():
+    """Test that .meas results survive when they fall between the kept head and tail"""
+    pipeline = LogPipeline(head=200, tail=200)
+    pipeline.feed("rise_head = 1\n" + "Warning: gmin stepping failed\n" * 300)
+    pipeline.feed("rise_t = 1.234e-06\n  fall_t =  -2.5e-3 targ= 1e-3\n")
+    pipeline.feed("\nSTDERR:\n" + "stderr noise\n" * 250 + "tail_t = 3\n")
+    rendered = pipeline.render()
+
+    assert rendered.count(MEASUREMENTS_HEADER) == 1
+    assert pipeline.omitted_measurements() == ["rise_t = 1.234e-06", "fall_t =  -2.5e-3 targ= 1e-3"]
+    assert parse_measurements(rendered, ['rise_t', 'fall_t', 'rise_head', 'tail_t']) == \
+        {'rise_t': 1.234e-06, 'fall_t': -2.5e-3, 'rise_head': 1.0, 'tail_t': 3.0}
+    assert summarize_log(rendered)['warnings'] == 300
+    assert MEASUREMENTS_HEADER not in bounded_log("a = 1\n" * 10)
+
+if __name__ == "__main__":
+    test_issue_extraction()
+    test_bounded_head_and_tail()
+    test_summary_survives_render()
+    test_feed_file()
+    test_measurements_in_omitted_lines()
+    print("All log pipeline tests passed!")
@@ -0,0 +1,120 @@
+"""Tests for the in-process linear AC (MNA) engine"""
+
+import sys
+import os
+import numpy as np
+
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.mna import solve_linear_ac, supports_fast_ac, ac_frequencies, UnsupportedCircuitError
+from core.netlist_examples import EXAMPLES, generate_parametric_netlist
+from core.runner import simulate
+from core.sanitizer import sanitize_netlist
+
+def test_rc_highpass_matches_analytic():
+    """Test the RC high-pass generator against its transfer function"""
+    netlist = generate_parametric_netlist("rc_highpass", R=1000, C=1e-6)
+    df, metadata = solve_linear_ac(netlist)
+    
+    freq = df.index.values
+    expected = 1j * 2 * np.pi * freq * 1e-3 / (1 + 1j * 2 * np.pi * freq * 1e-3)
+    assert np.allclose(df['v(n1)'].values, expected)
+    
+    assert df.index.name == 'frequency'
+    assert metadata['plotname'] == 'AC Analysis'
+    assert metadata['flags'] == 'complex'
+    assert metadata['no_points'] == len(df) == 351
+    assert [v['name'] for v in metadata['variables']] == ['frequency', 'v(in)', 'v(n1)', 'i(vin)']
+
+def test_rlc_resonance_and_source_current():
+    """Test the RLC example: resonant peak and source branch current sign"""
+    df, _ = solve_linear_ac(EXAMPLES["RLC Resonant Circuit"])
+    
+    f0 = 1 / (2 * np.pi * np.sqrt(10e-3 * 100e-9))
+    peak = df.index[np.argmax(np.abs(df['v(n2)'].values))]
+    assert abs(peak - f0) / f0 < 0.03
+    
+    # Current flows out of the source's + terminal, so i(vin) = -v(in)/Z
+    i_at_peak = df['i(vin)'].values[np.argmax(np.abs(df['v(n2)'].values))]
+    assert i_at_peak.real < 0
+    assert abs(abs(i_at_peak) - 1 / 50) < 2e-3
+
+def test_controlled_sources():
+    """Test VCVS inverting amplifier and VCCS/current source stamping"""
+    netlist = """* Inverting amplifier
+Vin in 0 AC 1
+Rin in n_inv 10k
+Rf n_inv out 100k
+Eop out 0 0 n_inv 1e6
+.ac lin 3 1 1k
+.end"""
+    df, _ = solve_linear_ac(netlist)
+    assert np.allclose(df['v(out)'].values, -10, rtol=1e-4)
+    
+    netlist = """* Transconductor
+I1 0 in AC 1m
+R1 in 0 1k
+G1 0 out in 0 2m
+R2 out 0 5k
+.ac lin 2 1 10
+.end"""
+    df, _ = solve_linear_ac(netlist)
+    assert np.allclose(df['v(in)'].values, 1.0)
+    assert np.allclose(df['v(out)'].values, 10.0)
+
+def test_unsupported_netlists_fall_back():
+    """Test detection of netlists that need ngspice"""
+    assert supports_fast_ac(EXAMPLES["RLC Resonant Circuit"])
+    assert supports_fast_ac(generate_parametric_netlist("rlc_filter"))
+    assert not supports_fast_ac(EXAMPLES["BJT CE Amplifier (AC)"])
+    assert not supports_fast_ac(EXAMPLES["RC Low-Pass Filter (AC/TRAN)"])
+    assert not supports_fast_ac(EXAMPLES["Diode Rectifier"])
+    
+    try:
+        solve_linear_ac(EXAMPLES["BJT CE Amplifier (AC)"])
+        assert False, "Expected UnsupportedCircuitError"
+    except UnsupportedCircuitError:
+        pass
+
+def test_simulate_uses_fast_path():
+    """Test that simulate() answers linear AC netlists without ngspice"""
+    success, log, df, metadata, raw_path = simulate(sanitize_netlist(EXAMPLES["RLC Resonant Circuit"]))
+    
+    assert success
+    assert raw_path is None
+    assert metadata['engine'] == 'mna'
+    assert 'fast path' in log
+    assert len(df) == len(ac_frequencies(['dec', '100', '100', '100k']))
+
+def test_control_commands_and_saved_vectors():
+    """Test that user control commands go to ngspice and saved vectors limit the fast-path output"""
+    rc = "* RC\nV1 in 0 AC 1\nR1 in out 1k\nC1 out 0 1u\n.ac dec 10 10 100k\n"
+    ran = []
+
+    def runner(netlist, timeout, **kwargs):
+        ran.append(netlist)
+        return False, 'ngspice', None
+
+    for control in ("alter c1 = 10u\nrun", "run\nmeas ac vpeak max vm(out)", "run\nprint v(out)"):
+        netlist = sanitize_netlist(rc + f".control\n{control}\n.endc\n.end")
+        assert not supports_fast_ac(netlist)
+        assert simulate(netlist, runner=runner)[1] == 'ngspice'
+    assert len(ran) == 3
+
+    saved = sanitize_netlist(rc + ".end", save_vectors=['v(out)'])
+    assert supports_fast_ac(saved)
+    success, _, df, metadata, _ = simulate(saved, runner=runner)
+    assert success and list(df.columns) == ['v(out)']
+    assert [v['name'] for v in metadata['variables']] == ['frequency', 'v(out)']
+    assert metadata['no_variables'] == 2
+    assert not supports_fast_ac(sanitize_netlist(rc + ".end", save_vectors=['v(nope)']))
+
+if __name__ == "__main__":
+    test_rc_highpass_matches_analytic()
+    test_rlc_resonance_and_source_current()
+    test_controlled_sources()
+    test_unsupported_netlists_fall_back()
+    test_simulate_uses_fast_path()
+    test_control_commands_and_saved_vectors()
+    print("All MNA tests passed!")
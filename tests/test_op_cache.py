@@ -0,0 +1,92 @@
+"""Tests for operating-point warm start"""
+
+import sys
+import os
+import pandas as pd
+
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.netlist_examples import EXAMPLES, generate_parametric_netlist
+from core.netlist_parser import parse_netlist
+from core.op_cache import (
+    topology_key, operating_point_netlist, extract_operating_point,
+    apply_operating_point, OperatingPointCache
+)
+
+def test_topology_key_ignores_values():
+    """Test that parametric variants share a topology key"""
+    base = generate_parametric_netlist("rc_lowpass", R=1000, C=1e-6)
+    variant = generate_parametric_netlist("rc_lowpass", R=4700, C=2.2e-9, freq=50)
+    
+    assert topology_key(base) == topology_key(variant)
+    assert topology_key(base) != topology_key(generate_parametric_netlist("rc_highpass"))
+    
+    edited = EXAMPLES["CMOS Inverter (Level 1)"].replace("W=10u", "W=20u")
+    assert topology_key(edited) == topology_key(EXAMPLES["CMOS Inverter (Level 1)"])
+    
+    rewired = EXAMPLES["CMOS Inverter (Level 1)"].replace("M1 out in 0 0", "M1 out vdd 0 0")
+    assert topology_key(rewired) != topology_key(EXAMPLES["CMOS Inverter (Level 1)"])
+
+def test_operating_point_netlist():
+    """Test that analyses are replaced by a single .op"""
+    op_netlist = operating_point_netlist(EXAMPLES["RC Low-Pass Filter (AC/TRAN)"])
+    analyses = parse_netlist(op_netlist)['analyses']
+    
+    assert [a['type'] for a in analyses] == ['op']
+    assert op_netlist.rstrip().endswith('.end')
+
+def test_extract_and_apply():
+    """Test extraction from a transient result and .nodeset insertion"""
+    df = pd.DataFrame(
+        {'v(vdd)': [1.8, 1.8], 'v(in)': [0.0, 0.5], 'v(out)': [1.79, 1.2], 'i(vdd)': [-1e-6, -2e-6]},
+        index=pd.Index([0.0, 1e-9], name='time')
+    )
+    metadata = {
+        'plotname': 'Transient Analysis',
+        'variables': [
+            {'index': 0, 'name': 'time', 'type': 'time'},
+            {'index': 1, 'name': 'v(vdd)', 'type': 'voltage'},
+            {'index': 2, 'name': 'v(in)', 'type': 'voltage'},
+            {'index': 3, 'name': 'v(out)', 'type': 'voltage'},
+            {'index': 4, 'name': 'i(vdd)', 'type': 'current'},
+        ]
+    }
+    op = extract_operating_point(df, metadata)
+    assert op == {'vdd': 1.8, 'in': 0.0, 'out': 1.79}
+    
+    netlist = EXAMPLES["CMOS Inverter (Level 1)"]
+    warm = apply_operating_point(netlist, op)
+    lines = warm.split('\n')
+    assert lines[-1] == '.end'
+    assert lines[-2] == '.nodeset V(vdd)=1.8 V(in)=0 V(out)=1.79'
+    
+    # Re-applying replaces the previous warm-start line
+    rewarmed = apply_operating_point(warm, {'out': 0.9}, mode='ic')
+    assert '.nodeset' not in rewarmed
+    assert rewarmed.count('.ic V(out)=0.9') == 1
+
+def test_cache_warm_start():
+    """Test cache lookup across derived netlists"""
+    cache = OperatingPointCache(max_entries=2)
+    base = generate_parametric_netlist("rlc_filter", R=50)
+    cache.store(base, {'in': 0.0, 'n1': 0.0, 'n2': 0.0})
+    
+    derived = generate_parametric_netlist("rlc_filter", R=75)
+    assert cache.lookup(derived) is not None
+    assert '.nodeset' in cache.warm_start(derived)
+    
+    other = generate_parametric_netlist("rc_highpass")
+    assert cache.warm_start(other) == other
+    
+    cache.store(other, {'in': 0.0})
+    cache.store(EXAMPLES["Diode Rectifier"], {'in': 0.0})
+    assert len(cache) == 2
+    assert cache.lookup(base) is None
+
+if __name__ == "__main__":
+    test_topology_key_ignores_values()
+    test_operating_point_netlist()
+    test_extract_and_apply()
+    test_cache_warm_start()
+    print("All operating-point cache tests passed!")
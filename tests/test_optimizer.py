@@ -0,0 +1,101 @@
+"""Tests for derivative-free component value optimization"""
+
+import sys
+import os
+import numpy as np
+
+import pytest
+
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.optimizer import (
+    optimize, element_builder, template_builder, parse_targets, ParameterSpace, Evaluator, METHODS
+)
+from core.netlist_parser import parse_netlist
+
+RC_LOWPASS = """* RC low-pass
+V1 in 0 AC 1
+R1 in out 1k
+C1 out 0 1u
+.ac dec 20 10 100k
+.end
+"""
+
+def test_space_and_targets():
+    """Test log/linear unit-cube mapping, builders and target parsing"""
+    space = ParameterSpace({'R1': (10, 1e6, 1000), 'gain': (-1, 1)})
+    assert list(space.log) == [True, False]
+    assert np.allclose(space.initial, [0.4, 0.5])
+    assert space.values(np.array([0.4, 0.75])) == {'R1': 1000.0, 'gain': 0.5}
+    assert space.values(np.array([1.5, -1.0])) == {'R1': 1e6, 'gain': -1.0}
+    with pytest.raises(ValueError):
+        ParameterSpace({'R1': (10, 1)})
+
+    netlist = element_builder(RC_LOWPASS)({'r1': 2200, 'C1': 4.7e-9})
+    values = {e['name']: e['args'] for e in parse_netlist(netlist)['elements']}
+    assert values['R1'] == ['2200'] and values['C1'] == ['4.7e-09']
+    with pytest.raises(ValueError):
+        element_builder(RC_LOWPASS)({'V1': 2})
+    assert 'R1 in out 470' in template_builder('rc_lowpass', {'C': 1e-8})({'R': 470})
+
+    assert parse_targets("cutoff(v(out)) = 1k\n* comment\n\nmax(v(out)) <= 1.2") == \
+        {'cutoff(v(out))': 1000.0, 'max(v(out))': ('<=', 1.2)}
+    for bad in ("cutoff(v(out))", "median(v(out)) = 1", "max(v(out)) = abc"):
+        with pytest.raises(ValueError):
+            parse_targets(bad)
+
+def test_tune_rc_cutoff():
+    """Test that both methods place the RC corner at 1 kHz (R = 1/(2 pi 1k 1u))"""
+    expected = 1 / (2 * np.pi * 1e3 * 1e-6)
+    for method in METHODS:
+        result = optimize(element_builder(RC_LOWPASS), {'R1': (10, 1e6)},
+                          {'cutoff(v(out))': 1e3}, method=method, max_evaluations=150)
+        assert result['engines'] == ['mna']
+        assert abs(result['best']['R1'] - expected) / expected < 0.01
+        assert abs(result['metrics']['cutoff(v(out))'] - 1e3) < 10
+        assert result['evaluations'] <= 150 + 4
+        assert result['simulations'] + result['cache_hits'] == result['evaluations']
+        assert len(result['history']) == result['evaluations']
+        assert result['history']['objective'].min() == result['objective']
+        assert 'R1 in out' in result['netlist']
+
+def test_limits_and_memoization():
+    """Test inequality targets and that repeated candidates are not simulated again"""
+    targets = {'cutoff(v(out))': ('>=', 5e3), 'at(v(out), 100k)': ('<=', 0.1)}
+    result = optimize(element_builder(RC_LOWPASS), {'R1': (10, 1e6), 'C1': (1e-9, 1e-5)},
+                      targets, method='cma-es', population=8, seed=1)
+    assert result['objective'] == 0.0
+    assert result['metrics']['cutoff(v(out))'] >= 5e3
+    assert result['metrics']['at(v(out), 100k)'] <= 0.1
+
+    evaluator = Evaluator(ParameterSpace({'R1': (10, 1e6)}), element_builder(RC_LOWPASS),
+                          {'cutoff(v(out))': 1e3})
+    first = evaluator([np.array([0.2]), np.array([0.2]), np.array([2.0])])
+    second = evaluator([np.array([1.0]), np.array([0.2])])
+    assert evaluator.simulations == 2 and evaluator.cache_hits == 3
+    assert first[0] == first[1] == second[1] and first[2] == second[0]
+    with pytest.raises(ValueError):
+        Evaluator(evaluator.space, evaluator.build, {'max(v(nope))': 1})([np.array([0.5])])
+    with pytest.raises(ValueError):
+        optimize(evaluator.build, {'R1': (10, 1e6)}, {'cutoff(v(out))': 1e3}, method='anneal')
+
+def test_small_budget_and_negative_values():
+    """Test that tiny CMA-ES budgets still return an evaluated result and negative ranges keep their sign"""
+    for budget in (1, 3):
+        result = optimize(element_builder(RC_LOWPASS), {'R1': (10, 1e6)}, {'cutoff(v(out))': 1e3},
+                          method='cma-es', max_evaluations=budget, population=12)
+        assert result['generations'] == 1 and result['evaluations'] == max(budget, 2)
+        assert np.isfinite(result['objective'])
+
+    inverting = "* Inverting gain\nV1 in 0 AC 1\nR1 in 0 1k\nE1 out 0 in 0 -2\nR2 out 0 1k\n.ac dec 5 10 1k\n.end\n"
+    result = optimize(element_builder(inverting), {'E1': (-20, -0.2, -2)}, {'max(v(out))': 5},
+                      max_evaluations=60)
+    assert abs(result['best']['E1'] + 5) < 0.05
+
+if __name__ == "__main__":
+    test_space_and_targets()
+    test_tune_rc_cutoff()
+    test_limits_and_memoization()
+    test_small_budget_and_negative_values()
+    print("All optimizer tests passed!")
@@ -0,0 +1,95 @@
+"""Tests for progress reporting of long runs"""
+
+import sys
+import os
+import subprocess
+import tempfile
+from pathlib import Path
+
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.progress import ProgressTracker, insert_partial_writes, transient_stop_time
+from core.runner import _communicate_with_progress
+from core.sanitizer import sanitize_netlist
+
+TRAN_NETLIST = """* Slow RC
+V1 in 0 PULSE(0 1 0 1n 1n 5m 10m)
+R1 in out 1k
+C1 out 0 1u
+.tran 1u 20m
+.end
+"""
+
+def test_tracker_fraction():
+    """Test fraction computed from ngspice reference values"""
+    tracker = ProgressTracker.for_netlist(TRAN_NETLIST)
+    
+    assert tracker.stop_value == 20e-3
+    assert tracker.fraction is None
+    
+    tracker.feed("Reference value :  5.00000e-03\rReference value :  1.00000e-02\r")
+    assert abs(tracker.fraction - 0.5) < 1e-9
+    
+    tracker.feed("unrelated output\n")
+    assert abs(tracker.fraction - 0.5) < 1e-9
+    
+    tracker.feed("Reference value :  3.00000e-02\n")
+    assert tracker.fraction == 1.0
+
+def test_insert_partial_writes():
+    """Test breakpoint and snapshot insertion into the control block"""
+    sanitized = sanitize_netlist(TRAN_NETLIST)
+    chunked = insert_partial_writes(sanitized, 4)
+    lines = chunked.split('\n')
+    
+    assert lines.count('run') == 1
+    assert 'stop when time > 0.005' in lines
+    assert 'stop when time > 0.015' in lines
+    assert lines.index('stop when time > 0.005') < lines.index('run')
+    assert lines.index('write partial_1.raw') > lines.index('run')
+    assert lines.count('resume') == 3
+    assert lines.index('write output.raw') > lines.index('write partial_3.raw')
+    
+    # AC-only netlists have no simulation time to stop on
+    ac_netlist = sanitize_netlist("* AC\nV1 in 0 AC 1\nR1 in 0 1k\n.ac dec 10 1 1k\n.end\n")
+    assert insert_partial_writes(ac_netlist, 4) == ac_netlist
+    assert transient_stop_time(ac_netlist) is None
+
+def test_communicate_with_progress():
+    """Test progress events from a process emitting ngspice-style output"""
+    script = (
+        "import sys, time\n"
+        "for i in range(1, 5):\n"
+        "    sys.stderr.write('Reference value :  %e\\r' % (i * 5e-3))\n"
+        "    sys.stderr.flush()\n"
+        "    open('partial_%d.raw' % i, 'w').write('x')\n"
+        "    time.sleep(0.3)\n"
+    )
+    events = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        process = subprocess.Popen(
+            [sys.executable, '-c', script],
+            cwd=tmpdir,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True
+        )
+        tracker = ProgressTracker(20e-3)
+        stdout, stderr = _communicate_with_progress(
+            process, 10, tracker, Path(tmpdir), events.append
+        )
+    
+    fractions = [e['fraction'] for e in events if e['fraction'] is not None]
+    assert fractions == sorted(fractions)
+    assert fractions[-1] >= 0.75
+    assert 'Reference value' in stderr
+    
+    partials = [Path(e['partial_raw']).name for e in events if e['partial_raw']]
+    assert partials[:2] == ['partial_1.raw', 'partial_2.raw']
+
+if __name__ == "__main__":
+    test_tracker_fraction()
+    test_insert_partial_writes()
+    test_communicate_with_progress()
+    print("All progress tests passed!")
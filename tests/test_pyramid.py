@@ -0,0 +1,77 @@
+"""Tests for min/max pyramids and viewport fetching"""
+
+import sys
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.pyramid import ResultPyramid, build_levels
+from core.archive import ResultArchive
+
+SPIKE = 12_345
+
+def make_transient(n=200_001):
+    time = np.linspace(0, 1e-3, n)
+    signal = np.sin(2 * np.pi * 5e3 * time)
+    # Single-sample spike that decimation must not lose
+    signal[SPIKE] = 3.0
+    return pd.DataFrame({'v(out)': signal, 'v(in)': -signal}, index=pd.Index(time, name='time'))
+
+def test_build_levels():
+    """Test min/max reduction including partial bins"""
+    levels = build_levels(np.arange(20.0), block=4)
+    mins, maxs = levels[0]
+    assert list(mins) == [0, 4, 8, 12, 16]
+    assert list(maxs) == [3, 7, 11, 15, 19]
+    assert [len(m) for m, _ in levels] == [5, 3, 2, 1]
+    assert levels[-1][0][0] == 0 and levels[-1][1][0] == 19
+
+    complex_levels = build_levels(np.array([3 + 4j, 0j, 1j, -2 + 0j]), block=2)
+    assert list(complex_levels[0][1]) == [5.0, 2.0]
+
+def test_fetch_window_resolution():
+    """Test that window fetches stay within the pixel budget and keep extremes"""
+    df = make_transient()
+    pyramid = ResultPyramid.from_dataframe(df)
+
+    full = pyramid.fetch(pixels=500)
+    assert full.index.name == 'time'
+    assert len(full) <= 4 * 500
+    assert full['v(out)'].max() == 3.0
+    assert np.isclose(full['v(in)'].min(), -3.0)
+
+    # Zoom to ~100 samples around the spike: raw points are returned
+    t_spike = df.index[SPIKE]
+    zoomed = pyramid.fetch(t_spike - 2.5e-7, t_spike + 2.5e-7, pixels=500, columns=['v(out)'])
+    assert list(zoomed.columns) == ['v(out)']
+    assert 95 <= len(zoomed) <= 105
+    assert zoomed.index.isin(df.index).all()
+    assert zoomed['v(out)'].max() == 3.0
+
+    # Mid-level zoom
+    window = pyramid.fetch(2e-4, 6e-4, pixels=300)
+    assert len(window) <= 4 * 300
+    assert window.index.min() >= 2e-4 - 1e-5
+    assert window.index.max() <= 6e-4 + 1e-5
+
+def test_fetch_from_archive():
+    """Test viewport queries on memory-mapped archived columns"""
+    df = make_transient(50_001)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        archive = ResultArchive(tmpdir)
+        run_id = archive.save(df, {'title': 'spike', 'plotname': 'Transient Analysis', 'variables': []})
+        pyramid = ResultPyramid.from_archive(archive.open(run_id))
+        assert pyramid.x_range == (0.0, 1e-3)
+        window = pyramid.fetch(None, None, pixels=200, columns=['v(out)'])
+        assert len(window) <= 800
+        assert np.isclose(window['v(out)'].max(), df['v(out)'].max())
+
+if __name__ == "__main__":
+    test_build_levels()
+    test_fetch_window_resolution()
+    test_fetch_from_archive()
+    print("All pyramid tests passed!")
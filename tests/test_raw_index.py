@@ -0,0 +1,119 @@
+"""Tests for the sidecar point index of RAW files"""
+
+import sys
+import os
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.raw_index import RawIndex, load_index, read_window, extract_window, index_path
+from core.raw_parser import parse_ascii_raw, parse_raw_lines
+from core.compare import compare_batch
+
+def write_raw(points, tabs=True, plotname='Transient Analysis', x_name='time', scale=1e-6, complex_values=False):
+    """Write a RAW plot with v(out) = x * 2; returns its text"""
+    sep = '\t' if tabs else '\n '
+    lines = ["Title: Index Test", "Date: Mon Jan 01 00:00:00 2024", f"Plotname: {plotname}",
+             f"Flags: {'complex' if complex_values else 'real'}", "No. Variables: 2",
+             f"No. Points: {points}", "Variables:", f" 0\t{x_name}\t{x_name}", " 1\tv(out)\tvoltage", "Values:"]
+    for n in range(points):
+        x = n * scale
+        if complex_values:
+            lines.append(f"{n}{sep}{x:.6e},0.000000e+00")
+            lines.append(f"\t{x * 2:.6e},{-x:.6e}" if tabs else f" {x * 2:.6e},{-x:.6e}")
+        else:
+            lines.append(f"{n}{sep}{x:.6e}")
+            lines.append(f"\t{x * 2:.6e}" if tabs else f" {x * 2:.6e}")
+    return '\n'.join(lines) + '\n'
+
+def raw_file(text):
+    with tempfile.NamedTemporaryFile(mode='w', suffix='.raw', delete=False) as f:
+        f.write(text)
+        return f.name
+
+def test_window_matches_full_parse():
+    """Test that windowed reads equal the slice of a full parse, in both value formats"""
+    for tabs in (True, False):
+        path = raw_file(write_raw(1000, tabs=tabs))
+        try:
+            full, metadata = parse_ascii_raw(path)
+            index = RawIndex.build(path, stride=64)
+            assert index.plots[0]['points'] == 1000
+            assert index.plots[0]['marks']['point'][:3] == [0, 64, 128]
+            assert index.plots[0]['metadata']['plotname'] == metadata['plotname']
+
+            df, window_meta = read_window(path, 300.5e-6, 420e-6, index=index)
+            expected = full[(full.index >= 300.5e-6) & (full.index <= 420e-6)]
+            assert len(df) == len(expected) == 120
+            assert np.allclose(df.index, expected.index)
+            assert np.allclose(df['v(out)'], expected['v(out)'])
+            assert window_meta['no_points'] == 120
+
+            start, end, first, stop = index.locate(300.5e-6, 420e-6)
+            assert (first, stop) == (256, 448)
+            assert end - start < os.path.getsize(path) / 4
+
+            # The extracted text is itself a valid RAW plot
+            extracted, extracted_meta = parse_raw_lines(extract_window(path, 300.5e-6, 420e-6, index=index).splitlines(True))
+            assert len(extracted) == extracted_meta['no_points'] == 192
+            assert len(read_window(path, index=index)[0]) == 1000
+        finally:
+            Path(path).unlink()
+            Path(index_path(path)).unlink(missing_ok=True)
+
+def test_sidecar_reused_and_rebuilt():
+    """Test that the sidecar is written once and rebuilt when the RAW file changes"""
+    path = raw_file(write_raw(300))
+    try:
+        load_index(path, stride=16)
+        assert os.path.exists(index_path(path))
+        assert load_index(path, stride=999).stride == 16
+
+        Path(path).write_text(write_raw(500))
+        rebuilt = load_index(path, stride=32)
+        assert rebuilt.stride == 32
+        assert rebuilt.plots[0]['points'] == 500
+    finally:
+        Path(path).unlink()
+        Path(index_path(path)).unlink(missing_ok=True)
+
+def test_multi_plot_and_complex():
+    """Test windows into the second plot of a file and into complex AC data"""
+    text = write_raw(100) + write_raw(400, plotname='AC Analysis', x_name='frequency', scale=10.0,
+                                      complex_values=True)
+    path = raw_file(text)
+    try:
+        index = load_index(path, stride=50)
+        assert len(index.plots) == 2
+        assert index.plots[1]['points'] == 400
+        df, metadata = read_window(path, 1000.0, 1500.0, plot=1, index=index)
+        assert metadata['plotname'] == 'AC Analysis'
+        assert df.index[0] == 1000.0 and df.index[-1] == 1500.0
+        assert df['v(out)'].iloc[0] == complex(2000.0, -1000.0)
+    finally:
+        Path(path).unlink()
+        Path(index_path(path)).unlink(missing_ok=True)
+
+def test_windowed_compare():
+    """Test comparing RAW files over a window only"""
+    reference = raw_file(write_raw(1000))
+    test = raw_file(write_raw(1000))
+    try:
+        report = compare_batch([(reference, test)], x_range=(100e-6, 200e-6))[0]
+        assert report['passed']
+        assert report['points'] == 101
+    finally:
+        for path in (reference, test):
+            Path(path).unlink()
+            Path(index_path(path)).unlink(missing_ok=True)
+
+if __name__ == "__main__":
+    test_window_matches_full_parse()
+    test_sidecar_reused_and_rebuilt()
+    test_multi_plot_and_complex()
+    test_windowed_compare()
+    print("All RAW index tests passed!")
@@ -9,7 +9,7 @@ import os
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from core.raw_parser import parse_ascii_raw
+from core.raw_parser import parse_ascii_raw, parse_ascii_raw_plots
 
 def create_test_raw_file():
     """Create a test RAW file (old format without tabs)"""
@@ -214,9 +214,32 @@ Values:
     finally:
         Path(raw_file).unlink()
 
+def test_parse_multiple_plots():
+    """Test parsing a RAW file with appended plots (set appendwrite)"""
+    raw_file = create_test_raw_file_with_tabs()
+    
+    try:
+        with open(raw_file) as f:
+            content = f.read()
+        with open(raw_file, 'w') as f:
+            f.write(content + content.replace('Test Circuit', 'Second Run'))
+        
+        plots = parse_ascii_raw_plots(raw_file)
+        
+        assert len(plots) == 2
+        assert plots[0][1]['title'] == 'Test Circuit'
+        assert plots[1][1]['title'] == 'Second Run'
+        for df, metadata in plots:
+            assert len(df) == 5
+            assert abs(df['v(out)'].iloc[4] - 0.9816844) < 1e-6
+        
+    finally:
+        Path(raw_file).unlink()
+
 if __name__ == "__main__":
     test_parse_ascii_raw()
     test_parse_ascii_raw_with_tabs()
     test_parse_complex_raw()
     test_parse_mixed_format()
+    test_parse_multiple_plots()
     print("All RAW parser tests passed!")
\ No newline at end of file
@@ -6,7 +6,9 @@ import os
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from core.sanitizer import sanitize_netlist, check_netlist_safety
+import pytest
+
+from core.sanitizer import sanitize_netlist, check_netlist_safety, validate_vectors
 
 def test_remove_dangerous_commands():
     """Test removal of dangerous commands"""
@@ -89,6 +91,64 @@ run
     assert 'write output.raw' in sanitized
     assert 'quit' in sanitized
 
+def test_keep_user_control_commands():
+    """Test that user run/write commands survive in their original order"""
+    
+    netlist = """* Two runs
+V1 in 0 1
+R1 in out 1k
+C1 out 0 1u
+.tran 1u 1m
+.control
+set appendwrite
+run
+write output.raw
+alter r1 = 2k
+run
+write output.raw
+write results.txt
+quit
+.endc
+.end
+"""
+    
+    sanitized = sanitize_netlist(netlist)
+    control = sanitized[sanitized.index('.control'):sanitized.index('.endc')].split('\n')
+    
+    assert control == [
+        '.control', 'set filetype=ascii', 'set appendwrite', 'run', 'write output.raw',
+        'alter r1 = 2k', 'run', 'write output.raw', 'quit', ''
+    ]
+    assert 'results.txt' not in sanitized
+
+def test_save_vectors():
+    """Test selective saving of output vectors"""
+    
+    netlist = """* Simple RC
+V1 in 0 1
+R1 in out 1k
+C1 out 0 1u
+.tran 1ms 10ms
+.end
+"""
+    
+    sanitized = sanitize_netlist(netlist, save_vectors=['v(out)', 'i(v1)', 'v(out)'])
+    lines = sanitized.split('\n')
+    
+    assert '.save v(out) i(v1)' in lines
+    assert 'write output.raw v(out) i(v1)' in lines
+    assert lines.index('.save v(out) i(v1)') < lines.index('.control')
+    
+    existing = sanitize_netlist(netlist.replace('.end', '.control\nrun\nwrite output.raw\n.endc\n.end'),
+                                save_vectors=['V( out )'])
+    assert 'write output.raw V(out)' in existing
+    assert existing.count('write output.raw') == 1
+    
+    assert validate_vectors(['v(a,b)', '@m1[id]', 'out']) == ['v(a,b)', '@m1[id]', 'out']
+    for bad in ['v(out); shell', 'v(out) quit', '../x', '']:
+        with pytest.raises(ValueError):
+            sanitize_netlist(netlist, save_vectors=[bad])
+
 def test_check_safety():
     """Test safety checker"""
     
@@ -116,5 +176,7 @@ if __name__ == "__main__":
     test_remove_dangerous_commands()
     test_add_control_block()
     test_modify_existing_control()
+    test_keep_user_control_commands()
+    test_save_vectors()
     test_check_safety()
     print("All sanitizer tests passed!")
\ No newline at end of file
@@ -0,0 +1,155 @@
+"""Tests for priority scheduling with preemption"""
+
+import sys
+import os
+import subprocess
+import threading
+import time
+
+import pytest
+
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.scheduler import Scheduler, classify_priority, INTERACTIVE, BATCH
+from core.runner import (
+    run_ngspice, check_ngspice_installed, CANCELLED_LOG, SimulationCancelled, _communicate_cancellable
+)
+from core.sanitizer import sanitize_netlist
+
+def sleeping_backend(order):
+    """Fake run_ngspice: 'netlist' is a label and duration; honours cancel_event"""
+    lock = threading.Lock()
+
+    def run(netlist, timeout, cancel_event=None, **kwargs):
+        label, duration = netlist.split()
+        deadline = time.time() + float(duration)
+        while time.time() < deadline:
+            if cancel_event.is_set():
+                return False, CANCELLED_LOG, None
+            time.sleep(0.005)
+        with lock:
+            order.append(label)
+        return True, label, None
+    return run
+
+def run_in_thread(scheduler, netlist, priority, results):
+    def target():
+        results[netlist.split()[0]] = (time.time(), scheduler.run(netlist, priority=priority))
+    thread = threading.Thread(target=target)
+    thread.start()
+    return thread
+
+def test_classify_priority():
+    """Test that the cost estimator's low-priority verdict demotes jobs to batch"""
+    small = "RC\nR1 in out 1k\nC1 out 0 1u\nV1 in 0 1\n.tran 1u 1m\n.end"
+    large = small.replace('.tran 1u 1m', '.tran 1n 1m')
+    assert classify_priority(small) == INTERACTIVE
+    assert classify_priority(large) == BATCH
+
+def test_interactive_preempts_batch():
+    """Test that an interactive run preempts a running batch job, which is requeued and completes"""
+    order = []
+    scheduler = Scheduler(slots=1, backend=sleeping_backend(order), aging=60)
+    results = {}
+    batch = run_in_thread(scheduler, 'sweep 0.6', BATCH, results)
+    time.sleep(0.1)
+    start = time.time()
+    interactive = run_in_thread(scheduler, 'click 0.05', INTERACTIVE, results)
+    interactive.join()
+    batch.join()
+
+    assert results['click'][0] - start < 0.4
+    assert order == ['click', 'sweep']
+    assert 'Preempted by interactive runs 1 time(s)' in results['sweep'][1][1]
+
+    metrics = scheduler.metrics()
+    assert metrics[BATCH]['completed'] == 1
+    assert metrics[BATCH]['preemptions'] == 1
+    assert metrics[INTERACTIVE]['queue_wait']['max'] < 0.2
+    assert metrics[INTERACTIVE]['run_time']['mean'] >= 0.05
+    assert metrics[BATCH]['queued'] == metrics[BATCH]['running'] == 0
+
+def test_priority_order_and_aging():
+    """Test that interactive jobs jump the queue unless a batch job has aged"""
+    order = []
+    scheduler = Scheduler(slots=1, backend=sleeping_backend(order), aging=60, max_preemptions=0)
+    results = {}
+    threads = [run_in_thread(scheduler, 'blocker 0.2', INTERACTIVE, results)]
+    time.sleep(0.05)
+    threads.append(run_in_thread(scheduler, 'batch 0.01', BATCH, results))
+    time.sleep(0.05)
+    threads.append(run_in_thread(scheduler, 'interactive 0.01', INTERACTIVE, results))
+    for thread in threads:
+        thread.join()
+    assert order == ['blocker', 'interactive', 'batch']
+
+    order.clear()
+    scheduler.aging = 0.05
+    threads = [run_in_thread(scheduler, 'blocker 0.2', INTERACTIVE, results)]
+    time.sleep(0.05)
+    threads.append(run_in_thread(scheduler, 'batch 0.01', BATCH, results))
+    time.sleep(0.1)
+    threads.append(run_in_thread(scheduler, 'interactive 0.01', INTERACTIVE, results))
+    for thread in threads:
+        thread.join()
+    assert order == ['blocker', 'batch', 'interactive']
+
+def test_aged_batch_does_not_preempt():
+    """Test that one interactive job preempts one batch run even with an aged batch job queued"""
+    order = []
+    scheduler = Scheduler(slots=2, backend=sleeping_backend(order), aging=0.05)
+    results = {}
+    threads = [run_in_thread(scheduler, 'first 0.4', BATCH, results)]
+    time.sleep(0.02)
+    threads.append(run_in_thread(scheduler, 'second 0.4', BATCH, results))
+    time.sleep(0.02)
+    threads.append(run_in_thread(scheduler, 'aged 0.01', BATCH, results))
+    time.sleep(0.15)
+    threads.append(run_in_thread(scheduler, 'click 0.01', INTERACTIVE, results))
+    for thread in threads:
+        thread.join()
+
+    assert sorted(order) == ['aged', 'click', 'first', 'second']
+    assert scheduler.metrics()[BATCH]['preemptions'] == 1
+    assert 'Preempted' in results['second'][1][1] and 'Preempted' not in results['first'][1][1]
+
+@pytest.mark.skipif(not check_ngspice_installed(), reason="ngspice not installed")
+def test_cancel_event_kills_ngspice():
+    """Test that setting cancel_event stops a running ngspice"""
+    netlist = sanitize_netlist("Long\nV1 in 0 SIN(0 1 1k)\nR1 in out 1k\nC1 out 0 1u\n.tran 10n 100m\n.end")
+    cancel = threading.Event()
+    threading.Timer(0.3, cancel.set).start()
+    start = time.time()
+    success, log, raw_path = run_ngspice(netlist, timeout=60, check_cost=False, cancel_event=cancel)
+    assert not success and log == CANCELLED_LOG and raw_path is None
+    assert time.time() - start < 5
+
+def slow_stdin_process(delay):
+    """Process that reads stdin, works for delay seconds and echoes the input length"""
+    script = f"import sys, time\ndata = sys.stdin.read()\ntime.sleep({delay})\nprint(len(data))\n"
+    return subprocess.Popen([sys.executable, '-c', script], stdin=subprocess.PIPE,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+
+def test_cancellable_run_with_stdin():
+    """Test that a netlist on stdin survives several poll intervals and can still be cancelled"""
+    netlist = "* stdin\n" + "R1 a 0 1k\n" * 20000
+    stdout, _ = _communicate_cancellable(slow_stdin_process(0.7), 10, threading.Event(), input_text=netlist)
+    assert stdout.strip() == str(len(netlist))
+
+    cancel = threading.Event()
+    threading.Timer(0.5, cancel.set).start()
+    start = time.time()
+    with pytest.raises(SimulationCancelled):
+        _communicate_cancellable(slow_stdin_process(30), 60, cancel, input_text=netlist)
+    assert time.time() - start < 5
+
+if __name__ == "__main__":
+    test_classify_priority()
+    test_interactive_preempts_batch()
+    test_priority_order_and_aging()
+    test_aged_batch_does_not_preempt()
+    test_cancellable_run_with_stdin()
+    if check_ngspice_installed():
+        test_cancel_event_kills_ngspice()
+    print("All scheduler tests passed!")
@@ -0,0 +1,80 @@
+"""Tests for the scratch sandbox manager"""
+
+import sys
+import os
+import subprocess
+import tempfile
+from pathlib import Path
+
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.scratch import ScratchManager, scratch_base, DEFAULT_OUTPUT_DIR
+from core.progress import ProgressTracker
+from core.runner import _communicate_with_progress
+
+def test_sandbox_reuse():
+    """Test that released sandboxes are emptied and recycled"""
+    with tempfile.TemporaryDirectory() as base:
+        manager = ScratchManager(base, pool_size=1)
+        assert scratch_base(base) == base
+
+        with manager.acquire() as first:
+            (first / 'input.cir').write_text('* test')
+            (first / 'nested').mkdir()
+            (first / 'nested' / 'file').write_text('x')
+        assert first.is_dir()
+        assert list(first.iterdir()) == []
+
+        with manager.acquire() as again:
+            assert again == first
+            with manager.acquire() as second:
+                assert second != first
+        # Pool holds one sandbox; the other is removed
+        assert first.is_dir() != second.is_dir()
+
+        manager.cleanup()
+        assert not first.exists()
+
+def test_persist_output():
+    """Test that persisted outputs survive sandbox recycling"""
+    with tempfile.TemporaryDirectory() as base, tempfile.TemporaryDirectory() as outputs:
+        manager = ScratchManager(base, output_dir=outputs)
+        with manager.acquire() as sandbox:
+            raw = sandbox / 'output.raw'
+            raw.write_text('Title: test\n')
+            kept = manager.persist(raw, suffix='.raw')
+            assert not raw.exists()
+        assert kept.endswith('.raw')
+        assert Path(kept).read_text() == 'Title: test\n'
+        assert Path(kept).parent == Path(outputs)
+        os.unlink(kept)
+        manager.cleanup()
+
+    # Outputs never stay on the RAM-backed scratch filesystem by default
+    assert ScratchManager('/dev/shm').output_dir == (DEFAULT_OUTPUT_DIR or tempfile.gettempdir())
+
+def test_progress_with_stdin():
+    """Test that the netlist can be fed on stdin while progress is tracked"""
+    script = "import sys; data = sys.stdin.read(); sys.stdout.write(str(len(data)))"
+    netlist = "* stdin netlist\n" * 5000
+    with tempfile.TemporaryDirectory() as tmpdir:
+        process = subprocess.Popen(
+            [sys.executable, '-c', script],
+            cwd=tmpdir,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True
+        )
+        stdout, _ = _communicate_with_progress(
+            process, 10, ProgressTracker(None), Path(tmpdir), lambda event: None,
+            input_text=netlist
+        )
+    assert stdout == str(len(netlist))
+
+if __name__ == "__main__":
+    test_sandbox_reuse()
+    test_persist_output()
+    test_progress_with_stdin()
+    print("All scratch tests passed!")
@@ -0,0 +1,98 @@
+"""Tests for finite-difference sensitivity analysis"""
+
+import sys
+import os
+import numpy as np
+
+import pytest
+
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.sensitivity import (
+    sensitivity_analysis, sensitivity_elements, perturb_netlist, parse_metric, evaluate_metrics
+)
+from core.netlist_examples import generate_parametric_netlist
+from core.netlist_parser import parse_netlist
+
+def test_elements_and_perturbation():
+    """Test element discovery and single-value replacement"""
+    netlist = """Mixed
+V1 in 0 AC 1
+R1 in out 1k
+C1 out 0 {cval}
+Rz out 0 0
+F1 out 0 V1 2.5
+.ac dec 10 1 1k
+.end
+"""
+    found = sensitivity_elements(netlist)
+    assert [(e['name'], e['value']) for e in found] == [('R1', 1000.0), ('F1', 2.5)]
+
+    edited = perturb_netlist(netlist, found[1]['element'], 2.75)
+    parsed = parse_netlist(edited)['elements']
+    assert [e['args'] for e in parsed if e['name'] == 'F1'] == [['V1', '2.75']]
+    assert edited.replace('F1 out 0 V1 2.75', 'F1 out 0 V1 2.5') == netlist
+
+def test_metrics():
+    """Test metric parsing and vectorized evaluation"""
+    assert parse_metric('max(v(out))') == ('max', 'v(out)', None)
+    assert parse_metric('AT( v(a,b) , 1k )') == ('at', 'v(a,b)', 1000.0)
+    for bad in ('median(v(out))', 'at(v(out))', 'max(v(out), 1)', 'v(out)'):
+        with pytest.raises(ValueError):
+            parse_metric(bad)
+
+    x = np.array([0.0, 1.0, 2.0])
+    data = np.array([[[1.0], [3.0], [2.0]], [[0.0], [-4.0], [4.0]]])
+    values = evaluate_metrics(x, ['v(out)'], data, ['min(v(out))', 'max(V(OUT))', 'final(v(out))', 'at(v(out), 0.5)'])
+    assert np.allclose(values, [[1.0, 3.0, 2.0, 2.0], [-4.0, 4.0, 4.0, -2.0]])
+    with pytest.raises(ValueError):
+        evaluate_metrics(x, ['v(out)'], data, ['max(v(in))'])
+
+def test_rc_corner_sensitivity():
+    """Test against the analytic sensitivity of |H| at the RC corner (0.5 for R and C)"""
+    netlist = generate_parametric_netlist("rc_highpass", R=1000, C=1e-6)
+    corner = 1 / (2 * np.pi * 1000 * 1e-6)
+    result = sensitivity_analysis(netlist, [f'at(v(n1), {corner})', 'max(v(n1))'], step=1e-3, central=True)
+
+    assert result['engine'] == 'mna'
+    assert result['variants'] == 5
+    table = result['table']
+    at_corner = table[table['metric'].str.startswith('at')]
+    assert list(at_corner['rank']) == [1, 2]
+    assert set(at_corner['element']) == {'C1', 'R1'}
+    assert np.allclose(at_corner['sensitivity'], 0.5, atol=0.02)
+    assert abs(result['nominal'][f'at(v(n1), {corner})'] - 1 / np.sqrt(2)) < 0.02
+
+    # Far above the corner the response is flat
+    flat = table[table['metric'] == 'max(v(n1))']
+    assert np.all(np.abs(flat['sensitivity']) < 1e-3)
+
+    # Forward differences on a subset of elements
+    forward = sensitivity_analysis(netlist, [f'at(v(n1), {corner})'], elements=['r1'])
+    assert list(forward['table']['element']) == ['R1']
+    assert forward['variants'] == 2
+
+def test_cutoff_and_overshoot():
+    """Test the -3 dB cutoff of low/high-pass responses and step overshoot"""
+    frequency = np.logspace(1, 5, 401)
+    lowpass = np.abs(1 / (1 + 1j * frequency / 1e3))
+    highpass = np.abs(1j * frequency / 1e3 / (1 + 1j * frequency / 1e3))
+    data = np.stack([lowpass, highpass])[:, :, None]
+    cutoff = evaluate_metrics(frequency, ['v(out)'], data, ['cutoff(v(out))'])[:, 0]
+    assert np.allclose(cutoff, 1e3, rtol=1e-3)
+
+    time = np.linspace(0, 1, 1001)
+    ringing = 1 - np.exp(-5 * time) * np.cos(20 * time)
+    step = np.stack([ringing, 1 - np.exp(-5 * time), -ringing])[:, :, None]
+    overshoot = evaluate_metrics(time, ['v(out)'], step, ['overshoot(v(out))'])[:, 0]
+    expected = (ringing.max() - ringing[-1]) / (ringing[-1] - ringing[0]) * 100
+    assert np.allclose(overshoot, [expected, 0.0, expected])
+    assert expected > 40
+
+if __name__ == "__main__":
+    test_elements_and_perturbation()
+    test_metrics()
+    test_rc_corner_sensitivity()
+    test_cutoff_and_overshoot()
+    print("All sensitivity tests passed!")
@@ -0,0 +1,156 @@
+"""Tests for resident ngspice sessions"""
+
+import sys
+import os
+import tempfile
+import textwrap
+from pathlib import Path
+
+import pytest
+
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.session import (
+    NgspiceSession, SessionPool, split_control, plan_update, incremental_simulate
+)
+from core.sanitizer import sanitize_netlist
+from core.runner import check_ngspice_installed
+
+NETLIST = """RC step
+V1 in 0 PULSE(0 1 0 1n 1n 1m 2m)
+R1 in out 1k
+C1 out 0 1u
+.tran 10u 1m
+.end
+"""
+
+# Minimal stand-in for 'ngspice -p': logs commands, tracks R1 and writes
+# a RAW file whose v(out) is the current R1 value
+FAKE_NGSPICE = textwrap.dedent('''
+    import re, sys
+    r1 = None
+    log = open('commands.log', 'a')
+    for line in sys.stdin:
+        command = line.strip()
+        log.write(command + '\\n')
+        log.flush()
+        words = command.split()
+        if not words:
+            continue
+        if words[0] == 'echo':
+            print(command[5:], flush=True)
+        elif words[0] == 'source':
+            match = re.search(r'^R1 \\S+ \\S+ (\\S+)', open(words[1]).read(), re.M | re.I)
+            r1 = match.group(1)
+        elif words[0] == 'alter' and words[1] == 'r1':
+            r1 = words[3]
+        elif words[0] == 'write':
+            value = float(r1.lower().replace('k', 'e3'))
+            with open(words[1], 'w') as f:
+                f.write('Title: fake\\nPlotname: Transient Analysis\\nFlags: real\\n'
+                        'No. Variables: 2\\nNo. Points: 2\\nVariables:\\n'
+                        ' 0 time time\\n 1 v(out) voltage\\nValues:\\n'
+                        f'0\\t0.0\\n\\t{value}\\n1\\t1e-3\\n\\t{value}\\n')
+''')
+
+
+def fake_command():
+    """Command line running the fake ngspice"""
+    script = Path(tempfile.mkdtemp()) / 'fake_ngspice.py'
+    script.write_text(FAKE_NGSPICE)
+    return [sys.executable, str(script)]
+
+
+def session_commands(session):
+    return (session._workdir / 'commands.log').read_text().splitlines()
+
+
+def test_split_control_and_plan_update():
+    """Test that value edits become alter commands and structural edits force a reload"""
+    circuit, control = split_control(sanitize_netlist(NETLIST))
+    assert '.control' not in circuit.lower()
+    assert control == ['set filetype=ascii', 'run', 'write output.raw']
+
+    assert plan_update(circuit, circuit) == []
+    assert plan_update(circuit, circuit.replace('R1 in out 1k', 'R1 in out 2.2k')) == ['alter r1 = 2.2k']
+    assert plan_update(circuit, circuit.replace('R1 in out 1k', 'R1 in mid 1k')) is None
+    assert plan_update(circuit, circuit.replace('.tran 10u 1m', '.tran 10u 2m')) is None
+    assert plan_update(circuit, circuit.replace('R1 in out 1k', 'R1 in out {rval}')) is None
+
+    with_param = circuit.replace('.tran', '.param gain=2\n.tran')
+    assert plan_update(with_param, with_param.replace('gain=2', 'gain=3')) == ['alterparam gain = 3', 'reset']
+
+def test_session_alters_instead_of_reloading():
+    """Test that value-only edits reuse the loaded circuit"""
+    session = NgspiceSession(fake_command())
+    try:
+        success, log, raw_path = session.run(sanitize_netlist(NETLIST))
+        assert success, log
+        assert 'circuit loaded' in log
+        os.unlink(raw_path)
+
+        edited = sanitize_netlist(NETLIST.replace('R1 in out 1k', 'R1 in out 2k'))
+        success, log, raw_path = session.run(edited)
+        assert success, log
+        assert 'without reloading' in log
+        with open(raw_path) as f:
+            assert '2000.0' in f.read()
+        os.unlink(raw_path)
+
+        commands = session_commands(session)
+        assert sum(c.startswith('source') for c in commands) == 1
+        assert 'alter r1 = 2k' in commands
+        assert 'quit' not in commands
+
+        rewired = sanitize_netlist(NETLIST.replace('R1 in out 1k', 'R1 in out 3k').replace('C1 out 0', 'C1 out 0 IC=0'))
+        success, log, raw_path = session.run(rewired)
+        assert success, log
+        os.unlink(raw_path)
+        assert session.stats == {'reloads': 2, 'alters': 1}
+    finally:
+        session.close()
+    assert not session.alive
+
+def test_pool_and_fallback():
+    """Test that the pool evicts old sessions and failures fall back to batch mode"""
+    pool = SessionPool(max_sessions=2, command=fake_command())
+    first = pool.get('a')
+    first.run(sanitize_netlist(NETLIST))
+    assert first.alive
+    pool.get('b')
+    pool.get('c')
+    assert len(pool) == 2
+    assert not first.alive
+    pool.close_all()
+    assert len(pool) == 0
+
+    broken = NgspiceSession(['/nonexistent/ngspice', '-p'])
+    success, log, df, metadata, raw_path = incremental_simulate(sanitize_netlist(NETLIST), broken)
+    assert 'Resident session unavailable' in log
+    if raw_path:
+        os.unlink(raw_path)
+
+@pytest.mark.skipif(not check_ngspice_installed(), reason="ngspice not installed")
+def test_session_matches_batch_run():
+    """Test that an altered session run gives the same result as a fresh run"""
+    from core.runner import simulate
+
+    session = NgspiceSession()
+    edited = sanitize_netlist(NETLIST.replace('R1 in out 1k', 'R1 in out 470'))
+    try:
+        assert incremental_simulate(sanitize_netlist(NETLIST), session)[0]
+        success, log, df, metadata, _ = incremental_simulate(edited, session)
+        assert success and 'without reloading' in log
+    finally:
+        session.close()
+    _, _, reference, _, _ = simulate(edited)
+    assert abs(df.iloc[-1]['v(out)'] - reference.iloc[-1]['v(out)']) < 1e-3
+
+if __name__ == "__main__":
+    test_split_control_and_plan_update()
+    test_session_alters_instead_of_reloading()
+    test_pool_and_fallback()
+    if check_ngspice_installed():
+        test_session_matches_batch_run()
+    print("All session tests passed!")
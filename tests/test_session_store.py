@@ -0,0 +1,133 @@
+"""Tests for per-session result storage with spill-to-disk"""
+
+import sys
+import os
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.session_store import SessionStore, result_nbytes
+from core.raw_index import index_path
+from core.pyramid import ResultPyramid
+
+def make_result(points, title='RC'):
+    """Transient-like result with two traces"""
+    time_axis = np.linspace(0, 1e-3, points)
+    df = pd.DataFrame({'v(out)': np.sin(time_axis * 1e4), 'i(v1)': np.cos(time_axis * 1e4)},
+                      index=pd.Index(time_axis, name='time'))
+    return df, {'title': title, 'plotname': 'Transient Analysis', 'variables': []}
+
+def test_latest_hot_older_spilled():
+    """Test that only the latest result stays in memory and older ones reload from disk"""
+    store = SessionStore(spill_dir=tempfile.mkdtemp())
+    first_df, first_meta = make_result(1000, 'first')
+    first = store.put('a', first_df, first_meta, raw_path='/nonexistent/first.raw')
+    hot_bytes = store.memory_usage('a')
+    assert hot_bytes >= result_nbytes({'dataframe': first_df})
+
+    second = store.put('a', *make_result(500, 'second'))
+    assert store.memory_usage('a') < hot_bytes
+    summaries = store.results('a')
+    assert [s['result_id'] for s in summaries] == [second, first]
+    assert [s['spilled'] for s in summaries] == [False, True]
+
+    restored = store.get('a', first)
+    assert restored['spilled']
+    assert restored['raw_path'] == '/nonexistent/first.raw'
+    assert restored['metadata']['title'] == 'first'
+    assert np.array_equal(restored['dataframe'].values, first_df.values)
+    assert len(restored['archived']) == 1000
+    assert store.get('a')['metadata']['title'] == 'second'
+    assert store.get('b') is None
+
+def test_budget_and_result_limit():
+    """Test that results over budget spill immediately and old results are forgotten"""
+    store = SessionStore(spill_dir=tempfile.mkdtemp(), budget=10_000, max_results=2)
+    big = store.put('a', *make_result(5000))
+    assert store.results('a')[0]['spilled']
+    assert store.memory_usage('a') == 0
+    assert len(store.get('a', big)['dataframe']) == 5000
+
+    store.put('a', *make_result(10))
+    store.put('a', *make_result(20))
+    assert len(store.results('a')) == 2
+    assert store.get('a', big) is None
+    assert len(store.archive.list_runs()) == 1
+
+def test_idle_sessions_evicted():
+    """Test that sessions idle past the TTL are dropped with their spilled runs"""
+    store = SessionStore(spill_dir=tempfile.mkdtemp(), ttl=60)
+    store.put('old', *make_result(100))
+    store.put('old', *make_result(100))
+    store.put('new', *make_result(100))
+    store._last_access['old'] -= 120
+    assert store.evict_idle() == 1
+    assert len(store) == 1
+    assert store.results('old') == []
+    assert store.archive.list_runs() == []
+    assert store.get('new') is not None
+
+def test_spilled_view_reused_and_raw_files_deleted():
+    """Test that spilled results decode lazily once per access streak and RAW files go with their result"""
+    store = SessionStore(spill_dir=tempfile.mkdtemp(), max_results=2)
+    raw_dir = Path(tempfile.mkdtemp())
+    raws = [raw_dir / f'run{i}.raw' for i in range(3)]
+    for raw in raws:
+        raw.write_text('Title: fake\n')
+    Path(index_path(str(raws[0]))).write_text('{}')
+
+    first_df, first_meta = make_result(1000)
+    first = store.put('a', first_df, first_meta, raw_path=str(raws[0]))
+    store.put('a', *make_result(10), raw_path=str(raws[1]))
+
+    view = store.get('a', first)
+    assert 'dataframe' not in view and store.memory_usage('a') < result_nbytes({'dataframe': first_df})
+    view['pyramid'] = 'cached view'
+    assert np.array_equal(view['dataframe'].values, first_df.values)
+    assert store.get('a', first) is view and store.get('a', first)['pyramid'] == 'cached view'
+    assert store.memory_usage('a') >= result_nbytes({'dataframe': first_df})
+
+    # The oldest result is forgotten together with its RAW file and index sidecar
+    store.put('a', *make_result(10), raw_path=str(raws[2]))
+    assert store.get('a', first) is None
+    assert not raws[0].exists() and not Path(index_path(str(raws[0]))).exists()
+    assert raws[1].exists()
+    store.drop('a')
+    assert not any(raw.exists() for raw in raws)
+
+def test_attached_views_count_towards_budget():
+    """Test that derived views are budgeted when attached and when they grow later"""
+    df, metadata = make_result(2000)
+    store = SessionStore(spill_dir=tempfile.mkdtemp(), budget=result_nbytes({'dataframe': df}) + 10_000)
+    result = store.put('a', df, metadata)
+
+    store.attach('a', result, 'csv', 'x' * 1000)
+    assert not store.results('a')[0]['spilled'] and store.get('a')['csv']
+    pyramid = store.attach('a', result, 'pyramid', ResultPyramid.from_dataframe(df, block=2))
+    assert pyramid.nbytes == 0 and not store.results('a')[0]['spilled']
+
+    # Levels built after attaching are counted on the next access
+    pyramid.levels('v(out)')
+    assert pyramid.nbytes > 10_000
+    view = store.get('a')
+    assert store.results('a')[0]['spilled']
+    assert 'pyramid' not in view and 'csv' not in view and 'dataframe' not in view
+
+    # A spilled view only keeps values that fit the budget
+    assert store.attach('a', result, 'csv', 'x' * 100) == 'x' * 100
+    assert store.get('a')['csv'] == 'x' * 100
+    store.attach('a', result, 'csv', 'x' * (store.budget + 1))
+    assert store.get('a')['csv'] == 'x' * 100
+
+if __name__ == "__main__":
+    test_latest_hot_older_spilled()
+    test_budget_and_result_limit()
+    test_idle_sessions_evicted()
+    test_spilled_view_reused_and_raw_files_deleted()
+    test_attached_views_count_towards_budget()
+    print("All session store tests passed!")
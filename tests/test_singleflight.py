@@ -0,0 +1,102 @@
+"""Tests for request coalescing"""
+
+import sys
+import os
+import tempfile
+import threading
+import time
+
+import pytest
+
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.singleflight import SingleFlight, simulation_key, coalesced_simulate, _own_copy
+from core.sanitizer import sanitize_netlist
+
+def test_concurrent_calls_share_execution():
+    """Test that identical concurrent calls run once and share the result"""
+    flights = SingleFlight()
+    calls = []
+    results = []
+
+    def work():
+        calls.append(1)
+        time.sleep(0.3)
+        return {'value': 42}
+
+    def request():
+        results.append(flights.do('same', work))
+
+    threads = [threading.Thread(target=request) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert len(results) == 8
+    assert sum(1 for _, shared in results if not shared) == 1
+    assert all(result is results[0][0] for result, _ in results)
+    assert flights.in_flight() == 0
+
+    # Finished keys run again
+    assert flights.do('same', lambda: 'fresh') == ('fresh', False)
+
+def test_errors_reach_all_callers():
+    """Test that a failure is raised in the leader and every waiter"""
+    flights = SingleFlight()
+    errors = []
+
+    def fail():
+        time.sleep(0.2)
+        raise RuntimeError("ngspice crashed")
+
+    def request():
+        try:
+            flights.do('bad', fail)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=request) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == ["ngspice crashed"] * 4
+    with pytest.raises(ValueError):
+        flights.do('bad', lambda: int('x'))
+
+def test_coalesced_simulate():
+    """Test the coalescing key and a simulation through the shared layer"""
+    netlist = sanitize_netlist("* RC\nV1 in 0 AC 1\nR1 in out 1k\nC1 out 0 1u\n.ac dec 10 1 1k\n.end\n")
+
+    assert simulation_key(netlist) == simulation_key(netlist, progress_callback=print)
+    assert simulation_key(netlist) != simulation_key(netlist, fast_path=False)
+    assert simulation_key(netlist) != simulation_key(netlist.replace('1k', '2k'))
+
+    success, log, df, metadata, raw_path = coalesced_simulate(netlist, flights=SingleFlight())
+    assert success
+    assert 'v(out)' in df.columns
+    assert raw_path is None
+
+def test_shared_raw_paths_are_owned_separately():
+    """Test that joining callers get their own RAW path, so one caller deleting it does not affect others"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        original = os.path.join(tmpdir, 'shared.raw')
+        with open(original, 'w') as f:
+            f.write('Title: shared\n')
+        copy = _own_copy(original)
+        assert copy != original and os.path.dirname(copy) == tmpdir
+        os.unlink(original)
+        with open(copy) as f:
+            assert f.read() == 'Title: shared\n'
+        assert _own_copy(original) is None
+
+if __name__ == "__main__":
+    test_concurrent_calls_share_execution()
+    test_errors_reach_all_callers()
+    test_coalesced_simulate()
+    test_shared_raw_paths_are_owned_separately()
+    print("All single-flight tests passed!")
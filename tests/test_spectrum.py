@@ -0,0 +1,109 @@
+"""Tests for transient spectrum analysis"""
+
+import sys
+import os
+import numpy as np
+import pandas as pd
+import pytest
+
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.spectrum import (
+    compute_spectrum, harmonic_table, window_function, uniform_grid, SpectrumCache, spectrum_nbytes, WINDOWS,
+    amplitude_frame
+)
+
+def make_distorted(points=6000, seed=0):
+    """1 kHz sine with 10% 3rd harmonic on an adaptive (non-uniform) time grid"""
+    rng = np.random.default_rng(seed)
+    steps = rng.uniform(0.5, 1.5, points)
+    time = np.concatenate([[0.0], np.cumsum(steps)])
+    time *= 10e-3 / time[-1]
+    fundamental = np.sin(2 * np.pi * 1e3 * time)
+    third = 0.1 * np.sin(2 * np.pi * 3e3 * time)
+    return pd.DataFrame({'v(out)': 0.5 + fundamental + third, 'v(in)': 2 * fundamental},
+                        index=pd.Index(time, name='time'))
+
+def test_windows_and_grid():
+    """Test window shapes and uniform grid sizing"""
+    for name in WINDOWS:
+        w = window_function(name, 64)
+        assert len(w) == 64
+        assert w.max() <= 1.0 + 1e-6
+    with pytest.raises(ValueError):
+        window_function('kaiser-ish', 8)
+
+    grid = uniform_grid(np.linspace(0, 1, 1000))
+    assert len(grid) == 1024
+    assert np.allclose(np.diff(grid), 1 / 1024)
+    assert len(uniform_grid(np.linspace(0, 1, 1000), x_start=0.5)) == 512
+
+def test_spectrum_amplitudes():
+    """Test amplitude scaling, DC and harmonic detection on non-uniform data"""
+    df = make_distorted()
+    spectrum = compute_spectrum(df, window='flattop')
+    assert spectrum['amplitude'].shape == (len(spectrum['frequency']), 2)
+    assert spectrum['columns'] == ['v(out)', 'v(in)']
+
+    frequency = spectrum['frequency']
+    out = spectrum['amplitude'][:, 0]
+    assert np.isclose(out[0], 0.5, rtol=1e-2)
+    peak = 1 + np.argmax(out[1:])
+    assert np.isclose(frequency[peak], 1e3, rtol=0.01)
+    assert np.isclose(out[peak], 1.0, rtol=0.01)
+
+    table, thd = harmonic_table(spectrum, harmonics=5)
+    row = table[(table['trace'] == 'v(out)') & (table['harmonic'] == 3)].iloc[0]
+    assert np.isclose(row['frequency'], 3e3, rtol=0.01)
+    assert np.isclose(row['amplitude'], 0.1, rtol=0.02)
+    assert np.isclose(row['dbc'], -20.0, atol=0.3)
+    assert np.isclose(thd['v(out)'], 10.0, rtol=0.03)
+    assert thd['v(in)'] < 0.5
+    
+    frame = amplitude_frame(spectrum, db=True)
+    assert frame.index.name == 'frequency'
+    assert len(frame) == len(frequency) - 1
+    assert np.isclose(frame['v(in)'].max(), 20 * np.log10(2.0), atol=0.1)
+
+    # PSD integrates to the signal power (Parseval)
+    hann = compute_spectrum(df, columns=['v(in)'], window='hann', remove_dc=True)
+    df_bin = hann['frequency'][1] - hann['frequency'][0]
+    assert np.isclose(hann['psd'][:, 0].sum() * df_bin, 2.0, rtol=0.05)
+
+def test_spectrum_cache():
+    """Test that repeated views reuse cached spectra"""
+    df = make_distorted(2000)
+    cache = SpectrumCache(max_entries=2)
+    first = cache.spectrum(df, ['v(out)'], window='hann')
+    assert cache.spectrum(df, ['v(out)'], window='hann') is first
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    cache.spectrum(df, ['v(out)'], window='blackman')
+    changed = df.copy()
+    changed.iloc[10, 0] += 1.0
+    assert cache.spectrum(changed, ['v(out)'], window='hann') is not first
+    assert cache.misses == 3
+
+def test_spectrum_cache_byte_bound():
+    """Test that the cache evicts by total bytes and skips spectra larger than the bound"""
+    df = make_distorted(2000)
+    size = spectrum_nbytes(compute_spectrum(df, ['v(out)'], window='hann'))
+    cache = SpectrumCache(max_bytes=int(size * 2.5))
+    for window in ('hann', 'blackman', 'hamming'):
+        cache.spectrum(df, ['v(out)'], window=window)
+    assert len(cache) == 2 and cache.nbytes <= cache.max_bytes
+    cache.spectrum(df, ['v(out)'], window='hann')
+    assert cache.misses == 4
+
+    tiny = SpectrumCache(max_bytes=size - 1)
+    first = tiny.spectrum(df, ['v(out)'])
+    assert len(tiny) == 0 and tiny.nbytes == 0
+    assert tiny.spectrum(df, ['v(out)']) is not first
+
+if __name__ == "__main__":
+    test_windows_and_grid()
+    test_spectrum_amplitudes()
+    test_spectrum_cache()
+    test_spectrum_cache_byte_bound()
+    print("All spectrum tests passed!")
@@ -0,0 +1,72 @@
+"""Tests for the row-windowed result table"""
+
+import sys
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.table import ResultTable
+from core.archive import ResultArchive
+
+def make_result(n=10_000):
+    time = np.linspace(0, 1e-3, n)
+    return pd.DataFrame({'v(in)': np.sin(time * 1e4), 'v(out)': np.cos(time * 1e4)},
+                        index=pd.Index(time, name='time'))
+
+def test_pages_and_columns():
+    """Test page slicing and column selection"""
+    df = make_result()
+    table = ResultTable.from_dataframe(df)
+    assert len(table) == 10_000
+    assert table.page_count(100) == 100
+    assert table.page_count(3000) == 4
+
+    page = table.page(2, 100, columns=['v(out)', 'missing'])
+    assert list(page.columns) == ['v(out)']
+    assert page.index.name == 'time'
+    assert np.array_equal(page['v(out)'].values, df['v(out)'].values[200:300])
+
+    last = table.page(3, 3000)
+    assert len(last) == 1000
+    assert len(table.window(20_000, 50)) == 0
+    assert table.describe_window(99, 100) == {
+        'start': 9900, 'stop': 10_000, 'rows': 10_000,
+        'x_first': float(df.index[9900]), 'x_last': float(df.index[-1])
+    }
+
+def test_locate_x_value():
+    """Test nearest-row binary search on the x-axis"""
+    table = ResultTable.from_dataframe(make_result(1001))
+    assert table.locate(5e-4) == 500
+    assert table.locate(5.004e-4) == 500
+    assert table.locate(5.006e-4) == 501
+    assert table.locate(-1.0) == 0
+    assert table.locate(1.0) == 1000
+    assert table.page_of(5e-4, 100) == 5
+
+    no_axis = ResultTable.from_dataframe(pd.DataFrame({'a': range(10)}))
+    assert no_axis.locate(7) == 7
+    assert list(no_axis.window(8, 5).index) == [8, 9]
+
+def test_archived_table():
+    """Test paging over memory-mapped archived columns"""
+    df = make_result()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        archive = ResultArchive(tmpdir)
+        run_id = archive.save(df, {'title': 'T', 'plotname': 'Transient Analysis', 'variables': []})
+        table = ResultTable.from_archive(archive.open(run_id))
+        page = table.page(table.page_of(7e-4, 500), 500)
+        nearest = float(df.index[table.locate(7e-4)])
+        assert abs(nearest - 7e-4) <= 1e-3 / 9999 / 2
+        assert nearest in page.index
+        assert np.allclose(page.values, df.loc[page.index].values)
+
+if __name__ == "__main__":
+    test_pages_and_columns()
+    test_locate_x_value()
+    test_archived_table()
+    print("All table tests passed!")